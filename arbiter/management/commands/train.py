@@ -244,9 +244,20 @@ class Command(BaseCommand):
                 )
             )
 
-            for document in Document.objects.all():
+            # Skip documents without content and near-duplicates of documents
+            # that are already included
+            documents = Document.objects.filter(
+                state=Document.PROCESSED, content__isnull=False,
+            )
+
+            originals = set()
+            for document in documents.order_by('created'):
+                original = document.duplicate_of_id or document.id
+                if original in originals: continue
+
                 label = document.label()
                 if label is not None:
+                    originals.add(original)
                     LabeledDocument.objects.create(
                         corpus=corpus, document=document, label=label,
                     )
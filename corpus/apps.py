@@ -18,6 +18,7 @@ Application definition for the corpus app.
 ##########################################################################
 
 from django.apps import AppConfig
+from django.conf import settings
 
 
 ##########################################################################
@@ -31,3 +32,8 @@ class CorpusConfig(AppConfig):
 
     def ready(self):
         import corpus.signals
+
+        # Load the NLTK models now rather than on the first request
+        if getattr(settings, 'NLTK_WARMUP', False):
+            from corpus.nlp import warmup
+            warmup()
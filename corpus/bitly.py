@@ -11,25 +11,38 @@
 
 """
 Access the bit.ly url shortening service.
+
+The API is rate limited and adds its latency to every call, so documents are
+stored without a short url and shortened later in batches by the shorten
+command. Every short url is memoized in the short_urls table, which is shared
+by all workers and consulted before the API is called.
 """
 
 ##########################################################################
 ## Imports
 ##########################################################################
 
-import requests
+import logging
 
+from corpus import client
 from django.conf import settings
 from urllib.parse import urljoin
-from corpus.exceptions import BitlyAPIError
+from django.db import transaction, IntegrityError
+from corpus.models import ShortURL
+from corpus.exceptions import BitlyAPIError, BitlyRateLimit
+
+# Logger for reporting on urls that could not be shortened
+logger = logging.getLogger(__name__)
 
 ##########################################################################
 ## Shorten function
 ##########################################################################
 
-def shorten(url, token=None):
+def shorten(url, token=None, timeout=None):
     """
-    Shortens a URL using the bit.ly API.
+    Shortens a URL using the bit.ly API, waiting at most timeout seconds
+    (default settings.BITLY_TIMEOUT). Raises a BitlyRateLimit if the API is
+    throttling requests.
     """
 
     # Get the bit.ly access token from settings
@@ -47,12 +60,82 @@ def shorten(url, token=None):
     }
 
     # bit.ly tends not to send status code errors
-    response = requests.get(endpoint, params=params)
+    try:
+        timeout = timeout or getattr(settings, 'BITLY_TIMEOUT', None)
+        response = client.get(endpoint, params=params, timeout=timeout)
+        if response.status_code == 429:
+            raise BitlyRateLimit("Could not shorten link: rate limit exceeded")
+        data = response.json()
+    except BitlyAPIError:
+        raise
+    except Exception as e:
+        raise BitlyAPIError(
+            "Could not shorten link: {}".format(e)
+        )
 
     # Parse and return the result
-    data = response.json()
+    if data['status_txt'] == 'RATE_LIMIT_EXCEEDED':
+        raise BitlyRateLimit(
+            "Could not shorten link: rate limit exceeded"
+        )
+
     if data['status_code'] != 200:
         raise BitlyAPIError(
             "Could not shorten link: {}".format(data['status_txt'])
         )
     return data['data']['url']
+
+
+##########################################################################
+## Short URL Cache
+##########################################################################
+
+def lookup(urls):
+    """
+    Returns a dict of the urls that have been shortened to their short urls.
+    """
+    return dict(
+        ShortURL.objects.filter(long_url__in=list(urls)).values_list('long_url', 'short_url')
+    )
+
+
+def remember(url, short_url):
+    """
+    Adds the short url of the url to the cache, unless another worker has.
+    """
+    try:
+        with transaction.atomic():
+            ShortURL.objects.create(long_url=url, short_url=short_url)
+    except IntegrityError:
+        pass
+
+
+def shorten_many(urls, token=None, timeout=None):
+    """
+    Returns a dict of the urls to their short urls, from the cache if they
+    have been shortened before, otherwise from the API (adding them to the
+    cache), along with a dict of the urls that could not be shortened to
+    the error. If the API throttles requests the remaining urls are not
+    shortened and the rate limit error is recorded for the first of them.
+    """
+    urls = list(urls)
+    shortened, errors = lookup(urls), {}
+
+    for url in urls:
+        if url in shortened:
+            continue
+
+        try:
+            shortened[url] = shorten(url, token, timeout)
+        except BitlyRateLimit as e:
+            logger.warning("bit.ly is rate limiting requests, stopping")
+            errors[url] = e
+            break
+        except BitlyAPIError as e:
+            logger.warning("could not shorten %s: %s", url, e)
+            errors[url] = e
+            continue
+
+        remember(url, shortened[url])
+
+    return shortened, errors
@@ -0,0 +1,118 @@
+# corpus.boilerplate
+# Per-domain boilerplate learning and stripping.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Per-domain boilerplate learning and stripping.
+
+Readability summaries still contain navigation text, share button labels and
+newsletter footers that repeat on every page of an outlet. For each domain we
+count the number of documents that contain each paragraph (by the hash of its
+normalized text). Once a paragraph has been seen on enough pages of a domain
+it is boilerplate, and is dropped from new pages of that domain before they
+are sentence split and tagged.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import hashlib
+
+from django.db.models import F
+from partisan.utils import domain_host
+from django.db import transaction, IntegrityError
+
+from corpus.models import Domain, BoilerplateParagraph
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+MIN_COUNT = 3       # Minimum number of pages a boilerplate paragraph is on
+MIN_RATIO = 0.05    # Minimum proportion of the domain's pages it is on
+
+
+##########################################################################
+## Helper Functions
+##########################################################################
+
+def paragraph_digest(paragraph):
+    """
+    Returns the hex digest of the paragraph with its case and whitespace
+    normalized, so that trivially different copies have the same digest.
+    """
+    text = " ".join(paragraph.lower().split())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def threshold(documents):
+    """
+    Returns the number of pages a paragraph must be on to be boilerplate on
+    a domain that the model was learned from the given number of pages of.
+    """
+    return max(MIN_COUNT, MIN_RATIO * documents)
+
+
+##########################################################################
+## Boilerplate Model
+##########################################################################
+
+def learn(url, paragraphs):
+    """
+    Adds the paragraphs of a page to the boilerplate model of its domain,
+    incrementing the count of each distinct paragraph and of the documents
+    learned from.
+    """
+    host = domain_host(url)
+    if not host:
+        return
+
+    digests = set(paragraph_digest(paragraph) for paragraph in paragraphs)
+
+    with transaction.atomic():
+        domain, _ = Domain.objects.get_or_create(host=host)
+        Domain.objects.filter(host=host).update(documents=F('documents') + 1)
+
+        counts = BoilerplateParagraph.objects.filter(domain=domain, digest__in=digests)
+        counts.update(count=F('count') + 1)
+
+        missing = digests - set(counts.values_list('digest', flat=True))
+        for digest in missing:
+            try:
+                # Another process may have counted the paragraph in the meantime
+                with transaction.atomic():
+                    BoilerplateParagraph.objects.create(domain=domain, digest=digest, count=1)
+            except IntegrityError:
+                BoilerplateParagraph.objects.filter(domain=domain, digest=digest).update(
+                    count=F('count') + 1
+                )
+
+
+def strip(url, paragraphs):
+    """
+    Returns the paragraphs of a page that are not boilerplate on its domain,
+    i.e. that have not been seen on at least MIN_COUNT pages and MIN_RATIO
+    of the pages that the domain's model was learned from.
+    """
+    paragraphs = list(paragraphs)
+    try:
+        domain = Domain.objects.get(host=domain_host(url))
+    except Domain.DoesNotExist:
+        return paragraphs
+
+    digests = [paragraph_digest(paragraph) for paragraph in paragraphs]
+    boilerplate = set(
+        BoilerplateParagraph.objects.filter(
+            domain=domain, digest__in=digests,
+            count__gte=threshold(domain.documents),
+        ).values_list('digest', flat=True)
+    )
+
+    return [
+        paragraph for paragraph, digest in zip(paragraphs, digests)
+        if digest not in boilerplate
+    ]
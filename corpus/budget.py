@@ -0,0 +1,292 @@
+# corpus.budget
+# Bounds the cost of preprocessing a single document.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Bounds the cost of preprocessing a single document.
+
+Liveblogs, full bill texts and pages whose comment section is extracted can
+keep a web worker busy for a very long time. Two limits bound that cost:
+the paragraphs of a document are truncated to a maximum number of paragraphs
+and tokens before they are tagged, and the expensive stages can be run in an
+isolated worker process that is killed if it exceeds a wall clock budget.
+Documents that hit a limit are marked with the reason they were truncated.
+The isolated workers are a small persistent pool, so the paragraphs of a very
+long document can also be tagged in parallel within the same budget. The
+stages run within a deadline block share a single budget, so that extraction
+and tagging together take no longer than settings.PREPROCESS_TIMEOUT. Pool
+workers that are daemonic, e.g. those of the reprocess and bulk_import
+commands, cannot start isolated workers, so they run the stages themselves
+and are interrupted by an alarm signal when the budget runs out.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import time
+import signal
+import threading
+import multiprocessing
+
+from contextlib import contextmanager
+
+from partisan.utils import get_setting
+from corpus.exceptions import PreprocessTimeout
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Reasons that a document was truncated
+PARAGRAPHS = "paragraphs"
+TOKENS     = "tokens"
+TIMEOUT    = "timeout"
+
+# Default limits if not specified in settings (0 or None is unlimited)
+DEFAULT_MAX_PARAGRAPHS = 500
+DEFAULT_MAX_TOKENS     = 50000
+DEFAULT_TIMEOUT        = 30
+DEFAULT_WORKERS        = min(4, multiprocessing.cpu_count())
+
+# The isolated worker processes (started lazily by get_pool)
+_pool = None
+_pool_lock = threading.Lock()
+
+# The deadline shared by the isolated calls of this thread (see deadline)
+_local = threading.local()
+
+
+##########################################################################
+## Token Budget
+##########################################################################
+
+def truncate(paragraphs, max_paragraphs=None, max_tokens=None):
+    """
+    Truncates the paragraphs of a document to at most max_paragraphs
+    paragraphs and max_tokens tokens (cutting the last paragraph at a token
+    boundary if necessary). The limits default to the PREPROCESS_MAX_PARAGRAPHS
+    and PREPROCESS_MAX_TOKENS settings. Returns the paragraphs and the reason
+    they were truncated or None.
+    """
+    if max_paragraphs is None:
+        max_paragraphs = get_setting('PREPROCESS_MAX_PARAGRAPHS', DEFAULT_MAX_PARAGRAPHS)
+    if max_tokens is None:
+        max_tokens = get_setting('PREPROCESS_MAX_TOKENS', DEFAULT_MAX_TOKENS)
+
+    # Count tokens with the wordpunct pattern of the tokenizers
+    from corpus.nlp import RegexTokenizer
+
+    paragraphs = list(paragraphs)
+    reason = None
+
+    if max_paragraphs and len(paragraphs) > max_paragraphs:
+        paragraphs = paragraphs[:max_paragraphs]
+        reason = PARAGRAPHS
+
+    if max_tokens:
+        tokens = 0
+        for idx, paragraph in enumerate(paragraphs):
+            ends = [match.end() for match in RegexTokenizer.pattern.finditer(paragraph)]
+            if tokens + len(ends) > max_tokens:
+                remaining = max_tokens - tokens
+                paragraphs = paragraphs[:idx]
+                if remaining:
+                    paragraphs.append(paragraph[:ends[remaining-1]])
+                return paragraphs, TOKENS
+            tokens += len(ends)
+
+    return paragraphs, reason
+
+
+##########################################################################
+## Wall Clock Budget
+##########################################################################
+
+def _init_isolated():
+    """
+    Loads the NLP models in the isolated worker when it is started.
+    """
+    from corpus.nlp import _init_worker
+    _init_worker()
+
+
+def get_pool():
+    """
+    Returns the pool of isolated workers, starting settings.PREPROCESS_WORKERS
+    worker processes if it has not been started or was terminated.
+
+    Every process that preprocesses documents starts its own pool on its
+    first isolated call, e.g. each gunicorn worker that saves a processed
+    document and each ingest command, and each worker process loads its own
+    tokenizer and tagger. A web server with W gunicorn workers can therefore
+    run W * (PREPROCESS_WORKERS + 1) processes that hold the NLP models.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = get_setting('PREPROCESS_WORKERS', DEFAULT_WORKERS) or 1
+            _pool = multiprocessing.Pool(workers, initializer=_init_isolated)
+        return _pool
+
+
+@contextmanager
+def deadline(timeout=None):
+    """
+    Shares a single wall clock budget of timeout seconds (default
+    settings.PREPROCESS_TIMEOUT, 0 is unlimited) between the isolated calls
+    made in the block, each of which is given the time that remains. A block
+    nested in another deadline block ends no later than the outer block.
+    """
+    if timeout is None:
+        timeout = get_setting('PREPROCESS_TIMEOUT', DEFAULT_TIMEOUT)
+
+    previous = getattr(_local, 'deadline', None)
+    _local.deadline = time.time() + timeout if timeout else 0
+
+    # A nested block cannot extend the budget of the block it is in
+    if previous and (not _local.deadline or previous < _local.deadline):
+        _local.deadline = previous
+
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def remaining(timeout=None):
+    """
+    Returns the timeout if given, otherwise the seconds left before the
+    deadline of the current block or settings.PREPROCESS_TIMEOUT outside
+    of one. Raises a PreprocessTimeout if the deadline has passed.
+    """
+    if timeout is not None:
+        return timeout
+
+    end = getattr(_local, 'deadline', None)
+    if end is None:
+        return get_setting('PREPROCESS_TIMEOUT', DEFAULT_TIMEOUT)
+    if not end:
+        return 0
+
+    left = end - time.time()
+    if left <= 0:
+        raise PreprocessTimeout("preprocessing ran out of time")
+    return left
+
+
+def _wait(pool, result, name, timeout):
+    """
+    Returns the value of the async result, terminating the pool and raising
+    a PreprocessTimeout if it is not ready within timeout seconds.
+    """
+    global _pool
+
+    try:
+        return result.get(timeout or None)
+    except multiprocessing.TimeoutError:
+        with _pool_lock:
+            pool.terminate()
+            if _pool is pool:
+                _pool = None
+
+        raise PreprocessTimeout(
+            "{} did not finish in {:0.1f} seconds".format(name, timeout)
+        )
+
+
+@contextmanager
+def _alarm(timeout):
+    """
+    Raises a PreprocessTimeout in the block if it takes longer than timeout
+    seconds (0 is unlimited), which bounds the stages that daemonic workers
+    run themselves. The alarm is only set in the main thread of a process,
+    where signals are handled, and is checked when the interpreter regains
+    control, so a single long call into a C extension finishes first. Errors
+    raised after the alarm (e.g. when a library wraps the timeout in its own
+    exception) are raised as a PreprocessTimeout.
+    """
+    if not timeout or not hasattr(signal, 'setitimer') or \
+            threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    fired = []
+
+    def expire(signum, frame):
+        fired.append(signum)
+        raise PreprocessTimeout("preprocessing ran out of time")
+
+    # Restore an alarm that was set outside the block when it ends
+    started = time.time()
+    handler = signal.signal(signal.SIGALRM, expire)
+    outer, _ = signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    except Exception:
+        if fired:
+            raise PreprocessTimeout("preprocessing did not finish in {:0.1f} seconds".format(timeout))
+        raise
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+        if outer:
+            signal.setitimer(signal.ITIMER_REAL, max(outer - (time.time() - started), 0.001))
+
+
+def run_isolated(func, *args, timeout=None):
+    """
+    Calls the function with the arguments in an isolated worker process and
+    returns its result, raising a PreprocessTimeout if it does not return
+    within timeout seconds (default the time remaining, see remaining), in
+    which case the workers are killed and replaced on the next call. The
+    function must be a module level function that does not use the database.
+
+    If the timeout is 0 the function is called in this process. If this is
+    already a daemonic worker process (e.g. in a pool of the reprocess
+    command, which cannot start processes) the function is also called in
+    this process, which is interrupted with a PreprocessTimeout if it takes
+    longer than the timeout (see _alarm).
+    """
+    timeout = remaining(timeout)
+    if not timeout:
+        return func(*args)
+
+    if multiprocessing.current_process().daemon:
+        with _alarm(timeout):
+            return func(*args)
+
+    pool = get_pool()
+    return _wait(pool, pool.apply_async(func, args), func.__name__, timeout)
+
+
+def map_isolated(func, items, timeout=None):
+    """
+    Applies the function to each of the items across the isolated workers,
+    returning the results in the same order as the items, with the same
+    wall clock budget for all of them as run_isolated. If the timeout is 0
+    the workers are not killed. In a daemonic worker process the function
+    is applied in this process, checking the time that remains before each
+    item and interrupting it when the budget runs out.
+    """
+    timeout = remaining(timeout)
+
+    if multiprocessing.current_process().daemon:
+        if not timeout:
+            return [func(item) for item in items]
+
+        end, results = time.time() + timeout, []
+        with _alarm(timeout):
+            for item in items:
+                if time.time() > end:
+                    raise PreprocessTimeout(
+                        "{} did not finish in {:0.1f} seconds".format(func.__name__, timeout)
+                    )
+                results.append(func(item))
+        return results
+
+    pool = get_pool()
+    return _wait(pool, pool.map_async(func, items, 1), func.__name__, timeout)
@@ -0,0 +1,261 @@
+# corpus.bulk
+# Imports and queues many documents at a time.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Imports and queues many documents at a time.
+
+Seeding the corpus with thousands of urls one request at a time runs the full
+pipeline for each url in turn. Instead, import_urls fetches the pages
+concurrently with asyncio, bounded by a semaphore, using the pooled client in
+a thread pool, hands the html to the CPU worker pool of preprocess_many, then
+creates the documents and annotations in bulk. The batch API endpoint uses
+enqueue, which creates the documents in bulk in the pending state so that the
+ingestion workers fetch and process them.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import asyncio
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.utils import timezone
+from django.db import connections, transaction, IntegrityError
+
+from corpus.bitly import lookup
+from corpus.client import fetch
+from corpus.models import Document, Annotation
+from corpus.nlp import preprocess_many
+from corpus.features import store_features
+from corpus.ingest import process_page
+from corpus.boilerplate import learn
+from corpus import language
+from corpus.dedupe import find_duplicate, index_document
+from corpus.exceptions import CorpusException
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Outcomes of importing or queueing a url
+CREATED = "created"
+SKIPPED = "skipped"
+EXISTS  = "exists"
+QUEUED  = "queued"
+FAILED  = "failed"
+
+# Default number of pages fetched at the same time
+DEFAULT_CONCURRENCY = 16
+
+# The outcome of a url, the id of its document (if any) and the error
+Outcome = namedtuple('Outcome', 'url, outcome, document, error')
+
+
+##########################################################################
+## Concurrent Fetching
+##########################################################################
+
+async def _fetch_all(loop, executor, urls, concurrency, callback):
+    """
+    Fetches the urls in the executor with at most concurrency at a time.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(url):
+        async with semaphore:
+            try:
+                result = await loop.run_in_executor(executor, fetch, url)
+                result = (url, result, None)
+            except CorpusException as e:
+                result = (url, None, e)
+
+        if callback is not None:
+            callback(*result)
+        return result
+
+    return await asyncio.gather(*[fetch_one(url) for url in urls])
+
+
+def fetch_all(urls, concurrency=DEFAULT_CONCURRENCY, callback=None):
+    """
+    Fetches the urls concurrently, returning a list of (url, fetched, error)
+    tuples in the same order as the urls. The
+    callback is called with each tuple as soon as its url is fetched, e.g.
+    to report progress.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return loop.run_until_complete(
+                _fetch_all(loop, executor, urls, concurrency, callback)
+            )
+    finally:
+        loop.close()
+
+
+##########################################################################
+## Bulk Creation
+##########################################################################
+
+def existing_documents(urls):
+    """
+    Returns a dict of the long url to the id and state of stored documents.
+    """
+    query = Document.objects.filter(long_url__in=urls)
+    return {
+        url: (pk, state)
+        for url, pk, state in query.values_list('long_url', 'id', 'state')
+    }
+
+
+def create_documents(documents):
+    """
+    Inserts the unsaved documents in bulk (which does not send the save
+    signals) and returns a dict of the long url to the id of each document
+    and the set of the urls that were inserted. If another process stored
+    one of the urls in the meantime, they are inserted one at a time
+    instead, keeping the stored documents, whose urls are not in the set.
+    """
+    created = set(document.long_url for document in documents)
+    try:
+        with transaction.atomic():
+            Document.objects.bulk_create(documents)
+    except IntegrityError:
+        for document in documents:
+            try:
+                with transaction.atomic():
+                    Document.objects.bulk_create([document])
+            except IntegrityError:
+                created.discard(document.long_url)
+
+    urls = [document.long_url for document in documents]
+    ids = dict(Document.objects.filter(long_url__in=urls).values_list('long_url', 'id'))
+    return ids, created
+
+
+def annotate(user, ids):
+    """
+    Associates the user with the documents they are not yet associated with.
+    """
+    if user is None:
+        return
+
+    annotated = set(
+        Annotation.objects.filter(user=user, document_id__in=ids).values_list('document_id', flat=True)
+    )
+    Annotation.objects.bulk_create([
+        Annotation(user=user, document_id=pk) for pk in ids if pk not in annotated
+    ])
+
+
+def enqueue(urls, user=None):
+    """
+    Creates pending documents in bulk for the urls that are not stored, so
+    that they are fetched and processed by the ingestion workers, and queues
+    the documents that failed to be ingested again. Associates the user with
+    every document and returns the outcome of each url.
+    """
+    urls = list(dict.fromkeys(urls))
+    existing = existing_documents(urls)
+
+    failed = [url for url, (_, state) in existing.items() if state == Document.FAILED]
+    Document.objects.filter(long_url__in=failed).update(
+        state=Document.PENDING, attempts=0, error=None, modified=timezone.now()
+    )
+
+    ids, created = create_documents([
+        Document(long_url=url, state=Document.PENDING)
+        for url in urls if url not in existing
+    ])
+    ids.update((url, pk) for url, (pk, _) in existing.items())
+    annotate(user, list(ids.values()))
+
+    queued = created | set(failed)
+    return [
+        Outcome(url, QUEUED if url in queued else EXISTS, ids.get(url), None)
+        for url in urls
+    ]
+
+
+def import_urls(urls, user=None, concurrency=DEFAULT_CONCURRENCY, workers=None, chunksize=4, callback=None):
+    """
+    Fetches the urls that are not stored concurrently, preprocesses the pages
+    on a pool of worker processes, then creates the processed documents in
+    bulk and indexes them. Associates the user with every document and
+    returns the outcome of each url; urls that could not be fetched or
+    processed are not stored. Short urls are only taken from the cache. The
+    callback is passed to fetch_all.
+    """
+    urls = list(dict.fromkeys(urls))
+    existing = existing_documents(urls)
+    outcomes = {
+        url: Outcome(url, EXISTS, pk, None) for url, (pk, _) in existing.items()
+    }
+
+    fetched = fetch_all([url for url in urls if url not in existing], concurrency, callback)
+    for url, _, error in fetched:
+        if error is not None:
+            outcomes[url] = Outcome(url, FAILED, None, error)
+    fetched = [(url, result) for url, result, error in fetched if error is None]
+
+    # The pool is forked as the results are consumed, so the pages are
+    # processed before writing and each worker opens its own connection
+    connections.close_all()
+    processed = list(preprocess_many(
+        ((url, page.text) for url, page in fetched), workers=workers,
+        chunksize=chunksize, func=process_page,
+    ))
+
+    documents, features, boilerplate = [], {}, {}
+    shortened = lookup(url for url, _ in fetched)
+    for (url, page), (result, error) in zip(fetched, processed):
+        if error is not None:
+            outcomes[url] = Outcome(url, FAILED, None, error)
+            continue
+
+        fields, features[url], boilerplate[url] = result
+        language.record(fields['skipped'], len(page.text))
+        documents.append(Document(
+            long_url=url, short_url=shortened.get(url), raw_html=page.text,
+            etag=page.etag, last_modified=page.last_modified,
+            state=Document.PROCESSED, **fields
+        ))
+
+    ids, created = create_documents(documents)
+    for document in documents:
+        document.id = ids.get(document.long_url)
+        if document.id is None:
+            continue
+
+        # Keep the features and index of documents another process stored
+        if document.long_url not in created:
+            outcomes[document.long_url] = Outcome(document.long_url, EXISTS, document.id, None)
+            continue
+
+        # Link near-duplicates in order, so later pages link to earlier ones
+        with transaction.atomic():
+            if document.minhash:
+                document.duplicate_of = find_duplicate(document.minhash, exclude=document.id)
+                if document.duplicate_of is not None:
+                    Document.objects.filter(id=document.id).update(duplicate_of=document.duplicate_of)
+                index_document(document)
+
+            if features[document.long_url] is not None:
+                store_features(document.id, features[document.long_url])
+
+        # Add the stored page to the boilerplate model of its domain
+        if boilerplate[document.long_url]:
+            learn(document.long_url, boilerplate[document.long_url])
+
+        outcomes[document.long_url] = Outcome(
+            document.long_url, SKIPPED if document.skipped else CREATED, document.id, None
+        )
+
+    annotate(user, [outcome.document for outcome in outcomes.values() if outcome.document])
+    return [outcomes[url] for url in urls]
@@ -0,0 +1,150 @@
+# corpus.cache
+# Content-addressed cache of preprocessed text.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Content-addressed cache of preprocessed text.
+
+The cache is stored in the preprocess_cache table and keyed by a hash of the
+preprocessor version and the paragraphs extracted from a page, so it is
+shared by every process that preprocesses documents. Summing the size of the
+cache is a scan of the table, so entries are not evicted as they are stored;
+instead the ingest worker (when the queue empties), the reprocess command
+(after each batch) and the evict_cache command evict the least recently used
+entries once the cache is larger than settings.PREPROCESS_CACHE_SIZE.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import hashlib
+
+from collections import Counter
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import F, Sum
+from django.db import transaction, IntegrityError
+
+from corpus.models import PreprocessCache
+from corpus.fields import TaggedContent, encode_content
+from corpus.nlp import Preprocessed, tag_paragraphs, preprocessor_version
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# The default maximum size in bytes of the cache
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Cache hits and misses in this process
+counts = Counter(hits=0, misses=0)
+
+
+##########################################################################
+## Cache Functions
+##########################################################################
+
+def cache_key(paragraphs, version=None):
+    """
+    Returns the hex digest of the preprocessor version and the paragraphs.
+    """
+    digest = hashlib.sha256((version or preprocessor_version()).encode('utf-8'))
+    for paragraph in paragraphs:
+        digest.update(b"\x00")
+        digest.update(paragraph.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def lookup(key):
+    """
+    Returns the cached content for the key or None, recording the access.
+    """
+    try:
+        entry = PreprocessCache.objects.get(key=key)
+    except PreprocessCache.DoesNotExist:
+        counts['misses'] += 1
+        return None
+
+    counts['hits'] += 1
+    PreprocessCache.objects.filter(key=key).update(
+        hits=F('hits') + 1, accessed=timezone.now()
+    )
+    return entry.content
+
+
+def store(key, content):
+    """
+    Adds the preprocessed content to the cache (see evict for its size).
+    """
+    data  = encode_content(content)
+    entry = PreprocessCache(key=key, content=TaggedContent(data), size=len(data))
+
+    try:
+        with transaction.atomic():
+            entry.save(force_insert=True)
+    except IntegrityError:
+        # Another process has cached the same text in the meantime
+        return
+
+
+def evict(limit=None):
+    """
+    Deletes the least recently used entries until the total size of the
+    cache is no more than the limit, returning the number of bytes freed.
+    Sums the size of every entry, so it is run periodically rather than on
+    every store.
+    """
+    if limit is None:
+        limit = getattr(settings, 'PREPROCESS_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    total  = PreprocessCache.objects.aggregate(total=Sum('size'))['total'] or 0
+    excess = total - limit
+    if excess <= 0:
+        return 0
+
+    freed, keys = 0, []
+    for key, size in PreprocessCache.objects.order_by('accessed').values_list('key', 'size').iterator():
+        if freed >= excess: break
+        keys.append(key)
+        freed += size
+
+    PreprocessCache.objects.filter(key__in=keys).delete()
+    return freed
+
+
+def cache_stats():
+    """
+    Returns the hit and miss counts of this process as well as the number of
+    entries, total size and total hits of the shared cache.
+    """
+    totals = PreprocessCache.objects.aggregate(size=Sum('size'), hits=Sum('hits'))
+    return {
+        'hits': counts['hits'],
+        'misses': counts['misses'],
+        'entries': PreprocessCache.objects.count(),
+        'size': totals['size'] or 0,
+        'total_hits': totals['hits'] or 0,
+    }
+
+
+def cached_tag_paragraphs(paragraphs):
+    """
+    Returns the preprocessed paragraphs from the cache if they have been
+    preprocessed before, otherwise tags them (in the isolated workers, which
+    raise a PreprocessTimeout if tagging takes too long) and caches the
+    result.
+    """
+    paragraphs = list(paragraphs)
+    key = cache_key(paragraphs)
+
+    content = lookup(key)
+    if content is not None:
+        return Preprocessed(content, content.stats)
+
+    preprocessed = tag_paragraphs(paragraphs, isolated=True)
+    store(key, preprocessed.content)
+    return preprocessed
@@ -0,0 +1,388 @@
+# corpus.client
+# Shared HTTP client for fetching pages and calling web APIs.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Shared HTTP client for fetching pages and calling web APIs.
+
+Every request is made with a session that is shared by the thread (sessions
+are not shared across processes, so forked workers open their own), which
+keeps a pool of persistent connections per host so that repeated requests to
+the same outlet or API do not pay for a new TCP and TLS handshake. Requests
+have connect and read timeouts so that a slow origin cannot hang a worker,
+and ask for gzip compressed responses. Fetches can be conditional on the
+ETag and Last-Modified validators of an earlier response, in which case an
+unchanged page is not downloaded again.
+
+Pages are streamed rather than read into memory all at once: responses that
+are not HTML are rejected from their content type or, if it is missing or
+generic, from their first bytes, and the download is abandoned if the page is
+larger than settings.FETCH_MAX_BYTES or takes longer than
+settings.FETCH_MAX_SECONDS, in which case the connection is shut down at the
+deadline, even if the server is still trickling bytes into the current read.
+The body is decoded incrementally as it arrives,
+with the charset of the content type, the byte order mark or the meta tag of
+the page, and only if none of those are given the charset detected from the
+first bytes of the page.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import re
+import codecs
+import socket
+import requests
+import threading
+
+from collections import namedtuple
+from chardet.universaldetector import UniversalDetector
+from partisan.version import get_version
+from requests.adapters import HTTPAdapter
+from partisan.utils import get_setting
+from corpus.exceptions import FetchError
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Default seconds to wait to connect to a host and between bytes of the response
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT    = 30
+
+# Default number of hosts to keep connection pools for and connections per host
+DEFAULT_POOL_HOSTS = 32
+DEFAULT_POOL_SIZE  = 8
+
+# Default maximum size in bytes and seconds to download a page
+DEFAULT_MAX_BYTES   = 5 * 1024 * 1024
+DEFAULT_MAX_SECONDS = 60
+
+# Size of the chunks the page is streamed in and of the head that is sniffed
+CHUNK_SIZE = 16 * 1024
+SNIFF_SIZE = 1024
+
+# Maximum bytes fed to the charset detector before giving up on it
+DETECT_SIZE = 64 * 1024
+
+# Content types of HTML pages, and generic types whose first bytes are sniffed
+HTML_TYPES    = ('text/html', 'application/xhtml+xml')
+SNIFFED_TYPES = ('', 'text/plain', 'application/octet-stream', 'binary/octet-stream')
+
+# The start of a HTML page (after any whitespace and comments)
+HTML_START = re.compile(
+    br'^(?:\s|<!--.*?-->)*<(?:!doctype\s+html|html|head|body|title|meta|script|div|p)[\s>/]',
+    re.IGNORECASE | re.DOTALL
+)
+
+# The charset declared in the meta tags of a HTML page
+META_CHARSET = re.compile(br'<meta[^>]+charset\s*=\s*["\']?\s*([-\w.:]+)', re.IGNORECASE)
+
+# The magic numbers of common binary formats (PDF, images, archives, video)
+BINARY_MAGIC = (
+    b'%PDF', b'\x89PNG', b'GIF8', b'\xff\xd8\xff', b'PK\x03\x04', b'\x1f\x8b',
+    b'ID3', b'OggS', b'\x1a\x45\xdf\xa3', b'RIFF',
+)
+
+# Byte order marks and the codec that decodes the text after them
+UTF16_BOMS = (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Charsets that browsers decode as windows-1252
+WINDOWS_1252 = ('ascii', 'us-ascii', 'iso-8859-1', 'latin-1', 'latin1')
+
+# Headers sent with every request
+HEADERS = {
+    'User-Agent': 'partisan/{} (+https://github.com/DistrictDataLabs/partisan-discourse)'.format(
+        get_version(short=True)
+    ),
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+# The sessions of each thread (constructed lazily by get_session)
+_local = threading.local()
+
+
+##########################################################################
+## Helper Functions
+##########################################################################
+
+def get_timeout():
+    """
+    Returns the (connect, read) timeout from settings.FETCH_CONNECT_TIMEOUT
+    and settings.FETCH_READ_TIMEOUT.
+    """
+    return (
+        get_setting('FETCH_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        get_setting('FETCH_READ_TIMEOUT', DEFAULT_READ_TIMEOUT),
+    )
+
+
+def get_session():
+    """
+    Returns the session of this thread, creating it with connection pools of
+    settings.FETCH_POOL_SIZE connections for settings.FETCH_POOL_HOSTS hosts
+    if this thread or process does not have one yet.
+    """
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        adapter = HTTPAdapter(
+            pool_connections=get_setting('FETCH_POOL_HOSTS', DEFAULT_POOL_HOSTS),
+            pool_maxsize=get_setting('FETCH_POOL_SIZE', DEFAULT_POOL_SIZE),
+        )
+
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        _local.session, _local.pid = session, pid
+    return _local.session
+
+
+##########################################################################
+## Content Sniffing
+##########################################################################
+
+def content_type(response):
+    """
+    Returns the lowercase mimetype and charset (or None) of the response.
+    """
+    mimetype, _, params = response.headers.get('Content-Type', '').partition(';')
+    match = re.search(r'charset\s*=\s*["\']?([-\w.:]+)', params, re.IGNORECASE)
+    return mimetype.strip().lower(), match.group(1) if match else None
+
+
+def get_codec(charset):
+    """
+    Returns the name of the codec of the charset, or None if it is unknown.
+    """
+    if isinstance(charset, bytes):
+        charset = charset.decode('ascii', 'ignore')
+    if not charset:
+        return None
+
+    if charset.lower() in WINDOWS_1252:
+        return 'cp1252'
+
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def is_binary(head):
+    """
+    Returns True if the first bytes of a page are those of a binary format.
+    """
+    if head.startswith(UTF16_BOMS):
+        return False
+    return head.startswith(BINARY_MAGIC) or head[4:8] == b'ftyp' or b'\x00' in head[:SNIFF_SIZE]
+
+
+def is_html(head):
+    """
+    Returns True if the first bytes of a page look like the start of HTML.
+    """
+    head = head[:SNIFF_SIZE]
+    if head.startswith(UTF16_BOMS):
+        head = head.decode('utf-16', 'ignore').encode('utf-8')
+    elif head.startswith(codecs.BOM_UTF8):
+        head = head[len(codecs.BOM_UTF8):]
+    return HTML_START.match(head) is not None
+
+
+def sniff_charset(head):
+    """
+    Returns the codec of the byte order mark or meta charset of the first
+    bytes of a page, or None if neither is declared.
+    """
+    for bom, codec in BOMS:
+        if head.startswith(bom):
+            return codec
+
+    match = META_CHARSET.search(head[:SNIFF_SIZE])
+    return get_codec(match.group(1)) if match else None
+
+
+##########################################################################
+## Streaming
+##########################################################################
+
+def abandon(response, expired):
+    """
+    Marks the download of the response as expired and shuts down its socket,
+    which interrupts a read that is blocked waiting for the rest of a chunk.
+    """
+    expired.set()
+    try:
+        sock = socket.fromfd(response.raw.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        finally:
+            sock.close()
+    except (OSError, ValueError):
+        # The body was already read and its connection released
+        pass
+
+
+def stream(response, max_bytes, max_seconds):
+    """
+    Yields the decompressed chunks of the body of the response, raising a
+    FetchError as soon as it is larger than max_bytes bytes or has taken
+    longer than max_seconds seconds to download. A read only returns once
+    its chunk is full, so a timer abandons the download at the deadline
+    rather than waiting for a server that sends a few bytes at a time.
+    """
+    length = response.headers.get('Content-Length', '')
+    if max_bytes and length.isdigit() and int(length) > max_bytes:
+        raise FetchError("page is larger than {:,} bytes".format(max_bytes))
+
+    size, expired, timer = 0, threading.Event(), None
+    if max_seconds:
+        timer = threading.Timer(max_seconds, abandon, (response, expired))
+        timer.daemon = True
+        timer.start()
+
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if expired.is_set():
+                break
+            size += len(chunk)
+            if max_bytes and size > max_bytes:
+                raise FetchError("page is larger than {:,} bytes".format(max_bytes))
+            yield chunk
+    except Exception:
+        # The shut down connection ends the read with an error or early
+        if not expired.is_set():
+            raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+    if expired.is_set():
+        raise FetchError("page took longer than {} seconds to download".format(max_seconds))
+
+
+def read_html(response, max_bytes=None, max_seconds=None):
+    """
+    Streams the body of the response and returns it decoded as text, raising
+    a FetchError if it is not an HTML page or exceeds the size or time limits
+    (default settings.FETCH_MAX_BYTES and settings.FETCH_MAX_SECONDS). The
+    page is sniffed and decoded incrementally as the chunks arrive.
+    """
+    if max_bytes is None:
+        max_bytes = get_setting('FETCH_MAX_BYTES', DEFAULT_MAX_BYTES)
+    if max_seconds is None:
+        max_seconds = get_setting('FETCH_MAX_SECONDS', DEFAULT_MAX_SECONDS)
+
+    mimetype, charset = content_type(response)
+    if mimetype not in HTML_TYPES and mimetype not in SNIFFED_TYPES:
+        raise FetchError("not an HTML page: {}".format(mimetype))
+
+    # Read enough of the page to sniff its type and charset
+    chunks = stream(response, max_bytes, max_seconds)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= SNIFF_SIZE:
+            break
+
+    if is_binary(head) or (mimetype not in HTML_TYPES and not is_html(head)):
+        raise FetchError("not an HTML page: {}".format(mimetype or "no content type"))
+
+    # Only detect the charset if it is not declared, and only from the start
+    codec = get_codec(charset) or sniff_charset(head)
+    if codec is None:
+        detector = UniversalDetector()
+        detector.feed(head)
+        while not detector.done and len(head) < DETECT_SIZE:
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            head += chunk
+            detector.feed(chunk)
+
+        detector.close()
+        codec = get_codec(detector.result['encoding']) or 'utf-8'
+
+    decoder = codecs.getincrementaldecoder(codec)(errors='replace')
+    text = [decoder.decode(head)]
+    for chunk in chunks:
+        text.append(decoder.decode(chunk))
+    text.append(decoder.decode(b"", final=True))
+    return "".join(text)
+
+
+##########################################################################
+## Requests
+##########################################################################
+
+# The result of a fetch; text is None if the page was not modified
+Fetched = namedtuple('Fetched', 'url, status, text, etag, last_modified')
+
+
+def get(url, params=None, headers=None, timeout=None, **kwargs):
+    """
+    Makes a GET request with the shared session and the default timeout,
+    returning the response. Raises the requests exceptions.
+    """
+    return get_session().get(
+        url, params=params, headers=headers, timeout=timeout or get_timeout(), **kwargs
+    )
+
+
+def fetch(url, etag=None, last_modified=None, timeout=None, max_bytes=None):
+    """
+    Fetches the page at the url, raising a FetchError if it could not be
+    fetched, the response has a bad status code or is not an HTML page, or the
+    page is too large or slow to download (see read_html). If the ETag or the
+    Last-Modified date of an earlier response are given the request is
+    conditional, and if the page has not changed since then the status is 304
+    and the text is None. The validators of the response are returned so that
+    the next fetch of the url can be conditional.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    try:
+        response = get(url, headers=headers, timeout=timeout, stream=True)
+    except Exception as e:
+        raise FetchError(
+            "Could not fetch document: {}".format(e)
+        )
+
+    # Closing the response returns the connection to the pool if the body
+    # was read, otherwise discards it so an abandoned download is not reused
+    try:
+        response.raise_for_status()
+        if response.status_code == 304:
+            return Fetched(
+                url, 304, None, response.headers.get('ETag', etag),
+                response.headers.get('Last-Modified', last_modified),
+            )
+
+        text = read_html(response, max_bytes)
+    except Exception as e:
+        raise FetchError(
+            "Could not fetch document: {}".format(e)
+        )
+    finally:
+        response.close()
+
+    return Fetched(
+        response.url, response.status_code, text,
+        response.headers.get('ETag'), response.headers.get('Last-Modified'),
+    )
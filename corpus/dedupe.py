@@ -0,0 +1,153 @@
+# corpus.dedupe
+# Near-duplicate detection of documents with MinHash and LSH.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Near-duplicate detection of documents with MinHash and LSH.
+
+Syndicated stories are published under many urls with small differences in
+the markup and surrounding text, so the signature of the text does not match
+them. Instead each document is described by the set of its word shingles,
+summarized by a MinHash signature whose agreement with another signature
+estimates the Jaccard similarity of the two shingle sets. The signature is
+split into bands and each band is hashed into a bucket; documents that share
+a bucket are candidates whose signatures are then compared directly, so a
+new document is only compared to a handful of documents in the corpus.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import zlib
+import hashlib
+import numpy as np
+
+from operator import itemgetter
+from corpus.models import Document, LSHBucket
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+SHINGLE   = 5             # Number of words in each shingle
+NUM_PERM  = 128           # Number of hash functions in the signature
+BANDS     = 16            # Number of LSH bands the signature is split into
+ROWS      = 8             # Number of signature values per band
+THRESHOLD = 0.8           # Estimated Jaccard similarity of a near-duplicate
+PRIME     = np.uint64(2**31 - 1)  # The Mersenne prime 2^31 - 1
+
+# The hash functions are (a*x + b) % PRIME, seeded so they never change. The
+# shingles are reduced mod PRIME first, so a*x + b is less than 2^63 and does
+# not wrap around in unsigned 64-bit arithmetic.
+_random = np.random.RandomState(42)
+_A = _random.randint(1, 2**31 - 1, size=NUM_PERM).astype(np.uint64)
+_B = _random.randint(0, 2**31 - 1, size=NUM_PERM).astype(np.uint64)
+
+
+##########################################################################
+## MinHash Signatures
+##########################################################################
+
+def shingles(content, k=SHINGLE):
+    """
+    Returns the set of hashed k-word shingles of the preprocessed content,
+    using the lowercase words (ignoring punctuation) of the entire document.
+    """
+    words = [
+        token.lower()
+        for paragraph in content
+        for sentence in paragraph
+        for token, _ in sentence
+        if any(char.isalnum() for char in token)
+    ]
+
+    # Documents shorter than a shingle are represented by a single shingle
+    return set(
+        zlib.crc32(" ".join(words[idx:idx+k]).encode('utf-8'))
+        for idx in range(max(len(words) - k + 1, 1 if words else 0))
+    )
+
+
+def minhash(content):
+    """
+    Returns the MinHash signature of the content as a list of NUM_PERM
+    integers, or None if the content has no words.
+    """
+    values = np.fromiter(shingles(content), dtype=np.uint64) % PRIME
+    if not values.size:
+        return None
+
+    hashed = (np.outer(_A, values) + _B[:, np.newaxis]) % PRIME
+    return [int(value) for value in hashed.min(axis=1)]
+
+
+def similarity(signature, other):
+    """
+    Estimates the Jaccard similarity of two documents from the proportion
+    of their MinHash signatures that agree.
+    """
+    return sum(a == b for a, b in zip(signature, other)) / float(NUM_PERM)
+
+
+def buckets(signature):
+    """
+    Hashes each band of the signature into a signed 64-bit bucket id. The
+    band number is part of the hash so that buckets are distinct per band.
+    """
+    bands = np.asarray(signature, dtype='<u8').reshape(BANDS, ROWS)
+    return [
+        int.from_bytes(
+            hashlib.md5(bytes([band]) + rows.tobytes()).digest()[:8],
+            'little', signed=True,
+        )
+        for band, rows in enumerate(bands)
+    ]
+
+
+##########################################################################
+## LSH Index
+##########################################################################
+
+def find_duplicate(signature, exclude=None, threshold=THRESHOLD, before=None):
+    """
+    Returns the original document (one that is not itself a duplicate) that
+    is most similar to the signature if the estimated similarity is at least
+    the threshold, otherwise None. Only documents that share an LSH bucket
+    with the signature are compared. Exclude is a document id to ignore and
+    if before is given only documents created before it are compared.
+    """
+    candidates = LSHBucket.objects.filter(bucket__in=buckets(signature))
+    candidates = candidates.values_list('document_id', flat=True).distinct()
+
+    query = Document.objects.filter(id__in=candidates, duplicate_of=None)
+    if exclude is not None:
+        query = query.exclude(id=exclude)
+    if before is not None:
+        query = query.filter(created__lt=before)
+
+    # Score the candidates, preferring the earliest of equally similar ones
+    scores = [
+        (similarity(signature, document.minhash), document)
+        for document in query.only('id', 'minhash').order_by('created')
+    ]
+    scores = [score for score in scores if score[0] >= threshold]
+
+    if not scores:
+        return None
+    return max(scores, key=itemgetter(0))[1]
+
+
+def index_document(document):
+    """
+    Replaces the LSH buckets of the document with those of its signature.
+    """
+    LSHBucket.objects.filter(document=document).delete()
+    if document.minhash:
+        LSHBucket.objects.bulk_create([
+            LSHBucket(document=document, bucket=bucket)
+            for bucket in buckets(document.minhash)
+        ])
@@ -31,6 +31,13 @@ class BitlyAPIError(CorpusException):
     pass
 
 
+class BitlyRateLimit(BitlyAPIError):
+    """
+    The bit.ly API is throttling requests, so stop shortening for now.
+    """
+    pass
+
+
 class FetchError(CorpusException):
     """
     Something went wrong trying to fetch a url using requests.
@@ -38,8 +45,22 @@ class FetchError(CorpusException):
     pass
 
 
+class ExtractionError(CorpusException):
+    """
+    Something went wrong trying to extract text from html.
+    """
+    pass
+
+
 class NLTKError(CorpusException):
     """
     Something went wrong when using NLTK.
     """
     pass
+
+
+class PreprocessTimeout(CorpusException):
+    """
+    Preprocessing a document took longer than its time budget.
+    """
+    pass
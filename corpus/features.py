@@ -0,0 +1,99 @@
+# corpus.features
+# Stored training features of preprocessed documents.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Stored training features of preprocessed documents.
+
+Normalizing a document (stopword and punctuation filtering and WordNet
+lemmatization of every token) is the most expensive step of training and is
+the same for every fold and every model. The normalized lemmas of each
+document are instead computed by the ingestion worker and the bulk_import and
+reprocess commands and stored in the document_features table with the version
+of the preprocessor and the normalizer, and the corpus readers yield them
+when the version matches (normalizing documents without them). The statistics
+are not stored here since they are in the header of the content.
+
+The normalizer (and Scikit-Learn with it) is only imported when features are
+first computed, so that the web processes that import this module through the
+ingestion code do not load it.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import threading
+
+from corpus.models import DocumentFeatures
+from corpus.nlp import preprocessor_version
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# The process-wide normalizer (loaded lazily by get_normalizer)
+_normalizer = None
+_normalizer_lock = threading.Lock()
+
+
+##########################################################################
+## Feature Functions
+##########################################################################
+
+def features_version():
+    """
+    Identifies the preprocessor and normalizer that produce the features.
+    """
+    from corpus.learn import NORMALIZER_VERSION
+    return "norm-{}/{}".format(NORMALIZER_VERSION, preprocessor_version())
+
+
+def get_normalizer():
+    """
+    Returns the normalizer with the default stopwords shared by the process.
+    """
+    global _normalizer
+    if _normalizer is None:
+        with _normalizer_lock:
+            if _normalizer is None:
+                from corpus.learn import TextNormalizer
+                _normalizer = TextNormalizer()
+    return _normalizer
+
+
+def compute_features(content):
+    """
+    Normalizes the preprocessed content, returning its list of lemmas.
+    """
+    return get_normalizer().normalize(content)
+
+
+def store_features(document_id, lemmas, version=None):
+    """
+    Saves the lemmas of the document, replacing any older version.
+    """
+    DocumentFeatures.objects.update_or_create(
+        document_id=document_id, defaults={
+            'version': version or features_version(),
+            'lemmas': " ".join(lemmas),
+        }
+    )
+
+
+def load_features(document_ids, version=None):
+    """
+    Returns a dict of document id to the list of lemmas of the documents
+    that have features of the current version.
+    """
+    query = DocumentFeatures.objects.filter(
+        document_id__in=document_ids, version=version or features_version()
+    )
+
+    return {
+        document_id: lemmas.split()
+        for document_id, lemmas in query.values_list('document_id', 'lemmas')
+    }
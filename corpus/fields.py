@@ -0,0 +1,589 @@
+# corpus.fields
+# Custom model fields for storing preprocessed documents.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Custom model fields for storing preprocessed and fetched documents.
+
+Preprocessed content is a list of paragraphs, which is a list of sentences,
+which is a list of (token, tag) tuples. Rather than pickling those nested
+lists, the content is stored in a compact binary format: the distinct
+tokens, tags and (token, tag) pairs are interned into vocabularies, the text
+is stored as an array of pair ids, and the sentence and paragraph structure
+as arrays of lengths. A small uncompressed header stores the structural
+counts, the rest of the payload is zlib compressed.
+
+Fetched html is stored compressed with zstd, using the newest dictionary
+trained on stored pages by the compress_html command (pages share most of
+their markup, scripts and styles, which a dictionary compresses far better
+than a single page can), or with zlib if the optional zstandard package is
+not installed. The text is only decompressed when it is accessed.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import sys
+import zlib
+import struct
+import base64
+import threading
+
+from array import array
+from itertools import accumulate
+
+from django import forms
+from django.apps import apps
+from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Identifies the encoding and its version at the start of each value
+MAGIC   = b'PD'
+VERSION = 1
+
+# Version, paragraphs, sentences, words and (lowercase) vocabulary
+HEADER  = struct.Struct('<BIIII')
+
+# Each segment of the payload is a typecode and its length in bytes
+SEGMENT = struct.Struct('<cI')
+
+# Array typecodes (in order of preference) for non-negative integers
+TYPECODES = ('B', 'H', 'I', 'Q')
+
+# Identifies compressed text and the codecs it is compressed with
+TEXT_MAGIC = b'CT'
+ZLIB = 1
+ZSTD = 2
+
+# Codec, id of the compression dictionary (0 for none) and size in bytes
+TEXT_HEADER = struct.Struct('<BII')
+
+# Compression level of each codec
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+# The zstd dictionaries loaded by the process by id, and the id of the newest
+_dictionaries = {}
+_current = None
+_dictionary_lock = threading.Lock()
+
+
+##########################################################################
+## Encoding and Decoding
+##########################################################################
+
+def _narrow(values, maximum):
+    """
+    Returns the values in the smallest array type that can hold the maximum.
+    """
+    for typecode in TYPECODES:
+        if maximum < 1 << (8 * array(typecode).itemsize):
+            return array(typecode, values)
+    raise ValueError("{} is too large to encode".format(maximum))
+
+
+def _pack(buf, typecode, data):
+    """
+    Appends a typed, length prefixed segment to the buffer.
+    """
+    buf.append(SEGMENT.pack(typecode.encode('ascii'), len(data)))
+    buf.append(data)
+
+
+def _pack_array(buf, values):
+    """
+    Appends an array of integers to the buffer in little endian order.
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    _pack(buf, values.typecode, values.tobytes())
+
+
+def _pack_strings(buf, strings):
+    """
+    Appends a list of strings to the buffer as an array of their lengths
+    followed by the utf-8 encoding of their concatenation.
+    """
+    _pack_array(buf, _narrow(map(len, strings), max(map(len, strings), default=0)))
+    _pack(buf, 's', "".join(strings).encode('utf-8'))
+
+
+def _unpack(data, offset):
+    """
+    Reads the segment at the offset, returning its value and the offset of
+    the next segment. Integer segments are returned as arrays.
+    """
+    typecode, length = SEGMENT.unpack_from(data, offset)
+    offset += SEGMENT.size
+    segment = data[offset:offset+length]
+
+    typecode = typecode.decode('ascii')
+    if typecode == 's':
+        return segment.decode('utf-8'), offset + length
+
+    values = array(typecode)
+    values.frombytes(segment)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, offset + length
+
+
+def _unpack_strings(data, offset):
+    """
+    Reads a list of strings packed by _pack_strings.
+    """
+    lengths, offset = _unpack(data, offset)
+    text, offset = _unpack(data, offset)
+    bounds = list(accumulate(lengths))
+    return [
+        text[end-size:end] for size, end in zip(lengths, bounds)
+    ], offset
+
+
+def _split(items, lengths):
+    """
+    Splits a flat list into consecutive slices of the given lengths.
+    """
+    start = 0
+    parts = []
+    for length in lengths:
+        parts.append(items[start:start+length])
+        start += length
+    return parts
+
+
+def encode_content(content):
+    """
+    Encodes preprocessed content (paragraphs of sentences of (token, tag)
+    pairs) into the compact binary format.
+    """
+    tokens, tags, pairs = {}, {}, {}
+    pair_tokens, pair_tags, stream = [], [], []
+    sent_lens, para_lens = [], []
+
+    for paragraph in content:
+        para_lens.append(len(paragraph))
+        for sentence in paragraph:
+            sent_lens.append(len(sentence))
+            for token, tag in sentence:
+                pair = pairs.get((token, tag))
+                if pair is None:
+                    pair = pairs[(token, tag)] = len(pairs)
+                    pair_tokens.append(tokens.setdefault(token, len(tokens)))
+                    pair_tags.append(tags.setdefault(tag, len(tags)))
+                stream.append(pair)
+
+    vocab  = len(set(token.lower() for token in tokens))
+    header = HEADER.pack(VERSION, len(para_lens), len(sent_lens), len(stream), vocab)
+
+    body = []
+    _pack_strings(body, list(tokens))
+    _pack_strings(body, list(tags))
+    _pack_array(body, _narrow(pair_tokens, len(tokens)))
+    _pack_array(body, _narrow(pair_tags, len(tags)))
+    _pack_array(body, _narrow(stream, len(pairs)))
+    _pack_array(body, _narrow(sent_lens, max(sent_lens, default=0)))
+    _pack_array(body, _narrow(para_lens, max(para_lens, default=0)))
+
+    return MAGIC + header + zlib.compress(b"".join(body))
+
+
+def decode_header(data):
+    """
+    Returns the version, paragraph, sentence, word and vocabulary counts of
+    encoded content without decompressing the payload.
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("data is not encoded preprocessed content")
+
+    header = HEADER.unpack_from(data, len(MAGIC))
+    if header[0] != VERSION:
+        raise ValueError("unknown content encoding version {}".format(header[0]))
+
+    return header
+
+
+def decode_content(data):
+    """
+    Decodes the compact binary format into a list of paragraphs, which is a
+    list of sentences, which is a list of (token, tag) tuples.
+    """
+    decode_header(data)
+    body = zlib.decompress(data[len(MAGIC) + HEADER.size:])
+
+    tokens, offset = _unpack_strings(body, 0)
+    tags, offset = _unpack_strings(body, offset)
+    pair_tokens, offset = _unpack(body, offset)
+    pair_tags, offset = _unpack(body, offset)
+    stream, offset = _unpack(body, offset)
+    sent_lens, offset = _unpack(body, offset)
+    para_lens, offset = _unpack(body, offset)
+
+    # Identical (token, tag) pairs share a single tuple
+    pairs = list(zip(
+        map(tokens.__getitem__, pair_tokens), map(tags.__getitem__, pair_tags)
+    ))
+
+    words = list(map(pairs.__getitem__, stream))
+    return _split(_split(words, sent_lens), para_lens)
+
+
+##########################################################################
+## Lazily Decoded Content
+##########################################################################
+
+class TaggedContent(object):
+    """
+    A view of encoded preprocessed content that behaves like the nested list
+    of paragraphs but only decodes the data the first time the paragraphs
+    are accessed. The length (number of paragraphs) is read from
+    the header, so checking if the content is empty does not decode it.
+    Readers may attach the stored normalized lemmas of the document.
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.lemmas = None
+        self._header = decode_header(self.data)
+        self._content = None
+
+    @property
+    def content(self):
+        """
+        The decoded list of paragraphs (decoded on first access).
+        """
+        if self._content is None:
+            self._content = decode_content(self.data)
+        return self._content
+
+    @property
+    def stats(self):
+        """
+        The paragraph, sentence, word and vocabulary counts of the content,
+        read from the header without decoding the content.
+        """
+        _, paragraphs, sentences, words, vocab = self._header
+        return {
+            'paragraphs': paragraphs,
+            'sentences': sentences,
+            'words': words,
+            'vocab': vocab,
+        }
+
+    def encode(self):
+        """
+        Returns the encoded data, reencoding the content if it was decoded
+        (and therefore might have been modified).
+        """
+        if self._content is None:
+            return self.data
+        return encode_content(self._content)
+
+    def __len__(self):
+        return self._header[1]
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def __getitem__(self, idx):
+        return self.content[idx]
+
+    def __eq__(self, other):
+        if isinstance(other, TaggedContent):
+            other = other.content
+        return self.content == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "<TaggedContent: {} paragraphs, {} bytes>".format(
+            len(self), len(self.data)
+        )
+
+
+##########################################################################
+## Tagged Content Field
+##########################################################################
+
+class TaggedContentField(models.BinaryField):
+    """
+    Stores preprocessed content in the compact binary format and returns a
+    lazily decoded TaggedContent view when loaded from the database. Lists
+    of paragraphs can be assigned directly and are encoded on save.
+    """
+
+    description = "Compact encoding of part-of-speech tagged paragraphs"
+
+    def from_db_value(self, value, expression, connection, context):
+        if value is None:
+            return value
+        return TaggedContent(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, (list, TaggedContent)):
+            return value
+
+        # Serialized (e.g. fixture) values are base64 encoded strings
+        if isinstance(value, str):
+            value = base64.b64decode(value.encode('ascii'))
+        return TaggedContent(value)
+
+    def get_prep_value(self, value):
+        value = super(TaggedContentField, self).get_prep_value(value)
+        if value is None:
+            return value
+
+        if isinstance(value, TaggedContent):
+            return value.encode()
+        return encode_content(value)
+
+    def value_to_string(self, obj):
+        value = self.get_prep_value(self.value_from_object(obj))
+        if value is None:
+            return value
+        return base64.b64encode(value).decode('ascii')
+
+
+##########################################################################
+## Compression Dictionaries
+##########################################################################
+
+def load_dictionary(data):
+    """
+    Returns a zstd dictionary from its bytes, prepared for compression.
+    """
+    dictionary = zstandard.ZstdCompressionDict(bytes(data))
+    dictionary.precompute_compress(level=ZSTD_LEVEL)
+    return dictionary
+
+
+def get_dictionary(pk):
+    """
+    Returns the zstd dictionary with the id, loading it from the database
+    the first time it is used by the process.
+    """
+    if pk not in _dictionaries:
+        model = apps.get_model('corpus', 'CompressionDictionary')
+        data = model.objects.values_list('data', flat=True).get(id=pk)
+        with _dictionary_lock:
+            _dictionaries.setdefault(pk, load_dictionary(data))
+    return _dictionaries[pk]
+
+
+def current_dictionary():
+    """
+    Returns the id and the zstd dictionary that text is compressed with (the
+    newest dictionary when the process first compressed text), or (0, None)
+    if no dictionary has been trained.
+    """
+    global _current
+    if _current is None:
+        model = apps.get_model('corpus', 'CompressionDictionary')
+        _current = model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    if not _current:
+        return 0, None
+    return _current, get_dictionary(_current)
+
+
+def reset_dictionaries():
+    """
+    Forgets the loaded dictionaries so that the newest one is used next.
+    """
+    global _current
+    with _dictionary_lock:
+        _dictionaries.clear()
+        _current = None
+
+
+##########################################################################
+## Text Compression
+##########################################################################
+
+def compress_text(text):
+    """
+    Compresses the text with zstd and the current dictionary, or with zlib
+    if the zstandard package is not installed.
+    """
+    data = text.encode('utf-8')
+    if zstandard is None:
+        header = TEXT_HEADER.pack(ZLIB, 0, len(data))
+        return TEXT_MAGIC + header + zlib.compress(data, ZLIB_LEVEL)
+
+    pk, dictionary = current_dictionary()
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+    return TEXT_MAGIC + TEXT_HEADER.pack(ZSTD, pk, len(data)) + compressor.compress(data)
+
+
+def decode_text_header(data):
+    """
+    Returns the codec, dictionary id and uncompressed size of compressed
+    text without decompressing it.
+    """
+    if data[:len(TEXT_MAGIC)] != TEXT_MAGIC:
+        raise ValueError("data is not compressed text")
+
+    header = TEXT_HEADER.unpack_from(data, len(TEXT_MAGIC))
+    if header[0] not in (ZLIB, ZSTD):
+        raise ValueError("unknown text compression codec {}".format(header[0]))
+
+    return header
+
+
+def decompress_text(data):
+    """
+    Decompresses text compressed by compress_text.
+    """
+    codec, pk, _ = decode_text_header(data)
+    body = data[len(TEXT_MAGIC) + TEXT_HEADER.size:]
+
+    if codec == ZLIB:
+        return zlib.decompress(body).decode('utf-8')
+
+    if zstandard is None:
+        raise ImproperlyConfigured(
+            "the zstandard package is required to decompress zstd compressed text"
+        )
+
+    dictionary = get_dictionary(pk) if pk else None
+    decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+    return decompressor.decompress(body).decode('utf-8')
+
+
+##########################################################################
+## Lazily Decompressed Text
+##########################################################################
+
+class CompressedText(object):
+    """
+    A view of compressed text that only decompresses it the first time the
+    text is accessed. The codec, dictionary and size (the length of the text
+    in utf-8 bytes) are read from the header without decompressing it.
+    """
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.codec, self.dictionary, self.size = decode_text_header(self.data)
+        self._text = None
+
+    @property
+    def text(self):
+        """
+        The decompressed text (decompressed on first access).
+        """
+        if self._text is None:
+            self._text = decompress_text(self.data)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+    def __eq__(self, other):
+        if isinstance(other, CompressedText):
+            other = other.text
+        return self.text == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "<CompressedText: {} bytes compressed to {} bytes>".format(
+            self.size, len(self.data)
+        )
+
+
+class CompressedTextDescriptor(object):
+    """
+    Returns the text of a compressed text field of a model instance, only
+    decompressing it when the attribute is accessed. The compressed value is
+    kept so that saving the instance does not compress unchanged text again.
+    """
+
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        value = instance.__dict__.get(self.field.attname)
+        if isinstance(value, CompressedText):
+            return value.text
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+##########################################################################
+## Compressed Text Field
+##########################################################################
+
+class CompressedTextField(models.BinaryField):
+    """
+    Stores text compressed by compress_text. Model instances are loaded with
+    the compressed value, which is only decompressed when the attribute is
+    accessed, and strings assigned to the attribute are compressed on save.
+    Queried values (e.g. with values_list) are CompressedText views, so use
+    str to decompress them. Unlike other binary fields, it is editable as text.
+    """
+
+    description = "Text compressed with zstd or zlib"
+
+    def __init__(self, *args, **kwargs):
+        editable = kwargs.pop('editable', True)
+        super(CompressedTextField, self).__init__(*args, **kwargs)
+        self.editable = editable
+
+    def deconstruct(self):
+        # BinaryField always drops the editable argument, since it forces it
+        return models.Field.deconstruct(self)
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        super(CompressedTextField, self).contribute_to_class(cls, name, *args, **kwargs)
+        setattr(cls, self.attname, CompressedTextDescriptor(self))
+
+    def from_db_value(self, value, expression, connection, context):
+        if value is None:
+            return value
+        return CompressedText(value)
+
+    def to_python(self, value):
+        # Serialized (e.g. fixture) values are the text itself
+        return value
+
+    def pre_save(self, model_instance, add):
+        # Read the stored value so that unchanged text is not decompressed
+        return model_instance.__dict__.get(self.attname)
+
+    def get_prep_value(self, value):
+        value = super(CompressedTextField, self).get_prep_value(value)
+        if value is None:
+            return value
+
+        if isinstance(value, CompressedText):
+            return value.data
+        return compress_text(value)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        defaults = {'widget': forms.Textarea}
+        defaults.update(kwargs)
+        return super(CompressedTextField, self).formfield(**defaults)
@@ -0,0 +1,319 @@
+# corpus.ingest
+# Fetches and processes documents, synchronously or from the ingestion queue.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Fetches and processes documents, synchronously or from the ingestion queue.
+
+Downloading the page, extraction and tagging can take many seconds, so
+documents submitted through the API are created in the pending state and
+ingested by the ingest management command instead of in the request. The queue
+is the documents table itself: a worker claims the oldest pending or fetched
+document with SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers can
+run, and advances it one step. Pending documents are fetched, fetched
+documents are processed, and a document that fails
+settings.INGEST_MAX_ATTEMPTS times is marked failed with the last error.
+
+Claiming a document leases it for settings.INGEST_LEASE seconds by moving its
+modified time into the future in a single statement, so that no lock is held
+while the page is downloaded and processed. If the worker dies the document
+is claimed again once the lease expires.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import logging
+
+from django.utils import timezone
+from django.db import connection, transaction
+
+from partisan.utils import get_setting
+from corpus.bitly import lookup
+from corpus.models import Document
+from corpus.client import fetch
+from corpus.exceptions import PreprocessTimeout
+from corpus.dedupe import minhash, find_duplicate, index_document
+from corpus.nlp import extract, count
+from corpus.cache import cached_tag_paragraphs
+from corpus.boilerplate import learn, strip
+from corpus.budget import TIMEOUT, deadline, truncate, run_isolated
+from corpus.features import compute_features, store_features
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Default number of attempts to ingest a document before it fails
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Default seconds to wait before retrying a failed attempt, per attempt
+DEFAULT_RETRY_DELAY = 60
+
+# Default seconds a claimed document is leased to the worker that claimed it
+DEFAULT_LEASE = 300
+
+# The fields of a document that are set by processing it
+PROCESSED_FIELDS = (
+    'title', 'signature', 'content', 'n_paras', 'n_sents', 'n_words',
+    'n_vocab', 'minhash', 'skipped', 'truncated', 'duplicate_of',
+)
+
+# Claims the next document that is ready to advance, skipping documents that
+# other workers are claiming, are leased to other workers (their modified time
+# is in the future) and failed attempts that are still backing off, and leases
+# it by moving its modified time forward.
+CLAIM = (
+    "UPDATE documents SET modified = clock_timestamp() + %s * interval '1 second' "
+    "WHERE id = ("
+    "SELECT id FROM documents "
+    "WHERE state IN (%s, %s) "
+    "AND modified <= clock_timestamp() - attempts * %s * interval '1 second' "
+    "ORDER BY modified LIMIT 1 "
+    "FOR UPDATE SKIP LOCKED"
+    ") RETURNING id"
+)
+
+# Logger for reporting on documents that could not be ingested
+logger = logging.getLogger(__name__)
+
+
+##########################################################################
+## Ingestion Pipeline
+##########################################################################
+
+def fetch_html(instance):
+    """
+    Fetches the raw html of the document, storing the validators of the
+    response so that the page can be fetched again conditionally.
+    """
+    fetched = fetch(instance.long_url)
+    instance.raw_html = fetched.text
+    instance.etag = fetched.etag
+    instance.last_modified = fetched.last_modified
+
+
+def process(instance):
+    """
+    Parses the raw html of the document a single time for the content, title
+    and signature, unless the page was already skipped or ran out of time
+    before, then computes its MinHash signature and links near-duplicates to
+    the original. Sets the fields on the instance without saving it.
+    """
+    if instance.skipped or instance.truncated == TIMEOUT:
+        pass
+    elif instance.content is None or not (instance.title and instance.signature):
+        try:
+            # Extract and tag in workers that are killed if, together, they
+            # take longer than the preprocessing budget of the document.
+            with deadline():
+                extraction = run_isolated(extract, instance.raw_html, instance.long_url)
+                count(extraction, instance.raw_html)
+                instance.skipped = extraction.skipped
+
+                # If there is no title, use the title parsed from the raw html.
+                if not instance.title:
+                    instance.title = extraction.title
+
+                # If there is no signature use the signature of the extracted text.
+                if not instance.signature:
+                    instance.signature = extraction.signature
+
+                # If there is no content, drop the boilerplate of the domain and
+                # truncate very long pages, then preprocess it (unless the same
+                # text has already been preprocessed) and store its statistics.
+                # The page is added to the boilerplate model once the document
+                # is saved (see learn_boilerplate).
+                if instance.content is None and not extraction.skipped:
+                    paragraphs = strip(instance.long_url, extraction.paragraphs)
+                    instance._boilerplate = extraction.paragraphs
+                    paragraphs, instance.truncated = truncate(paragraphs)
+
+                    content, stats = cached_tag_paragraphs(paragraphs)
+                    instance.content = content
+                    instance.n_paras = stats['paragraphs']
+                    instance.n_sents = stats['sentences']
+                    instance.n_words = stats['words']
+                    instance.n_vocab = stats['vocab']
+
+        except PreprocessTimeout:
+            # Save the document without content rather than block the worker
+            instance.truncated = TIMEOUT
+
+    # Compute the MinHash signature and link near-duplicates to the original
+    if instance.content and not instance.minhash:
+        instance.minhash = minhash(instance.content)
+        if instance.minhash and not instance.duplicate_of_id:
+            instance.duplicate_of = find_duplicate(instance.minhash, exclude=instance.pk)
+
+
+def process_page(page):
+    """
+    Extracts and preprocesses the raw html of a (url, html) page, e.g. in a
+    pool worker, stripping the boilerplate of its domain, and returns the
+    values of the processed fields of its document, its normalized lemmas and
+    the extracted paragraphs, which the caller can add to the boilerplate
+    model once the document is stored. Pages skipped by the language and
+    density gate have no content, statistics, features or paragraphs, nor
+    do pages that take longer than the preprocessing budget, which are
+    marked as truncated by the timeout.
+    """
+    url, html = page
+    empty = {
+        'content': None, 'signature': None, 'minhash': None,
+        'n_paras': None, 'n_sents': None, 'n_words': None, 'n_vocab': None,
+        'skipped': None, 'truncated': None,
+    }
+
+    try:
+        with deadline():
+            extraction = run_isolated(extract, html, url)
+            if extraction.skipped:
+                return dict(empty, title=extraction.title, skipped=extraction.skipped), None, None
+
+            paragraphs = strip(url, extraction.paragraphs)
+            paragraphs, truncated = truncate(paragraphs)
+            content, stats = cached_tag_paragraphs(paragraphs)
+    except PreprocessTimeout:
+        return dict(empty, title=None, truncated=TIMEOUT), None, None
+
+    fields = {
+        'title': extraction.title,
+        'content': content,
+        'signature': extraction.signature,
+        'minhash': minhash(content),
+        'n_paras': stats['paragraphs'],
+        'n_sents': stats['sentences'],
+        'n_words': stats['words'],
+        'n_vocab': stats['vocab'],
+        'skipped': None,
+        'truncated': truncated,
+    }
+
+    return fields, compute_features(content), extraction.paragraphs
+
+
+def learn_boilerplate(instance):
+    """
+    Adds the paragraphs extracted from the page of a document by process to
+    the boilerplate model of its domain. Called once the document has been
+    saved, so that pages that fail to be saved are not counted.
+    """
+    paragraphs = getattr(instance, '_boilerplate', None)
+    instance._boilerplate = None
+    if paragraphs:
+        learn(instance.long_url, paragraphs)
+
+
+def index(instance):
+    """
+    Adds a processed document to the near-duplicate LSH index and stores the
+    normalized lemmas used in training.
+    """
+    if instance.minhash:
+        index_document(instance)
+
+    if instance.content:
+        store_features(instance.id, compute_features(instance.content))
+
+
+##########################################################################
+## Ingestion Queue
+##########################################################################
+
+def claim():
+    """
+    Leases the next document that is ready to advance for
+    settings.INGEST_LEASE seconds and returns its id, or None if the queue
+    is empty.
+    """
+    lease = get_setting('INGEST_LEASE', DEFAULT_LEASE)
+    delay = get_setting('INGEST_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(CLAIM, [lease, Document.PENDING, Document.FETCHED, delay])
+            row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def advance(document):
+    """
+    Moves a claimed document to its next state: pending documents are
+    fetched, fetched documents are processed and indexed. Short urls are
+    only taken from the cache (see corpus.bitly). The page is downloaded and
+    processed outside of a transaction, then the results are written in a
+    short one, and the page is added to the boilerplate model once they are
+    committed. A successful step resets the failed attempts, so that the
+    next step is neither delayed nor failed early by earlier failures. The
+    document is updated without saving it so that the pre_save signal does
+    not process it again.
+    """
+    fields = {'error': None, 'attempts': 0, 'modified': timezone.now()}
+
+    if document.state == Document.PENDING:
+        if not document.short_url:
+            document.short_url = lookup([document.long_url]).get(document.long_url)
+        if not document.raw_html:
+            fetch_html(document)
+
+        fields.update(
+            short_url=document.short_url, raw_html=document.raw_html,
+            etag=document.etag, last_modified=document.last_modified,
+        )
+        fields['state'] = Document.FETCHED
+
+    elif document.state == Document.FETCHED:
+        process(document)
+        fields.update((name, getattr(document, name)) for name in PROCESSED_FIELDS)
+        fields['state'] = Document.PROCESSED
+
+    else:
+        return
+
+    with transaction.atomic():
+        Document.objects.filter(id=document.id).update(**fields)
+        if fields['state'] == Document.PROCESSED:
+            index(document)
+
+    document.state, document.error, document.attempts = fields['state'], None, 0
+    if document.state == Document.PROCESSED:
+        learn_boilerplate(document)
+
+
+def fail(document, error):
+    """
+    Records a failed attempt to advance the document, which is retried after
+    a delay until it has failed settings.INGEST_MAX_ATTEMPTS times.
+    """
+    document.attempts += 1
+    document.error = str(error)
+    if document.attempts >= get_setting('INGEST_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+        document.state = Document.FAILED
+
+    Document.objects.filter(id=document.id).update(
+        state=document.state, attempts=document.attempts,
+        error=document.error, modified=timezone.now(),
+    )
+
+
+def ingest_next():
+    """
+    Claims the next document in the queue and advances it a single step,
+    returning the document or None if there are no documents to advance.
+    """
+    pk = claim()
+    if pk is None:
+        return None
+
+    document = Document.objects.get(id=pk)
+    try:
+        advance(document)
+    except Exception as e:
+        logger.warning("could not ingest document %s: %s", pk, e)
+        fail(document, e)
+
+    return document
@@ -0,0 +1,172 @@
+# corpus.language
+# Cheap language and text density gate for fetched pages.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Cheap language and text density gate for fetched pages.
+
+The preprocessing pipeline (readability, punkt, the English perceptron tagger
+and WordNet) only produces useful output for English prose. Pages whose
+visible text has too few words cannot contain an article and are skipped as
+sparse before they are summarized. The extracted article is then checked in
+the same way, and articles whose character trigrams are mostly not common
+English trigrams are skipped as not English, so that the navigation, footer
+and comments of the page do not decide its language. Either way the
+tokenizer and tagger are skipped. The thresholds are settings.LANGUAGE_MIN_WORDS
+and settings.LANGUAGE_MIN_ENGLISH, and the language benchmark reports the
+scores of the stored articles so that the threshold can be calibrated.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import re
+
+from collections import Counter
+from partisan.utils import get_setting
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Reasons that a document was not preprocessed
+SPARSE   = "sparse"
+LANGUAGE = "language"
+
+# Default minimum number of words in the visible text and article of a page
+DEFAULT_MIN_WORDS = 100
+
+# Default minimum proportion of the character trigrams of the article of a
+# page that are among the most common English trigrams. On windows of 105
+# words, English prose scores 0.5 to 0.7 (technical English with code about
+# 0.36 at the 5th percentile), while Romance and Germanic languages have a
+# median of 0.3 to 0.38 and other scripts do not match at all. The default
+# errs on the side of preprocessing English pages.
+DEFAULT_MIN_ENGLISH = 0.4
+
+# Elements whose text is not visible on the page
+INVISIBLE = ('script', 'style', 'noscript', 'template')
+
+# Words are runs of letters of any script
+WORD = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+# The 300 most common character trigrams of lowercase English words padded
+# with spaces (written here as underscores), counted on the debates fixture
+ENGLISH_TRIGRAMS = frozenset(trigram.replace("_", " ") for trigram in (
+    "_th the he_ _to nd_ and to_ _an at_ ing ng_ hat re_ _we on_ tha "
+    "is_ _i_ _in _of ed_ of_ we_ ve_ in_ _a_ _yo you _ha _be _wh er_ "
+    "_re _co _is ou_ es_ ll_ thi nt_ se_ ent an_ _do it_ ion ut_ or_ "
+    "_wa _it _no _go ver her as_ for _wi ry_ le_ st_ ave _s_ en_ _on "
+    "_fo hav _pr tio _ca ere all ate ot_ _sa ey_ _he his ld_ ly_ _st "
+    "are our _wo me_ ill ow_ th_ hin _so use _ma al_ _se _bu can _pe "
+    "_ou _ar rs_ ica sta not out ur_ res hey _de ers eve ter et_ one "
+    "aus ati ple ay_ rea te_ now der ne_ _ne _al ith ns_ _ta _tr _t_ "
+    "ce_ ame pla wit men be_ com wha _le _mo oin int con _ab oul ght "
+    "uld ome ts_ _am _ve _me oun ove eop opl peo _as ke_ ant cou est "
+    "app do_ ide eri but _ch ted _lo pro _li igh _fi ric pre mer _pa "
+    "was _ba _po ell so_ _di whe get ons _ap lin ery don wor ty_ nde "
+    "abo _un ear id_ lau ive ake nk_ ht_ ntr _ge wil who bou han unt "
+    "tin den _fa _fr _cl try em_ _kn kno _sh hen _ho goi ch_ ess ppl "
+    "ust sid _mi _ev ore _te _if if_ ho_ ort rat ble nto ton _cr us_ "
+    "_hi _su ad_ kin nat my_ ern nce eed und _at eal tor sti ss_ ge_ "
+    "iti _la ck_ bec tru _gr ack nee _ri cau esi ist hou act ink wou "
+    "eca str _ag wan om_ end eat ans art _ju ect _en tat ar_ tal rom "
+    "lea lit _us per gre lli ee_ _ye any ir_ lly ies ").split())
+
+# Documents checked by the gate and why any were skipped, counted by record
+# in the process that receives the extraction (extract itself often runs in
+# an isolated or pool worker whose counts would be discarded)
+counts = Counter(checked=0, passed=0, sparse=0, language=0, skipped_bytes=0)
+
+
+##########################################################################
+## Gate Functions
+##########################################################################
+
+def visible_text(tree):
+    """
+    Returns the text of the body of a parsed lxml page, excluding scripts,
+    styles and other elements that are not displayed.
+    """
+    body = tree.find('.//body')
+    if body is None:
+        body = tree
+
+    texts = []
+    for elem in body.iter():
+        # Comments and processing instructions have non-string tags
+        if isinstance(elem.tag, str) and elem.tag not in INVISIBLE and elem.text:
+            texts.append(elem.text)
+        if elem is not body and elem.tail:
+            texts.append(elem.tail)
+    return " ".join(texts)
+
+
+def english_score(words):
+    """
+    Returns the proportion of the character trigrams of the words that are
+    common English trigrams.
+    """
+    total, matches = 0, 0
+    for word in words:
+        word = " {} ".format(word.lower())
+        for idx in range(len(word) - 2):
+            total += 1
+            matches += word[idx:idx+3] in ENGLISH_TRIGRAMS
+    return matches / float(total) if total else 0.0
+
+
+def check_text(text, min_words=None, min_english=None):
+    """
+    Returns None if the text should be preprocessed, otherwise the reason
+    (SPARSE or LANGUAGE) that it should be skipped. The thresholds default to
+    settings.LANGUAGE_MIN_WORDS and settings.LANGUAGE_MIN_ENGLISH.
+    """
+    if min_words is None:
+        min_words = get_setting('LANGUAGE_MIN_WORDS', DEFAULT_MIN_WORDS)
+    if min_english is None:
+        min_english = get_setting('LANGUAGE_MIN_ENGLISH', DEFAULT_MIN_ENGLISH)
+
+    words = WORD.findall(text)
+    if len(words) < min_words:
+        return SPARSE
+    if english_score(words) < min_english:
+        return LANGUAGE
+    return None
+
+
+def record(skipped, size=0):
+    """
+    Counts the result of the gate for a page of size bytes of html, where
+    skipped is the reason the page was skipped or None if it passed.
+    """
+    counts['checked'] += 1
+    if skipped is None:
+        counts['passed'] += 1
+    else:
+        counts[skipped] += 1
+        counts['skipped_bytes'] += size
+
+
+def summary():
+    """
+    Describes the pages checked by the gate and the work it avoided.
+    """
+    return (
+        "{checked:,} pages checked by the language gate, {passed:,} passed, "
+        "{sparse:,} sparse and {language:,} not English "
+        "({skipped_bytes:,} bytes of html not preprocessed)"
+    ).format(**counts)
+
+
+def gate(tree):
+    """
+    Returns SPARSE if the visible text of a parsed page has too few words to
+    contain an article, so that the page is not summarized, otherwise None.
+    The language of the page is checked on its article (see check_text).
+    """
+    return check_text(visible_text(tree), min_english=0)
@@ -30,10 +30,19 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.metrics import precision_recall_fscore_support
 
+from corpus.lemmas import get_lemmatizer
 from partisan.utils import identity, timeit
 from collections import Counter, defaultdict
 
 
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Incremented whenever a change to TextNormalizer changes its output
+NORMALIZER_VERSION = 1
+
+
 ##########################################################################
 ## Corpus Loader (Not a transformer)
 ##########################################################################
@@ -130,7 +139,12 @@ class CorpusLoader(object):
         allows us to maintain the generator properties of document reads.
         """
         for fileid in self.fileids(fold, train, test):
-            yield list(self.corpus.tagged(fileids=fileid))
+            if hasattr(self.corpus, 'documents'):
+                # Database readers yield the stored content with its stats
+                for document in self.corpus.documents(fileids=fileid):
+                    yield document
+            else:
+                yield list(self.corpus.tagged(fileids=fileid))
 
 
 ##########################################################################
@@ -143,12 +157,25 @@ class TextNormalizer(BaseEstimator, TransformerMixin):
     as well as lemmatizes the words for the first step in feature extraction.
 
     Note that this transformer expects as input to transform a list of tuples,
-    (token, tag) pairs, that represent a single document.
+    (token, tag) pairs, that represent a single document. Documents loaded
+    from the database may instead carry the lemmas normalized when they were
+    preprocessed (see corpus.features), which are used directly unless
+    custom stopwords were specified.
+
+    The lemmatizer is the one shared by the process (see get_lemmatizer), so
+    it is not pickled with fitted pipelines.
     """
 
     def __init__(self, stopwords=None):
-        self.stopwords  = set(stopwords or nltk.corpus.stopwords.words('english'))
-        self.lemmatizer = nltk.WordNetLemmatizer()
+        self.stopwords  = stopwords
+        self._stopwords = set(stopwords or nltk.corpus.stopwords.words('english'))
+
+    @property
+    def lemmatizer(self):
+        """
+        The lemmatizer shared by the process.
+        """
+        return get_lemmatizer()
 
     def is_punct(self, token):
         """
@@ -162,7 +189,7 @@ class TextNormalizer(BaseEstimator, TransformerMixin):
         """
         Determines if the token is a stopword or not.
         """
-        return token.lower() in self.stopwords
+        return token.lower() in self._stopwords
 
     def tagwn(self, tag):
         """
@@ -204,6 +231,12 @@ class TextNormalizer(BaseEstimator, TransformerMixin):
         Transform a corpus of documents into normalized features.
         """
         for document in documents:
+            # Use the lemmas stored with the default stopwords if available
+            lemmas = getattr(document, 'lemmas', None)
+            if lemmas is not None and self.stopwords is None:
+                yield lemmas
+                continue
+
             yield self.normalize(document)
 
 
@@ -214,6 +247,9 @@ class TextNormalizer(BaseEstimator, TransformerMixin):
 class TextStats(BaseEstimator, TransformerMixin):
     """
     Computes the document statistics like length and number of sentences.
+    Documents loaded from the database carry the statistics that were
+    counted when they were preprocessed in the header of their content, so
+    these are used directly.
     """
 
     def fit(self, X, y=None):
@@ -224,9 +260,15 @@ class TextStats(BaseEstimator, TransformerMixin):
         Returns a dictionary of text features in advance of a DictVectorizer.
         """
         for document in documents:
-            # Collect token and vocabulary counts
+            # Use the stats recorded during preprocessing if available
+            stats = getattr(document, 'stats', None)
+            if stats is not None:
+                yield stats
+                continue
+
+            # Collect token and (case insensitive) vocabulary counts
             counts = Counter(
-                item[0] for para in document for sent in para for item in sent
+                item[0].lower() for para in document for sent in para for item in sent
             )
 
             # Yield structured information about the document
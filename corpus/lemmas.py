@@ -0,0 +1,225 @@
+# corpus.lemmas
+# Precompiled memory-mapped lemma dictionary.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Precompiled memory-mapped lemma dictionary.
+
+Lemmatizing with WordNet loads the WordNet database into every process and
+applies morphy's rules and exception lookups for every token. The build_lemmas
+command instead precomputes the WordNet lemma of every (surface form, part of
+speech) pair in the corpus vocabulary and the WordNet exceptions and writes
+them, sorted, to a compact file that is memory-mapped by every process so the
+operating system shares a single copy. Lookups are a binary search of the
+file; misses fall back to WordNet and are appended to a log that is included
+in the next build.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import mmap
+import sys
+import struct
+import threading
+
+from array import array
+from nltk.stem import WordNetLemmatizer
+from partisan.utils import get_setting
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Identifies the file format and its version
+MAGIC  = b'LEM1'
+
+# The magic and the number of entries
+HEADER = struct.Struct('<4sI')
+
+# Separates the surface form, part of speech and lemma of an entry
+KEYSEP = b'\x1f'
+SEP    = b'\x1e'
+
+# The process-wide lemmatizer (constructed lazily by get_lemmatizer)
+_lemmatizer = None
+_lemmatizer_lock = threading.Lock()
+
+
+##########################################################################
+## Building
+##########################################################################
+
+def entry_key(surface, pos):
+    """
+    Returns the sort and search key of a (surface form, part of speech) pair.
+    """
+    return surface.encode('utf-8') + KEYSEP + pos.encode('utf-8')
+
+
+def build(entries, path):
+    """
+    Writes a dict of (surface form, part of speech) to lemma to the path,
+    replacing the existing dictionary atomically so that processes that have
+    it mapped continue to use the old copy until they reopen it.
+    """
+    records = sorted(
+        (entry_key(surface, pos), lemma.encode('utf-8'))
+        for (surface, pos), lemma in entries.items()
+    )
+
+    offsets, blob, position = array('I'), [], 0
+    for key, lemma in records:
+        offsets.append(position)
+        blob.append(key + SEP + lemma)
+        position += len(blob[-1])
+    offsets.append(position)
+
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+
+    tmp = path + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        f.write(offsets.tobytes())
+        f.write(b"".join(blob))
+    os.replace(tmp, path)
+
+
+##########################################################################
+## Lookup
+##########################################################################
+
+class LemmaDictionary(object):
+    """
+    A read-only memory-mapped view of a lemma dictionary built by build.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("{} is not a lemma dictionary".format(path))
+
+        # The offsets are read in place from the mapped file
+        start = HEADER.size
+        self.blob = start + 4 * (self.size + 1)
+        self.offsets = memoryview(self.data)[start:self.blob].cast('I')
+        if sys.byteorder == 'big':
+            self.offsets = array('I', self.offsets)
+            self.offsets.byteswap()
+
+    def record(self, idx):
+        """
+        Returns the key and the lemma of the entry at the index.
+        """
+        start = self.blob + self.offsets[idx]
+        end = self.blob + self.offsets[idx+1]
+        key, _, lemma = self.data[start:end].partition(SEP)
+        return key, lemma
+
+    def get(self, surface, pos):
+        """
+        Returns the lemma of the surface form and part of speech or None.
+        """
+        key = entry_key(surface, pos)
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            found, lemma = self.record(mid)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return lemma.decode('utf-8')
+        return None
+
+    def __len__(self):
+        return self.size
+
+
+class CompiledLemmatizer(object):
+    """
+    A drop-in replacement for the WordNetLemmatizer that looks lemmas up in
+    the memory-mapped dictionary, falling back to WordNet for forms that are
+    not in it and appending those to the misses log (once per process).
+    Pickles as its paths, so that fitted pipelines reopen the dictionary, or
+    use WordNet alone if it has not been built where they are unpickled.
+    """
+
+    def __init__(self, path, misses=None):
+        self.path = path
+        self.misses = misses
+        self.dictionary = LemmaDictionary(path)
+        self.fallback = WordNetLemmatizer()
+        self.missed = set()
+
+    def lemmatize(self, word, pos='n'):
+        if self.dictionary is None:
+            return self.fallback.lemmatize(word, pos)
+
+        lemma = self.dictionary.get(word, pos)
+        if lemma is not None:
+            return lemma
+
+        if self.misses and (word, pos) not in self.missed:
+            self.missed.add((word, pos))
+            with open(self.misses, 'a', encoding='utf-8') as f:
+                f.write("{}\t{}\n".format(word, pos))
+
+        return self.fallback.lemmatize(word, pos)
+
+    def __getstate__(self):
+        return {'path': self.path, 'misses': self.misses}
+
+    def __setstate__(self, state):
+        try:
+            self.__init__(state['path'], state['misses'])
+        except (IOError, ValueError):
+            self.path = state['path']
+            self.misses = None
+            self.dictionary = None
+            self.fallback = WordNetLemmatizer()
+            self.missed = set()
+
+
+def read_misses(path):
+    """
+    Returns the set of (surface form, part of speech) pairs in a misses log.
+    """
+    if not path or not os.path.exists(path):
+        return set()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return set(
+            tuple(line.rstrip("\n").split("\t", 1))
+            for line in f if "\t" in line
+        )
+
+
+def get_lemmatizer():
+    """
+    Returns the lemmatizer shared by the process: the compiled dictionary at
+    settings.LEMMA_DICTIONARY_PATH if it has been built, otherwise WordNet.
+    """
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _lemmatizer_lock:
+            if _lemmatizer is None:
+                path = get_setting('LEMMA_DICTIONARY_PATH')
+                misses = get_setting('LEMMA_MISSES_PATH')
+
+                if path and os.path.exists(path):
+                    _lemmatizer = CompiledLemmatizer(path, misses)
+                else:
+                    _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer
@@ -0,0 +1,13 @@
+# corpus.management
+# A module that specifies Django management commands for the corpus app.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+A module that specifies Django management commands for the corpus app.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
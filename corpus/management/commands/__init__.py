@@ -0,0 +1,13 @@
+# corpus.management.commands
+# Module that contains each individual management command for Django.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Module that contains each individual management command for Django.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
@@ -0,0 +1,466 @@
+# corpus.management.commands.benchmark
+# Command to benchmark stages of the preprocessing pipeline.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to benchmark stages of the preprocessing pipeline.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import re
+import bs4
+import nltk
+import zlib
+import tracemalloc
+
+from itertools import islice
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from picklefield.fields import dbsafe_encode, dbsafe_decode
+from readability.htmls import build_doc
+from readability.readability import Document as Readable
+
+from partisan.utils import timeit, signature, get_setting
+from corpus.models import Document
+from corpus.reader import TranscriptCorpusReader, TRANSCRIPTS
+from corpus.memo import ParagraphCache
+from corpus.budget import truncate, get_pool
+from corpus.rules import find_rule
+from corpus.language import WORD, DEFAULT_MIN_ENGLISH, english_score
+from corpus.fields import (
+    TEXT_MAGIC, TEXT_HEADER, ZLIB_LEVEL, ZSTD_LEVEL, zstandard, current_dictionary,
+    encode_content, decode_content,
+)
+from corpus.nlp import (
+    TAGS, TAGGERS, DEFAULT_TAGGER, NLTKTokenizer, RegexTokenizer, extract,
+    article_paragraphs, get_tagger, pos_tag_sents, tag_paragraphs, tag_chunk,
+    split_paragraphs, preprocessor_version, tag_agreement,
+)
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# The uncompressed size of the stored html, read from the little endian size
+# at the end of the compressed text header without decompressing the html
+HTML_SIZE = " + ".join(
+    "get_byte(raw_html, {})::bigint * {}".format(
+        len(TEXT_MAGIC) + TEXT_HEADER.size - 4 + idx, 256 ** idx
+    ) for idx in range(4)
+)
+
+
+##########################################################################
+## Benchmark Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Benchmarks stages of the document preprocessing pipeline."
+
+    # The benchmarks that this command knows how to run
+    benchmarks = (
+        'tagger', 'taggers', 'extract', 'content', 'tokenizer', 'paragraphs', 'rules',
+        'parallel', 'html', 'language',
+    )
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        # Benchmark selection argument
+        parser.add_argument(
+            'benchmark', choices=self.benchmarks,
+            help='specify the preprocessing stage to benchmark',
+        )
+
+        # Path on disk to the transcripts to benchmark on
+        parser.add_argument(
+            '-t', '--transcripts', default=TRANSCRIPTS, type=str, metavar='PATH',
+            help='specify a path on disk to the directory containing transcripts',
+        )
+
+        # Limit the amount of text used in the benchmark
+        parser.add_argument(
+            '-n', '--limit', type=int, default=2000, metavar='N',
+            help='maximum number of sentences or documents to benchmark on',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Dispatches to the benchmark method for the selected stage.
+        """
+        benchmark = getattr(self, "benchmark_{}".format(options['benchmark']))
+        benchmark(**options)
+
+    def benchmark_tagger(self, **options):
+        """
+        Compares tagging sentences one at a time with nltk.pos_tag, which
+        reloads the perceptron model on every call, to batch tagging with the
+        process-wide tagger used by corpus.nlp.
+        """
+        reader = self.get_transcripts(options['transcripts'])
+        sents  = list(islice(reader.sents(), options['limit']))
+
+        # Before: a new tagger is constructed for every sentence.
+        _, before = timeit(lambda: [nltk.pos_tag(sent) for sent in sents])()
+        self.report("nltk.pos_tag", len(sents), "sentences", before)
+
+        # After: load the shared tagger once, then tag in a single batch.
+        _, loading = timeit(get_tagger)()
+        _, after = timeit(pos_tag_sents)(sents)
+        self.stdout.write("shared tagger loaded in {}".format(loading))
+        self.report("pos_tag_sents", len(sents), "sentences", after)
+
+    def benchmark_taggers(self, **options):
+        """
+        Compares the speed of each tagger backend on the sentences of the
+        debates fixture and the agreement of its tags (and of the coarse
+        N/V/R/J classes used for lemmatization) with the perceptron tagger.
+        """
+        reader = self.get_transcripts(options['transcripts'])
+        sents  = list(islice(reader.sents(), options['limit']))
+        tokens = sum(map(len, sents))
+
+        reference = None
+        for name in sorted(TAGGERS, key=lambda name: name != DEFAULT_TAGGER):
+            try:
+                tagger, loading = timeit(TAGGERS[name])()
+            except ImproperlyConfigured as e:
+                self.stdout.write("{}: {}".format(name, e))
+                continue
+
+            tagged, delta = timeit(tagger.tag_sents)(sents)
+            if reference is None:
+                reference = tagged
+
+            fine, coarse = tag_agreement(reference, tagged)
+            self.report(name, tokens, "tokens", delta)
+            self.stdout.write(
+                "{}: loaded in {}, {:0.1%} tag and {:0.1%} N/V/R/J agreement with {}".format(
+                    name, loading, fine, coarse, DEFAULT_TAGGER
+                )
+            )
+
+    def benchmark_extract(self, **options):
+        """
+        Compares the previous extraction of paragraphs, title and signature
+        (a readability summary parsed by BeautifulSoup, a second parse of the
+        raw html for the title, and a signature over the raw html) to the
+        single parse extraction stage on the largest stored pages.
+        """
+        query = Document.objects.exclude(raw_html=None)
+        query = query.annotate(size=RawSQL(HTML_SIZE, ())).order_by('-size')
+        pages = [str(html) for html in query.values_list('raw_html', flat=True)[:options['limit']]]
+
+        if not pages:
+            raise CommandError("No documents with raw html in the database")
+
+        self.stdout.write("{:,} pages, {:,} bytes of html".format(
+            len(pages), sum(len(page) for page in pages)
+        ))
+
+        def legacy_extract(html):
+            summary = bs4.BeautifulSoup(Readable(html).summary(), 'lxml')
+            paragraphs = [
+                text for text in (tag.get_text() for tag in summary.find_all(TAGS))
+                if text
+            ]
+            title = bs4.BeautifulSoup(html, 'lxml').title
+            return title, paragraphs, signature(html)
+
+        for name, func in (('legacy', legacy_extract), ('extract', extract)):
+            delta, peak = self.profile(func, pages)
+            self.report(name, len(pages), "pages", delta)
+            self.stdout.write("{}: peak memory {:,} bytes".format(name, peak))
+
+    def benchmark_content(self, **options):
+        """
+        Compares the column size and decoding time of pickled content (the
+        former PickledObjectField representation) with the compact encoding,
+        both on the tagged debates fixture and on stored documents.
+        """
+        reader = self.get_transcripts(options['transcripts'])
+        debates = [
+            list(reader.tagged(fileids=fileid))
+            for fileid in reader.fileids()[:options['limit']]
+        ]
+        self.compare_content("debates", debates)
+
+        stored = Document.objects.exclude(content=None)
+        stored = stored.values_list('content', flat=True)[:options['limit']]
+        stored = [list(content) for content in stored]
+        if stored:
+            self.compare_content("documents", stored)
+
+    def compare_content(self, name, documents):
+        """
+        Reports the encoded size and decoding throughput of the documents
+        stored as a pickle and in the compact encoding.
+        """
+        pickled = [dbsafe_encode(document) for document in documents]
+        packed  = [encode_content(document) for document in documents]
+
+        self.stdout.write("{}: {:,} bytes pickled, {:,} bytes packed ({:0.1f}x)".format(
+            name, sum(map(len, pickled)), sum(map(len, packed)),
+            sum(map(len, pickled)) / max(sum(map(len, packed)), 1),
+        ))
+
+        _, delta = timeit(lambda: [dbsafe_decode(value) for value in pickled])()
+        self.report("{} unpickle".format(name), len(documents), "documents", delta)
+
+        _, delta = timeit(lambda: [decode_content(value) for value in packed])()
+        self.report("{} decode".format(name), len(documents), "documents", delta)
+
+    def benchmark_tokenizer(self, **options):
+        """
+        Compares the reference NLTK tokenizer with the regex tokenizer on the
+        raw paragraphs of the debates fixture, checking that both produce the
+        same sentences and tokens for every paragraph.
+        """
+        reader = self.get_transcripts(options['transcripts'])
+        paras  = [
+            para
+            for fileid in reader.fileids()[:options['limit']]
+            for para in re.split(r'\n\s*\n', reader.raw(fileid))
+            if para.strip()
+        ]
+
+        results = {}
+        for name, tokenizer in (('nltk', NLTKTokenizer()), ('regex', RegexTokenizer())):
+            results[name], delta = timeit(lambda: [
+                tokenizer.tokenize(para) for para in paras
+            ])()
+            self.report(name, len(paras), "paragraphs", delta)
+
+        mismatches = sum(
+            expected != actual
+            for expected, actual in zip(results['nltk'], results['regex'])
+        )
+        self.stdout.write("{:,} of {:,} paragraphs tokenized differently".format(
+            mismatches, len(paras)
+        ))
+
+    def benchmark_paragraphs(self, **options):
+        """
+        Tags the paragraphs of stored documents in the order they were
+        fetched, as a feed would deliver them, without and with an in-memory
+        paragraph cache, reporting the hit rate and the tagging it saved.
+        """
+        query = Document.objects.exclude(raw_html=None).order_by('created')
+        pages = query.values_list('raw_html', flat=True)[:options['limit']]
+        documents = [extract(str(html)).paragraphs for html in pages]
+
+        if not documents:
+            raise CommandError("No documents with raw html in the database")
+
+        for name, size in (('uncached', 0), ('cached', 100000)):
+            cache = ParagraphCache(preprocessor_version(), size=size)
+            _, delta = timeit(lambda: [
+                tag_paragraphs(paragraphs, cache=cache) for paragraphs in documents
+            ])()
+            self.report(name, len(documents), "documents", delta)
+
+        stats = cache.stats()
+        self.stdout.write(
+            "{:0.1%} paragraph hit rate: tagging of {:,} sentences ({:,} words) saved".format(
+                stats['hit_rate'], stats['sentences'], stats['words']
+            )
+        )
+
+    def benchmark_rules(self, **options):
+        """
+        Compares extraction with readability to extraction with the fast-path
+        rules on the most recent stored pages from domains that have rules.
+        """
+        query = Document.objects.exclude(raw_html=None).filter(skipped=None)
+        query = query.order_by('-created').values_list('long_url', 'raw_html')
+        pages = list(islice(
+            ((url, str(html)) for url, html in query.iterator() if find_rule(url)),
+            options['limit']
+        ))
+
+        if not pages:
+            raise CommandError("No stored pages from domains with extraction rules")
+
+        _, delta = timeit(lambda: [extract(html) for _, html in pages])()
+        self.report("readability", len(pages), "pages", delta)
+
+        extractions, delta = timeit(lambda: [extract(html, url) for url, html in pages])()
+        self.report("rules", len(pages), "pages", delta)
+
+        self.stdout.write("{:,} pages matched a rule, {:,} fell back to readability".format(
+            sum(extraction.rule is True for extraction in extractions),
+            sum(extraction.rule is False for extraction in extractions),
+        ))
+
+    def benchmark_parallel(self, **options):
+        """
+        Compares the latency of tagging the longest stored documents in this
+        process to splitting their paragraphs across the isolated workers.
+        """
+        query = Document.objects.exclude(raw_html=None).exclude(n_words=None)
+        query = query.order_by('-n_words').values_list('raw_html', flat=True)
+        documents = [
+            truncate(extract(str(html)).paragraphs)[0]
+            for html in query[:min(options['limit'], 20)]
+        ]
+
+        if not documents:
+            raise CommandError("No preprocessed documents with raw html in the database")
+
+        # Start the workers so that the first document does not pay for it
+        get_pool()
+        chunks = sum(len(split_paragraphs(paragraphs)) for paragraphs in documents)
+
+        _, delta = timeit(lambda: [tag_chunk(paragraphs) for paragraphs in documents])()
+        self.report("serial", len(documents), "documents", delta)
+
+        cache = ParagraphCache(preprocessor_version(), size=0)
+        _, delta = timeit(lambda: [
+            tag_paragraphs(paragraphs, cache=cache) for paragraphs in documents
+        ])()
+        self.report("parallel", len(documents), "documents", delta)
+        self.stdout.write("{:,} documents split into {:,} chunks".format(len(documents), chunks))
+
+    def benchmark_html(self, **options):
+        """
+        Reports the size of the documents table and of the stored html, then
+        compares the compressed size and the compression and decompression
+        throughput of the most recent pages with zlib, zstd and zstd with the
+        newest trained dictionary.
+
+        PostgreSQL does not return the space of the html column dropped by
+        migration 0020 (or of recompressed rows) to the operating system, so
+        run VACUUM FULL documents before comparing the table size to the size
+        before the html was compressed.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_total_relation_size('documents'), sum(octet_length(raw_html)) "
+                "FROM documents"
+            )
+            table, stored = cursor.fetchone()
+
+        self.stdout.write("documents table: {:,} bytes, {:,} bytes of compressed html".format(
+            table, stored or 0
+        ))
+        self.stdout.write("(run VACUUM FULL documents first to reclaim the space of replaced html)")
+
+        query = Document.objects.exclude(raw_html=None).order_by('-id')
+        pages = [
+            str(html).encode('utf-8')
+            for html in query.values_list('raw_html', flat=True)[:options['limit']]
+        ]
+
+        if not pages:
+            raise CommandError("No documents with raw html in the database")
+
+        size = sum(map(len, pages))
+        self.stdout.write("{:,} pages, {:,} bytes of html".format(len(pages), size))
+
+        codecs = [('zlib', lambda data: zlib.compress(data, ZLIB_LEVEL), zlib.decompress)]
+        if zstandard is not None:
+            codecs.append((
+                'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress,
+                zstandard.ZstdDecompressor().decompress,
+            ))
+
+            pk, dictionary = current_dictionary()
+            if dictionary is not None:
+                codecs.append((
+                    'zstd dictionary {}'.format(pk),
+                    zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary).compress,
+                    zstandard.ZstdDecompressor(dict_data=dictionary).decompress,
+                ))
+
+        for name, compress, decompress in codecs:
+            compressed, delta = timeit(lambda: [compress(page) for page in pages])()
+            self.report("{} compress".format(name), len(pages), "pages", delta)
+
+            _, delta = timeit(lambda: [decompress(data) for data in compressed])()
+            self.report("{} decompress".format(name), len(pages), "pages", delta)
+
+            self.stdout.write("{}: {:,} bytes ({:0.1f}x)".format(
+                name, sum(map(len, compressed)), size / max(sum(map(len, compressed)), 1)
+            ))
+
+    def benchmark_language(self, **options):
+        """
+        Reports the distribution of the English trigram scores of the articles
+        of the most recent stored pages (of at least 100 words), and how many
+        of them the current threshold skips, to calibrate the threshold.
+        """
+        query = Document.objects.exclude(raw_html=None).order_by('-id')
+        scores = []
+        for url, html in query.values_list('long_url', 'raw_html')[:options['limit']]:
+            try:
+                tree, _ = build_doc(str(html))
+                words = WORD.findall("\n".join(article_paragraphs(tree, url)[0]))
+            except Exception:
+                continue
+            if len(words) >= 100:
+                scores.append(english_score(words))
+
+        if not scores:
+            raise CommandError("No documents with raw html in the database")
+
+        scores.sort()
+        self.stdout.write("{:,} pages: {}".format(len(scores), ", ".join(
+            "p{:02d} {:0.2f}".format(pct, scores[int(pct / 100.0 * (len(scores) - 1))])
+            for pct in (1, 5, 10, 25, 50, 75, 90)
+        )))
+
+        threshold = get_setting('LANGUAGE_MIN_ENGLISH', DEFAULT_MIN_ENGLISH)
+        skipped = sum(score < threshold for score in scores)
+        self.stdout.write("{:,} pages ({:0.1%}) score below the threshold of {}".format(
+            skipped, skipped / float(len(scores)), threshold
+        ))
+
+    def get_transcripts(self, path):
+        """
+        Returns a transcript corpus reader for the given path, raising a
+        command error if the directory does not exist.
+        """
+        if not os.path.isdir(path):
+            raise CommandError(
+                "No transcripts directory at {} (unzip fixtures/debates.zip?)".format(path)
+            )
+        return TranscriptCorpusReader(path)
+
+    def profile(self, func, items):
+        """
+        Applies the function to each item, returning the elapsed time and
+        the peak memory allocated while processing any single item. Memory is
+        traced in a second pass so that tracing does not skew the timing.
+        """
+        _, delta = timeit(lambda: [func(item) for item in items])()
+
+        peak = 0
+        for item in items:
+            tracemalloc.start()
+            func(item)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+        return delta, peak
+
+    def report(self, name, count, units, delta):
+        """
+        Writes the throughput of a timed benchmark run to stdout.
+        """
+        secs = delta.total_seconds()
+        rate = count / secs if secs > 0 else float('inf')
+        self.stdout.write("{}: {:,} {} in {} ({:0.1f} {}/sec)".format(
+            name, count, units, delta, rate, units
+        ))
@@ -0,0 +1,126 @@
+# corpus.management.commands.boilerplate
+# Command to learn the boilerplate of each domain from stored documents.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to learn the boilerplate of each domain from stored documents.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from collections import Counter
+from django.db.models import Max
+from django.db import connections, transaction
+from django.core.management.base import BaseCommand
+
+from partisan.utils import domain_host
+from corpus.nlp import extract, preprocess_many
+from corpus.models import Document, Domain, BoilerplateParagraph
+from corpus.boilerplate import MIN_COUNT, paragraph_digest, threshold
+
+
+##########################################################################
+## Worker Function
+##########################################################################
+
+def extract_document(document):
+    """
+    Extracts the paragraphs of a (url, html) document in a pool worker.
+    """
+    url, html = document
+    return extract(html, url)
+
+
+##########################################################################
+## Boilerplate Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Rebuilds the per-domain boilerplate model from stored documents."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-w', '--workers', type=int, default=None, metavar='N',
+            help='number of worker processes used to extract paragraphs',
+        )
+
+        parser.add_argument(
+            '-b', '--batch', type=int, default=500, metavar='B',
+            help='number of documents read from the database at a time',
+        )
+
+    def handle(self, *args, **options):
+        """
+        New documents are added to the boilerplate model as they are stored;
+        this command relearns the model from the paragraphs extracted from
+        every stored document. The counts are collected in memory, then the
+        model is replaced in a single transaction so that documents processed
+        in the meantime are stripped with the old model rather than a partial
+        one. Run reprocess afterward to strip the boilerplate from the stored
+        content.
+        """
+        domains, paragraphs = Counter(), Counter()
+
+        last, learned = 0, 0
+        while True:
+            batch = list(
+                Document.objects.filter(id__gt=last, skipped=None)
+                .exclude(raw_html=None).order_by('id')
+                .values_list('id', 'long_url', 'raw_html')[:options['batch']]
+            )
+            if not batch: break
+
+            # Each worker must open its own database connection
+            connections.close_all()
+            results = list(preprocess_many(
+                ((url, str(html)) for _, url, html in batch), workers=options['workers'],
+                func=extract_document,
+            ))
+
+            for (_, url, _), (extraction, error) in zip(batch, results):
+                host = domain_host(url)
+                if error is None and not extraction.skipped and host:
+                    domains[host] += 1
+                    paragraphs.update(
+                        (host, digest) for digest in
+                        set(paragraph_digest(paragraph) for paragraph in extraction.paragraphs)
+                    )
+                    learned += 1
+
+            last = batch[-1][0]
+
+        with transaction.atomic():
+            Domain.objects.all().delete()
+            Domain.objects.bulk_create([
+                Domain(host=host, documents=count) for host, count in domains.items()
+            ], batch_size=1000)
+            BoilerplateParagraph.objects.bulk_create([
+                BoilerplateParagraph(domain_id=host, digest=digest, count=count)
+                for (host, digest), count in paragraphs.items()
+            ], batch_size=5000)
+
+        # Report the paragraphs that are now considered boilerplate
+        domains = Domain.objects.annotate(most=Max('paragraphs__count'))
+
+        total = 0
+        for domain in domains.filter(most__gte=MIN_COUNT).order_by('-documents'):
+            count = domain.paragraphs.filter(count__gte=threshold(domain.documents)).count()
+            total += count
+            if count:
+                self.stdout.write("{}: {:,} boilerplate paragraphs on {:,} pages\n".format(
+                    domain.host, count, domain.documents
+                ))
+
+        self.stdout.write(
+            "Learned from {:,} documents on {:,} domains, {:,} boilerplate paragraphs\n".format(
+                learned, Domain.objects.count(), total
+            )
+        )
@@ -0,0 +1,105 @@
+# corpus.management.commands.build_lemmas
+# Command to build the memory-mapped lemma dictionary.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to build the memory-mapped lemma dictionary.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+
+from django.conf import settings
+from nltk.corpus import wordnet as wn
+from nltk.stem import WordNetLemmatizer
+
+from partisan.utils import timeit
+from corpus.models import Document
+from corpus.learn import TextNormalizer
+from corpus.lemmas import build, read_misses
+from django.core.management.base import BaseCommand, CommandError
+
+
+##########################################################################
+## Build Lemmas Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Precomputes the lemmas of the corpus vocabulary for fast lookup."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-n', '--limit', type=int, default=None, metavar='N',
+            help='only collect the vocabulary of the N most recent documents',
+        )
+
+        parser.add_argument(
+            '-o', '--output', default=None, metavar='PATH',
+            help='where to write the dictionary (default settings.LEMMA_DICTIONARY_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Collects the (surface form, WordNet part of speech) pairs that the
+        normalizer lemmatizes in the stored documents, the WordNet exceptions
+        and the misses logged since the last build, lemmatizes each pair with
+        WordNet and writes the dictionary, then clears the misses log.
+        """
+        output = options['output'] or getattr(settings, 'LEMMA_DICTIONARY_PATH', None)
+        if not output:
+            raise CommandError("Specify an output path or set LEMMA_DICTIONARY_PATH")
+
+        misses = getattr(settings, 'LEMMA_MISSES_PATH', None)
+        pairs, delta = timeit(self.collect)(options['limit'], misses)
+        self.stdout.write("Collected {:,} forms in {}\n".format(len(pairs), delta))
+
+        lemmatizer = WordNetLemmatizer()
+        entries, delta = timeit(lambda: {
+            (surface, pos): lemmatizer.lemmatize(surface, pos)
+            for surface, pos in pairs
+        })()
+        self.stdout.write("Lemmatized {:,} forms in {}\n".format(len(entries), delta))
+
+        build(entries, output)
+        if misses and os.path.exists(misses):
+            os.remove(misses)
+
+        self.stdout.write("Wrote {:,} bytes to {}\n".format(os.path.getsize(output), output))
+
+    def collect(self, limit, misses):
+        """
+        Returns the set of (surface form, part of speech) pairs to lemmatize.
+        """
+        normalizer = TextNormalizer()
+        pairs = read_misses(misses)
+
+        # The forms of the corpus vocabulary that are lemmatized in training
+        query = Document.objects.exclude(content=None).order_by('-created')
+        query = query.values_list('content', flat=True)
+        if limit:
+            query = query[:limit]
+
+        for content in query.iterator():
+            pairs.update(
+                (token, normalizer.tagwn(tag))
+                for paragraph in content
+                for sentence in paragraph
+                for token, tag in sentence
+                if not normalizer.is_punct(token) and not normalizer.is_stopword(token)
+            )
+
+        # The irregular forms in the WordNet exception lists
+        wn.ensure_loaded()
+        for pos, exceptions in getattr(wn, '_exception_map', {}).items():
+            pairs.update((form, pos) for form in exceptions)
+
+        return pairs
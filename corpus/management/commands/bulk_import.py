@@ -0,0 +1,149 @@
+# corpus.management.commands.bulk_import
+# Command to import many urls from a spreadsheet or list at a time.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to import many urls from a spreadsheet or list at a time.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import csv
+import sys
+
+from datetime import datetime
+from collections import Counter
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from corpus.bulk import FAILED, DEFAULT_CONCURRENCY, import_urls
+from corpus.nlp import get_tokenizer, get_tagger
+from corpus.features import get_normalizer
+from corpus import language
+
+
+##########################################################################
+## Bulk Import Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Fetches, preprocesses and stores the urls in a CSV file or list."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            'path', metavar='PATH',
+            help='a CSV file with a url column or a file with one url per line (- for stdin)',
+        )
+
+        parser.add_argument(
+            '-C', '--column', default='url', metavar='NAME',
+            help='the column of the CSV file that contains the urls',
+        )
+
+        parser.add_argument(
+            '-u', '--user', default=None, metavar='USERNAME',
+            help='the user to associate the documents with',
+        )
+
+        parser.add_argument(
+            '-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY, metavar='N',
+            help='maximum number of pages fetched at the same time',
+        )
+
+        parser.add_argument(
+            '-w', '--workers', type=int, default=None, metavar='N',
+            help='number of preprocessing processes (default is one per CPU)',
+        )
+
+        parser.add_argument(
+            '-b', '--batch', type=int, default=200, metavar='B',
+            help='number of urls fetched, preprocessed and stored at a time',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Imports the urls a batch at a time, reporting the progress of the
+        fetches and the outcome of every url.
+        """
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError("No user named {}".format(options['user']))
+
+        urls = self.read_urls(options['path'], options['column'])
+        if not urls:
+            raise CommandError("No urls in {}".format(options['path']))
+
+        # Load the models once so the forked workers share them.
+        get_tokenizer()
+        get_tagger()
+        get_normalizer()
+
+        started = datetime.now()
+        totals = Counter()
+        for idx in range(0, len(urls), options['batch']):
+            batch = urls[idx:idx+options['batch']]
+            fetched = Counter()
+
+            def progress(url, result, error):
+                fetched[error is None] += 1
+                done = sum(fetched.values())
+                if done % 25 == 0 or done == len(batch):
+                    self.stdout.write("  fetched {:,} of {:,} ({:,} errors)\n".format(
+                        done, len(batch), fetched[False]
+                    ))
+
+            outcomes = import_urls(
+                batch, user, options['concurrency'], options['workers'], callback=progress,
+            )
+
+            for outcome in outcomes:
+                totals[outcome.outcome] += 1
+                if outcome.outcome == FAILED:
+                    self.stderr.write("{}\t{}\t{}\n".format(outcome.url, outcome.outcome, outcome.error))
+                else:
+                    self.stdout.write("{}\t{}\t{}\n".format(outcome.url, outcome.outcome, outcome.document))
+
+            elapsed = (datetime.now() - started).total_seconds()
+            done = idx + len(batch)
+            self.stdout.write("{:,} of {:,} urls imported at {:0.2f} urls/sec\n".format(
+                done, len(urls), done / elapsed if elapsed else 0.0
+            ))
+
+        self.stdout.write("Imported {:,} urls in {}: {}\n".format(
+            len(urls), datetime.now() - started,
+            ", ".join("{:,} {}".format(count, name) for name, count in sorted(totals.items()))
+        ))
+        self.stdout.write(language.summary() + "\n")
+
+    def read_urls(self, path, column):
+        """
+        Returns the unique urls in the file in order, reading the named column
+        if the file is a CSV file with a header, otherwise the first column.
+        """
+        try:
+            f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+        except IOError as e:
+            raise CommandError("Could not read {}: {}".format(path, e))
+
+        with f:
+            rows = list(csv.reader(f))
+
+        if rows and column in rows[0]:
+            idx = rows[0].index(column)
+            rows = rows[1:]
+        else:
+            idx = 0
+
+        urls = (row[idx].strip() for row in rows if len(row) > idx)
+        return list(dict.fromkeys(url for url in urls if url.startswith(('http://', 'https://'))))
@@ -0,0 +1,116 @@
+# corpus.management.commands.compress_html
+# Command to train a compression dictionary and recompress the stored html.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to train a compression dictionary and recompress the stored html.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from corpus.models import Document, CompressionDictionary
+from corpus.fields import ZSTD, zstandard, current_dictionary, reset_dictionaries
+from corpus.fields import CompressedText, compress_text
+from django.core.management.base import BaseCommand, CommandError
+
+
+##########################################################################
+## Compress HTML Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Trains a zstd dictionary on the stored html and recompresses it."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-t', '--train', action='store_true', default=False,
+            help='train a new dictionary before recompressing the html',
+        )
+
+        parser.add_argument(
+            '-s', '--samples', type=int, default=2000, metavar='N',
+            help='number of recent pages to train the dictionary on',
+        )
+
+        parser.add_argument(
+            '-S', '--size', type=int, default=112640, metavar='BYTES',
+            help='maximum size of the trained dictionary in bytes',
+        )
+
+        parser.add_argument(
+            '-b', '--batch', type=int, default=500, metavar='B',
+            help='number of documents to recompress at a time',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Trains a dictionary on the most recent pages if asked to, then
+        recompresses the html of every document that is not compressed with
+        zstd and the newest dictionary. Running processes keep compressing
+        with the dictionary they started with until they are restarted, so
+        the command can be run again afterwards to recompress their pages.
+        The space of the replaced html is only returned to the operating
+        system by a VACUUM FULL of the documents table.
+        """
+        if zstandard is None:
+            raise CommandError("the zstandard package is required to train dictionaries")
+
+        if options['train']:
+            self.train(options['samples'], options['size'])
+
+        reset_dictionaries()
+        pk, _ = current_dictionary()
+
+        query = Document.objects.exclude(raw_html=None).order_by('id')
+        query = query.values_list('id', 'raw_html')
+
+        last, total, before, after = 0, 0, 0, 0
+        while True:
+            batch = list(query.filter(id__gt=last)[:options['batch']])
+            if not batch: break
+
+            for doc, html in batch:
+                if html.codec == ZSTD and html.dictionary == pk:
+                    continue
+
+                compressed = CompressedText(compress_text(html.text))
+                Document.objects.filter(id=doc).update(raw_html=compressed)
+                before += len(html.data)
+                after += len(compressed.data)
+                total += 1
+
+            last = batch[-1][0]
+
+        self.stdout.write(
+            "Recompressed {:,} documents with dictionary {} from {:,} to {:,} bytes\n".format(
+                total, pk or "none", before, after
+            )
+        )
+
+    def train(self, samples, size):
+        """
+        Trains a dictionary on the html of the most recent documents.
+        """
+        query = Document.objects.exclude(raw_html=None).order_by('-id')
+        pages = [
+            html.text.encode('utf-8')
+            for html in query.values_list('raw_html', flat=True)[:samples]
+        ]
+
+        if not pages:
+            raise CommandError("No documents with raw html in the database")
+
+        dictionary = zstandard.train_dictionary(size, pages)
+        stored = CompressionDictionary.objects.create(
+            data=dictionary.as_bytes(), samples=len(pages)
+        )
+
+        self.stdout.write("Trained {}\n".format(stored))
@@ -0,0 +1,73 @@
+# corpus.management.commands.dedupe
+# Command to index documents for near-duplicate detection.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to index documents for near-duplicate detection.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from corpus.models import Document, LSHBucket
+from django.core.management.base import BaseCommand
+from corpus.dedupe import minhash, find_duplicate, index_document
+
+
+##########################################################################
+## Dedupe Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Computes MinHash signatures and links near-duplicate documents."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-a', '--all', action='store_true', default=False,
+            help='recompute signatures and links for every document',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Documents are processed in the order they were created so that the
+        earliest copy of a story is the original that others link to.
+        """
+        query = Document.objects.exclude(content=None).order_by('created')
+        if options['all']:
+            # Rebuild the index so only earlier documents can be originals
+            LSHBucket.objects.all().delete()
+        else:
+            query = query.filter(minhash=None)
+
+        indexed, duplicates = 0, 0
+        query = query.only('id', 'content', 'minhash', 'duplicate_of', 'created')
+        for document in query.iterator():
+            document.minhash = minhash(document.content)
+            document.duplicate_of = None
+
+            if document.minhash:
+                document.duplicate_of = find_duplicate(
+                    document.minhash, exclude=document.id, before=document.created
+                )
+
+            # Update the fields directly to avoid triggering the save signals
+            Document.objects.filter(id=document.id).update(
+                minhash=document.minhash, duplicate_of=document.duplicate_of,
+            )
+            index_document(document)
+
+            indexed += 1
+            duplicates += document.duplicate_of is not None
+
+        self.stdout.write(
+            "Indexed {:,} documents, found {:,} near-duplicates\n".format(
+                indexed, duplicates
+            )
+        )
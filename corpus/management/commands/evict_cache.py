@@ -0,0 +1,45 @@
+# corpus.management.commands.evict_cache
+# Command to evict the least recently used preprocessed content from the cache.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to evict the least recently used preprocessed content from the cache.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from corpus.cache import evict, cache_stats
+from django.core.management.base import BaseCommand
+
+
+##########################################################################
+## Evict Cache Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Evicts the least recently used entries of the preprocessing cache."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-l', '--limit', type=int, default=None, metavar='BYTES',
+            help='maximum size of the cache (default settings.PREPROCESS_CACHE_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Evicts entries until the cache fits in the limit. Intended to be run
+        periodically, e.g. by a scheduler, alongside the ingest workers.
+        """
+        freed = evict(options['limit'])
+        stats = cache_stats()
+        self.stdout.write("Freed {:,} bytes; {:,} entries, {:,} bytes cached\n".format(
+            freed, stats['entries'], stats['size']
+        ))
@@ -0,0 +1,106 @@
+# corpus.management.commands.ingest
+# Command to run a worker that ingests the queued documents.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to run a worker that ingests the queued documents.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import time
+
+from django.utils import timezone
+from django.db import connections
+from django.core.management.base import BaseCommand
+
+from corpus.models import Document
+from corpus.cache import evict
+from corpus.budget import get_pool
+from corpus.ingest import ingest_next
+from corpus.nlp import get_tokenizer, get_tagger
+from corpus import language, rules
+
+
+##########################################################################
+## Ingest Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Fetches and processes the documents in the ingestion queue."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-s', '--sleep', type=float, default=2.0, metavar='SECS',
+            help='seconds to wait before polling an empty queue again',
+        )
+
+        parser.add_argument(
+            '-o', '--once', action='store_true', default=False,
+            help='exit when the queue is empty rather than waiting for documents',
+        )
+
+        parser.add_argument(
+            '-r', '--retry-failed', action='store_true', default=False,
+            help='queue the documents that failed to be ingested again',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Advances the queued documents one step at a time until interrupted
+        (any number of workers can run at once), reporting each transition
+        and, when the queue is idle, the pages the language gate skipped.
+        """
+        if options['retry_failed']:
+            count = Document.objects.filter(state=Document.FAILED).update(
+                state=Document.PENDING, attempts=0, error=None, modified=timezone.now()
+            )
+            self.stdout.write("Queued {:,} failed documents again\n".format(count))
+
+        # Load the models and start the isolated workers before connecting to
+        # the database so that the workers do not inherit the connection
+        get_tokenizer()
+        get_tagger()
+        connections.close_all()
+        get_pool()
+
+        total, advanced = 0, 0
+        try:
+            while True:
+                document = ingest_next()
+                if document is None:
+                    # Trim the preprocessing cache and report the work the
+                    # language gate avoided while the queue is idle
+                    if advanced:
+                        evict()
+                        advanced = 0
+                        self.stdout.write(language.summary() + "\n")
+                        self.stdout.write(rules.summary() + "\n")
+
+                    if options['once']: break
+                    time.sleep(options['sleep'])
+                    continue
+
+                total += 1
+                advanced += 1
+                if document.error:
+                    self.stderr.write("Document {} ({}): attempt {} failed: {}\n".format(
+                        document.id, document.state, document.attempts, document.error
+                    ))
+                else:
+                    self.stdout.write("Document {} {}\n".format(document.id, document.state))
+
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write("Advanced {:,} documents\n".format(total))
+        self.stdout.write(language.summary() + "\n")
+        self.stdout.write(rules.summary() + "\n")
@@ -0,0 +1,96 @@
+# corpus.management.commands.refetch
+# Command to fetch the pages of stored documents again if they have changed.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to fetch the pages of stored documents again if they have changed.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from datetime import timedelta
+from django.utils import timezone
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from corpus.client import fetch
+from corpus.exceptions import FetchError
+from corpus.ingest import PROCESSED_FIELDS
+from corpus.models import Document, DocumentFeatures, LSHBucket
+
+
+##########################################################################
+## Refetch Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Fetches stored documents again, queueing changed pages for processing."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-n', '--limit', type=int, default=None, metavar='N',
+            help='maximum number of documents to fetch again',
+        )
+
+        parser.add_argument(
+            '-d', '--days', type=int, default=1, metavar='DAYS',
+            help='only fetch documents that have not been modified for DAYS days',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Fetches the least recently modified processed documents again with a
+        conditional request using the ETag and Last-Modified date of the last
+        fetch. Pages that have not changed are not downloaded; pages that have
+        are stored and their document is queued to be processed again by the
+        ingest command.
+        """
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        query = Document.objects.filter(state=Document.PROCESSED, modified__lte=cutoff)
+        query = query.exclude(raw_html=None).order_by('modified')
+        query = query.values_list('id', 'long_url', 'raw_html', 'etag', 'last_modified')
+        if options['limit']:
+            query = query[:options['limit']]
+
+        unchanged, changed, errors = 0, 0, 0
+        for pk, url, html, etag, last_modified in query.iterator():
+            try:
+                fetched = fetch(url, etag, last_modified)
+            except FetchError as e:
+                errors += 1
+                self.stderr.write("Document {}: {}\n".format(pk, e))
+                continue
+
+            fields = {
+                'etag': fetched.etag,
+                'last_modified': fetched.last_modified,
+                'modified': timezone.now(),
+            }
+
+            if fetched.text is None or fetched.text == html:
+                unchanged += 1
+                Document.objects.filter(id=pk).update(**fields)
+                continue
+
+            changed += 1
+            fields.update({name: None for name in PROCESSED_FIELDS})
+            fields.update(raw_html=fetched.text, state=Document.FETCHED)
+
+            with transaction.atomic():
+                Document.objects.filter(id=pk).update(**fields)
+                LSHBucket.objects.filter(document_id=pk).delete()
+                DocumentFeatures.objects.filter(document_id=pk).delete()
+
+        self.stdout.write(
+            "{:,} documents unchanged, {:,} changed and queued, {:,} errors\n".format(
+                unchanged, changed, errors
+            )
+        )
@@ -0,0 +1,190 @@
+# corpus.management.commands.reprocess
+# Command to recompute the preprocessed content of stored documents.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to recompute the preprocessed content of stored documents.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+
+from datetime import datetime
+from django.db import connections, transaction
+from django.core.management.base import BaseCommand, CommandError
+
+from corpus.models import Document, DocumentFeatures
+from corpus.ingest import process_page
+from corpus.features import store_features
+from corpus.features import get_normalizer, features_version
+from corpus.dedupe import find_duplicate, index_document
+from corpus.cache import cache_stats, evict
+from corpus import language
+from corpus.nlp import preprocess_many, get_tokenizer, get_tagger
+
+
+##########################################################################
+## Worker Function
+##########################################################################
+
+def reprocess_document(document):
+    """
+    Extracts and preprocesses the raw html of a (url, html) document in a
+    pool worker, stripping the boilerplate of its domain, and returns the
+    values of the fields to update and the training features. Pages skipped
+    by the language and density gate or that take longer than the
+    preprocessing budget have their content, statistics and features
+    cleared. The title of the document is not changed.
+    """
+    fields, features, _ = process_page(document)
+    del fields['title']
+    return fields, features
+
+
+##########################################################################
+## Reprocess Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Recomputes the content, statistics, signatures and near-duplicate links of documents."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-w', '--workers', type=int, default=None, metavar='N',
+            help='number of worker processes (default is one per CPU)',
+        )
+
+        parser.add_argument(
+            '-c', '--chunksize', type=int, default=4, metavar='K',
+            help='number of documents sent to a worker at a time',
+        )
+
+        parser.add_argument(
+            '-b', '--batch', type=int, default=500, metavar='B',
+            help='number of documents read from and written to the database at a time',
+        )
+
+        parser.add_argument(
+            '-k', '--checkpoint', default='reprocess.checkpoint', metavar='PATH',
+            help='file to record the last reprocessed document id in',
+        )
+
+        parser.add_argument(
+            '-r', '--restart', action='store_true', default=False,
+            help='ignore an existing checkpoint and start from the first document',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Streams documents in primary key order a batch at a time, preprocesses
+        the batch on the worker pool, then writes the batch back in a single
+        transaction and records the last id in the checkpoint file so that
+        an interrupted run resumes after the last completed batch.
+        """
+        last = 0 if options['restart'] else self.read_checkpoint(options['checkpoint'])
+        if last:
+            self.stdout.write("Resuming after document {}\n".format(last))
+
+        # Load the models once so the forked workers share them.
+        get_tokenizer()
+        get_tagger()
+        get_normalizer()
+        version = features_version()
+
+        started = datetime.now()
+        total, errors, skipped = 0, 0, 0
+
+        while True:
+            batch = list(
+                Document.objects.filter(id__gt=last).exclude(raw_html=None)
+                .order_by('id').values_list('id', 'long_url', 'raw_html', 'created')[:options['batch']]
+            )
+            if not batch: break
+
+            # The pool is forked as the results are consumed, so the batch is
+            # finished before writing and each worker opens its own connection
+            connections.close_all()
+            results = list(preprocess_many(
+                ((url, str(html)) for _, url, html, _ in batch), workers=options['workers'],
+                chunksize=options['chunksize'], func=reprocess_document,
+            ))
+
+            with transaction.atomic():
+                for (pk, _, html, created), (result, error) in zip(batch, results):
+                    if error is not None:
+                        errors += 1
+                        self.stderr.write("Document {}: {}\n".format(pk, error))
+                        continue
+
+                    # Link the new signature to an earlier original, since
+                    # the documents are reprocessed in the order of their ids
+                    fields, features = result
+                    fields['duplicate_of'] = None
+                    if fields['minhash']:
+                        fields['duplicate_of'] = find_duplicate(
+                            fields['minhash'], exclude=pk, before=created
+                        )
+
+                    skipped += fields['skipped'] is not None
+                    language.record(fields['skipped'], html.size)
+                    Document.objects.filter(id=pk).update(**fields)
+                    index_document(Document(id=pk, minhash=fields['minhash']))
+
+                    if features is not None:
+                        store_features(pk, features, version)
+                    else:
+                        DocumentFeatures.objects.filter(document_id=pk).delete()
+
+            last = batch[-1][0]
+            total += len(batch)
+            self.write_checkpoint(options['checkpoint'], last)
+            evict()
+
+            elapsed = (datetime.now() - started).total_seconds()
+            self.stdout.write(
+                "{:,} documents reprocessed ({:,} errors, {:,} skipped) through id {} at {:0.2f} docs/sec\n".format(
+                    total, errors, skipped, last, total / elapsed if elapsed else 0.0
+                )
+            )
+
+        # The run is complete so it does not need to be resumed
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+        self.stdout.write(
+            "Reprocessed {:,} documents in {}; preprocessing cache: {}\n".format(
+                total, datetime.now() - started, cache_stats()
+            )
+        )
+        self.stdout.write(language.summary() + "\n")
+
+    def read_checkpoint(self, path):
+        """
+        Returns the last completed document id from the checkpoint or 0.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        try:
+            with open(path, 'r') as f:
+                return int(f.read().strip())
+        except ValueError:
+            raise CommandError("Could not read checkpoint at {}".format(path))
+
+    def write_checkpoint(self, path, last):
+        """
+        Atomically records the last completed document id in the checkpoint.
+        """
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            f.write("{}\n".format(last))
+        os.replace(tmp, path)
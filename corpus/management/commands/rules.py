@@ -0,0 +1,149 @@
+# corpus.management.commands.rules
+# Command to validate the per-domain extraction rules on stored pages.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to validate the per-domain extraction rules on stored pages.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import re
+import lxml.html
+
+from datetime import timedelta
+from corpus.models import Document
+from partisan.utils import timeit
+from readability.htmls import build_doc
+from corpus.rules import get_rules, select
+from corpus.nlp import ParsedDocument, element_paragraphs
+from django.core.management.base import BaseCommand, CommandError
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# The minimum proportion of pages a rule must match
+MIN_MATCHED = 0.9
+
+# The minimum mean agreement of the rule's words with readability's words
+MIN_AGREEMENT = 0.8
+
+# Words used to compare the text extracted by a rule and by readability
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+##########################################################################
+## Rules Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Compares the fast-path extraction rules with readability on stored pages."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            'hosts', nargs='*', metavar='HOST',
+            help='the domains whose rules to validate (default all)',
+        )
+
+        parser.add_argument(
+            '-n', '--limit', type=int, default=100, metavar='N',
+            help='maximum number of stored pages to validate each rule on',
+        )
+
+    def handle(self, *args, **options):
+        """
+        For each rule, extracts the most recent stored pages of its domain
+        with the rule and with readability, reporting how many pages the rule
+        matched, the mean agreement of the words extracted (the Jaccard
+        similarity of the sets of lowercase words) and the pages per second
+        of each method. Rules below the thresholds are reported as failing.
+        """
+        hosts = options['hosts'] or sorted(get_rules())
+        unknown = set(hosts) - set(get_rules())
+        if unknown:
+            raise CommandError("No extraction rules for {}".format(", ".join(sorted(unknown))))
+
+        failures = 0
+        for host in hosts:
+            query = Document.objects.exclude(raw_html=None).filter(
+                skipped=None, long_url__iregex=r'^https?://([^/]+\.)?{}([:/]|$)'.format(re.escape(host))
+            ).order_by('-created')
+            pages = [
+                (url, str(html)) for url, html in query.values_list('long_url', 'raw_html')[:options['limit']]
+            ]
+
+            if not pages:
+                self.stdout.write("{}: no stored pages\n".format(host))
+                continue
+
+            matched, agreement = 0, 0.0
+            fast, slow = timedelta(), timedelta()
+            for url, html in pages:
+                (ruled, readable), deltas = self.compare(url, html)
+                fast += deltas[0]
+                slow += deltas[1]
+
+                if ruled:
+                    matched += 1
+                    agreement += self.agreement(ruled, readable)
+
+            matched_ratio = matched / float(len(pages))
+            agreement = agreement / matched if matched else 0.0
+            passed = matched_ratio >= MIN_MATCHED and agreement >= MIN_AGREEMENT
+            failures += not passed
+
+            self.stdout.write(
+                "{} {}: matched {:0.1%} of {:,} pages, {:0.1%} agreement, "
+                "{:0.1f} pages/sec (readability {:0.1f} pages/sec)\n".format(
+                    "PASS" if passed else "FAIL", host, matched_ratio, len(pages),
+                    agreement, self.rate(len(pages), fast), self.rate(len(pages), slow),
+                )
+            )
+
+        if failures:
+            raise CommandError("{} extraction rules failed validation".format(failures))
+
+    def compare(self, url, html):
+        """
+        Returns the paragraphs of the page extracted by the rule for its
+        domain (or None if the rule does not match) and by readability, with
+        the time that each method took, including parsing the page.
+        """
+        def ruled():
+            selected = select(build_doc(html)[0], url)
+            return element_paragraphs(*selected) if selected is not None else None
+
+        def readable():
+            summary = ParsedDocument(build_doc(html)[0]).summary(html_partial=True)
+            return element_paragraphs(lxml.html.fragment_fromstring(summary, create_parent=True))
+
+        ruled, fast = timeit(ruled)()
+        readable, slow = timeit(readable)()
+        return (ruled, readable), (fast, slow)
+
+    def agreement(self, ruled, readable):
+        """
+        Returns the Jaccard similarity of the words of the paragraphs.
+        """
+        ruled = set(WORD.findall(" ".join(ruled).lower()))
+        readable = set(WORD.findall(" ".join(readable).lower()))
+        if not (ruled or readable):
+            return 1.0
+        return len(ruled & readable) / float(len(ruled | readable))
+
+    def rate(self, count, delta):
+        """
+        Returns the number of pages per second.
+        """
+        secs = delta.total_seconds()
+        return count / secs if secs > 0 else float('inf')
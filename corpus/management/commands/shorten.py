@@ -0,0 +1,74 @@
+# corpus.management.commands.shorten
+# Command to shorten the urls of documents that do not have short urls.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to shorten the urls of documents that do not have short urls.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from corpus.models import Document
+from corpus.bitly import shorten_many
+from corpus.exceptions import BitlyRateLimit
+from django.core.management.base import BaseCommand
+
+
+##########################################################################
+## Shorten Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Shortens the urls of documents without short urls with bit.ly."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-n', '--limit', type=int, default=None, metavar='N',
+            help='maximum number of documents to shorten',
+        )
+
+        parser.add_argument(
+            '-b', '--batch', type=int, default=100, metavar='B',
+            help='number of documents to shorten and update at a time',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Shortens the urls of the oldest documents without short urls a batch
+        at a time (using the short url cache before the API), stopping early
+        if bit.ly is throttling requests. Intended to be run periodically.
+        """
+        query = Document.objects.filter(short_url=None).exclude(state=Document.FAILED)
+        query = query.order_by('id').values_list('id', 'long_url')
+
+        last, total, errors = 0, 0, 0
+        while options['limit'] is None or total < options['limit']:
+            size = options['batch']
+            if options['limit'] is not None:
+                size = min(size, options['limit'] - total)
+
+            batch = list(query.filter(id__gt=last)[:size])
+            if not batch: break
+
+            shortened, failed = shorten_many(url for _, url in batch)
+            for pk, url in batch:
+                if url in shortened:
+                    Document.objects.filter(id=pk, short_url=None).update(short_url=shortened[url])
+
+            last = batch[-1][0]
+            total += len(shortened)
+            errors += len(failed)
+
+            if any(isinstance(error, BitlyRateLimit) for error in failed.values()):
+                self.stderr.write("bit.ly is rate limiting requests, try again later\n")
+                break
+
+        self.stdout.write("Shortened {:,} urls ({:,} errors)\n".format(total, errors))
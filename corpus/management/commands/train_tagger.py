@@ -0,0 +1,104 @@
+# corpus.management.commands.train_tagger
+# Command to train the compact backoff part-of-speech tagger.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Command to train the compact backoff part-of-speech tagger.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import pickle
+import random
+
+from django.conf import settings
+from corpus.models import Document
+from partisan.utils import timeit
+from nltk.tag.perceptron import PerceptronTagger
+from corpus.reader import TranscriptCorpusReader, TRANSCRIPTS
+from corpus.nlp import train_backoff_tagger, tag_agreement
+from django.core.management.base import BaseCommand, CommandError
+
+
+##########################################################################
+## Train Tagger Command
+##########################################################################
+
+class Command(BaseCommand):
+
+    help = "Trains the backoff tagger on the output of the perceptron tagger."
+
+    def add_arguments(self, parser):
+        """
+        Add command line argparse arguments.
+        """
+        parser.add_argument(
+            '-t', '--transcripts', default=TRANSCRIPTS, type=str, metavar='PATH',
+            help='path to the debates transcripts to tag with the perceptron',
+        )
+
+        parser.add_argument(
+            '-d', '--documents', type=int, default=0, metavar='N',
+            help='also train on the content of the N most recent documents '
+                 '(only if they were tagged by the perceptron tagger)',
+        )
+
+        parser.add_argument(
+            '-o', '--output', default=None, metavar='PATH',
+            help='where to write the tagger (default settings.NLP_TAGGER_PATH)',
+        )
+
+        parser.add_argument(
+            '-H', '--holdout', type=float, default=0.1, metavar='P',
+            help='proportion of the sentences held out to evaluate the tagger',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Tags the transcripts with the perceptron tagger, trains the backoff
+        tagger on most of the tagged sentences and reports its agreement with
+        the perceptron on the rest, then serializes it for NLP_TAGGER=backoff.
+        """
+        output = options['output'] or getattr(settings, 'NLP_TAGGER_PATH', None)
+        if not output:
+            raise CommandError("Specify an output path or set NLP_TAGGER_PATH")
+
+        sents = []
+        if os.path.isdir(options['transcripts']):
+            reader = TranscriptCorpusReader(options['transcripts'])
+            sents.extend(PerceptronTagger().tag_sents(reader.sents()))
+
+        if options['documents']:
+            query = Document.objects.exclude(content=None).order_by('-created')
+            for content in query.values_list('content', flat=True)[:options['documents']]:
+                sents.extend(sent for paragraph in content for sent in paragraph)
+
+        if not sents:
+            raise CommandError(
+                "No training sentences: unzip fixtures/debates.zip or use --documents"
+            )
+
+        random.Random(42).shuffle(sents)
+        split = int(len(sents) * options['holdout'])
+        test, train = sents[:split], sents[split:]
+
+        tagger, delta = timeit(train_backoff_tagger)(train)
+        self.stdout.write("Trained on {:,} sentences in {}\n".format(len(train), delta))
+
+        if test:
+            tagged = tagger.tag_sents([[token for token, _ in sent] for sent in test])
+            fine, coarse = tag_agreement(test, tagged)
+            self.stdout.write(
+                "{:0.1%} tag and {:0.1%} N/V/R/J agreement on {:,} held out sentences\n".format(
+                    fine, coarse, len(test)
+                )
+            )
+
+        with open(output, 'wb') as f:
+            pickle.dump(tagger, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.stdout.write("Wrote {:,} bytes to {}\n".format(os.path.getsize(output), output))
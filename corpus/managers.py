@@ -58,14 +58,25 @@ class CorpusManager(models.Manager):
         kwargs['user'] = user
         corpus = self.create(**kwargs)
 
-        # Now add all the documents the user has annotated to date.
-        for doc in Document.objects.filter(annotations__user=user):
+        # Now add all the processed documents the user has annotated to date,
+        # skipping documents without content (still in the ingestion queue,
+        # failed or skipped) and near-duplicates of documents already added.
+        documents = Document.objects.filter(
+            annotations__user=user, state=Document.PROCESSED, content__isnull=False,
+        )
+
+        originals = set()
+        for doc in documents.order_by('created'):
+            original = doc.duplicate_of_id or doc.id
+            if original in originals: continue
+
             if corpus.labeled:
                 label = doc.label(user)
                 if label is None: continue
             else:
                 label = None
 
+            originals.add(original)
             LabeledDocument.objects.create(
                 corpus=corpus, document=doc, label=label,
             )
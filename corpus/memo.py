@@ -0,0 +1,205 @@
+# corpus.memo
+# Paragraph-level memoization of tagged sentences.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Paragraph-level memoization of tagged sentences.
+
+Articles from the same outlet repeat many paragraphs (bylines, related
+coverage blurbs, disclaimers, pull quotes) that are otherwise tokenized and
+tagged again in every document. The ParagraphCache maps the hash of the text
+of a paragraph to its tagged sentences in a bounded in-memory LRU, backed by
+an optional on-disk SQLite database that is shared by every process on the
+host and survives restarts. The database keeps the most recently added
+paragraphs, deleting the oldest ones when it grows past its size.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import sqlite3
+import hashlib
+import threading
+
+from collections import Counter, OrderedDict
+from corpus.fields import encode_content, decode_content
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# SQL to create the on-disk cache table
+CREATE_SQL = (
+    "CREATE TABLE IF NOT EXISTS paragraphs "
+    "(key BLOB PRIMARY KEY, content BLOB NOT NULL)"
+)
+
+# SQL to delete all but the newest rows of the on-disk cache table
+EVICT_SQL = (
+    "DELETE FROM paragraphs "
+    "WHERE rowid <= (SELECT max(rowid) FROM paragraphs) - ?"
+)
+
+# Default maximum number of paragraphs in the on-disk cache
+DEFAULT_DISK_SIZE = 1000000
+
+
+##########################################################################
+## Paragraph Cache
+##########################################################################
+
+class ParagraphCache(object):
+    """
+    A bounded LRU of tagged paragraphs keyed by the hash of the preprocessor
+    version and the paragraph text. If a path is given, misses in memory are
+    looked up on disk and new entries are written to disk when flushed, at
+    most disk_size of them. The cache can be shared by threads; entries are
+    stored as tuples and returned as new lists, so callers cannot modify the
+    sentences cached for other documents.
+    """
+
+    def __init__(self, version, size=10000, path=None, disk_size=DEFAULT_DISK_SIZE):
+        self.version = version.encode('utf-8')
+        self.size = size
+        self.path = path
+        self.disk_size = disk_size
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.counts = Counter(hits=0, disk_hits=0, misses=0, sentences=0, words=0)
+
+        self._conn = None
+        self._pid = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self):
+        """
+        The connection to the on-disk cache, opened on first use in each
+        process since SQLite connections cannot be shared across a fork.
+        """
+        if self.path is None:
+            return None
+
+        if self._conn is None or self._pid != os.getpid():
+            # Use of the connection is serialized by the lock of the cache
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(CREATE_SQL)
+            self._pid = os.getpid()
+        return self._conn
+
+    def key(self, paragraph):
+        """
+        Returns the digest identifying the tagged paragraph.
+        """
+        digest = hashlib.sha1(self.version)
+        digest.update(b"\x00")
+        digest.update(paragraph.encode('utf-8'))
+        return digest.digest()
+
+    def get(self, paragraph):
+        """
+        Returns the tagged sentences of the paragraph or None on a miss. The
+        sentences and words of a hit are counted as tagging that was saved.
+        """
+        key = self.key(paragraph)
+        with self._lock:
+            tagged = self.entries.get(key)
+
+            if tagged is not None:
+                self.entries.move_to_end(key)
+                self.counts['hits'] += 1
+            elif self.path is not None:
+                row = self.conn.execute(
+                    "SELECT content FROM paragraphs WHERE key=?", (key,)
+                ).fetchone()
+                if row is not None:
+                    tagged = self.remember(key, decode_content(row[0])[0])
+                    self.counts['disk_hits'] += 1
+
+            if tagged is None:
+                self.counts['misses'] += 1
+                return None
+
+            self.counts['sentences'] += len(tagged)
+            self.counts['words'] += sum(map(len, tagged))
+
+        return [list(sentence) for sentence in tagged]
+
+    def set(self, paragraph, tagged):
+        """
+        Caches the tagged sentences of the paragraph in memory and queues
+        them to be written to disk on the next flush.
+        """
+        key = self.key(paragraph)
+        with self._lock:
+            tagged = self.remember(key, tagged)
+            if self.path is not None:
+                self.pending[key] = tagged
+
+    def remember(self, key, tagged):
+        """
+        Adds an entry to the in-memory LRU as a tuple of sentence tuples,
+        evicting the least recently used, and returns the stored entry.
+        """
+        tagged = tuple(tuple(sentence) for sentence in tagged)
+        if self.size <= 0:
+            return tagged
+
+        with self._lock:
+            self.entries[key] = tagged
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return tagged
+
+    def flush(self):
+        """
+        Writes the queued entries to disk in a single transaction, then
+        deletes the oldest entries beyond the disk size. Entries written by
+        another process in the meantime are left as they are.
+        """
+        with self._lock:
+            if not self.pending:
+                return
+
+            rows = [
+                (key, encode_content([tagged]))
+                for key, tagged in self.pending.items()
+            ]
+            self.pending.clear()
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO paragraphs (key, content) VALUES (?, ?)", rows
+                )
+                if self.disk_size:
+                    self.conn.execute(EVICT_SQL, (self.disk_size,))
+
+    def clear(self):
+        """
+        Empties the in-memory cache and resets the statistics.
+        """
+        with self._lock:
+            self.entries.clear()
+            self.pending.clear()
+            for name in self.counts:
+                self.counts[name] = 0
+
+    def stats(self):
+        """
+        Returns the hit, miss and hit rate statistics of this process along
+        with the number of sentences and words whose tagging was saved.
+        """
+        with self._lock:
+            stats = dict(self.counts)
+            stats['entries'] = len(self.entries)
+
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (lookups - stats['misses']) / float(lookups) if lookups else 0.0
+        return stats
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:17
+from __future__ import unicode_literals
+
+import corpus.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0004_label_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='packed',
+            field=corpus.fields.TaggedContentField(blank=True, default=None, null=True),
+        ),
+    ]
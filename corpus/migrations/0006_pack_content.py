@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:17
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def pack_content(apps, schema_editor):
+    """
+    Encodes the pickled content of every document in the compact format.
+    """
+    Document = apps.get_model('corpus', 'Document')
+    query = Document.objects.exclude(content=None).only('id', 'content')
+    for document in query.iterator():
+        Document.objects.filter(id=document.id).update(packed=document.content)
+
+
+def unpack_content(apps, schema_editor):
+    """
+    Decodes the compact content of every document back into the pickle.
+    """
+    Document = apps.get_model('corpus', 'Document')
+    query = Document.objects.exclude(packed=None).only('id', 'packed')
+    for document in query.iterator():
+        Document.objects.filter(id=document.id).update(content=list(document.packed))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0005_document_packed'),
+    ]
+
+    operations = [
+        migrations.RunPython(pack_content, unpack_content),
+    ]
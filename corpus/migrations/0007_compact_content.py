@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:17
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0006_pack_content'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='document',
+            name='content',
+        ),
+        migrations.RenameField(
+            model_name='document',
+            old_name='packed',
+            new_name='content',
+        ),
+    ]
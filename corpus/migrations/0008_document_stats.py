@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:18
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def count_stats(apps, schema_editor):
+    """
+    Reads the paragraph and sentence counts from the header of the content.
+    """
+    Document = apps.get_model('corpus', 'Document')
+    query = Document.objects.exclude(content=None).only('id', 'content')
+    for document in query.iterator():
+        stats = document.content.stats
+        Document.objects.filter(id=document.id).update(
+            n_paras=stats['paragraphs'], n_sents=stats['sentences'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0007_compact_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='n_paras',
+            field=models.SmallIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='n_sents',
+            field=models.SmallIntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.RunPython(count_stats, migrations.RunPython.noop),
+    ]
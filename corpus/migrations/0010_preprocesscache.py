@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:21
+from __future__ import unicode_literals
+
+import corpus.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0009_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreprocessCache',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('content', corpus.fields.TaggedContentField()),
+                ('size', models.IntegerField()),
+                ('hits', models.IntegerField(default=0)),
+                ('accessed', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'preprocess_cache',
+            },
+        ),
+    ]
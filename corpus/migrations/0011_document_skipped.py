@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0010_preprocesscache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='skipped',
+            field=models.CharField(blank=True, choices=[('sparse', 'Too little text'), ('language', 'Not in English')], default=None, editable=False, max_length=16, null=True),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:27
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0011_document_skipped'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Domain',
+            fields=[
+                ('host', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('documents', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'domains',
+            },
+        ),
+        migrations.CreateModel(
+            name='BoilerplateParagraph',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=40)),
+                ('count', models.IntegerField(default=0)),
+                ('domain', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='paragraphs', to='corpus.Domain')),
+            ],
+            options={
+                'db_table': 'boilerplate_paragraphs',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='boilerplateparagraph',
+            unique_together=set([('domain', 'digest')]),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:31
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0012_boilerplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='truncated',
+            field=models.CharField(blank=True, choices=[('paragraphs', 'Too many paragraphs'), ('tokens', 'Too many tokens'), ('timeout', 'Out of time')], default=None, editable=False, max_length=16, null=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:32
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0013_document_truncated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentFeatures',
+            fields=[
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='features', serialize=False, to='corpus.Document')),
+                ('version', models.CharField(max_length=64)),
+                ('lemmas', models.TextField()),
+            ],
+            options={
+                'db_table': 'document_features',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:38
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0014_documentfeatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='state',
+            field=models.CharField(choices=[('pending', 'Waiting to be fetched'), ('fetched', 'Waiting to be processed'), ('processed', 'Processed'), ('failed', 'Failed')], db_index=True, default='processed', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='attempts',
+            field=models.SmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='error',
+            field=models.TextField(blank=True, default=None, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0015_document_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='etag',
+            field=models.CharField(blank=True, default=None, editable=False, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='last_modified',
+            field=models.CharField(blank=True, default=None, editable=False, max_length=64, null=True),
+        ),
+    ]
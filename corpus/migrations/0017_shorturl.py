@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:43
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def seed_short_urls(apps, schema_editor):
+    """
+    Adds the short url of every document that has one to the cache.
+    """
+    Document = apps.get_model('corpus', 'Document')
+    ShortURL = apps.get_model('corpus', 'ShortURL')
+
+    query = Document.objects.exclude(short_url=None).exclude(short_url='')
+    ShortURL.objects.bulk_create([
+        ShortURL(long_url=long_url, short_url=short_url)
+        for long_url, short_url in query.values_list('long_url', 'short_url').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0016_document_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortURL',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('long_url', models.URLField(max_length=2000, unique=True)),
+                ('short_url', models.URLField(max_length=30)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'short_urls',
+            },
+        ),
+        migrations.RunPython(seed_short_urls, migrations.RunPython.noop),
+    ]
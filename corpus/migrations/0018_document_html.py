@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:49
+from __future__ import unicode_literals
+
+import corpus.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0017_shorturl'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompressionDictionary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField()),
+                ('samples', models.IntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'compression_dictionaries',
+                'get_latest_by': 'created',
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='html',
+            field=corpus.fields.CompressedTextField(blank=True, default=None, null=True),
+        ),
+    ]
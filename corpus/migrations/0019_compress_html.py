@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:49
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# Number of documents read into memory at a time
+BATCH_SIZE = 500
+
+
+def copy_html(apps, source, target):
+    """
+    Copies the html of every document from the source field to the target
+    field a batch at a time, compressing or decompressing it on the way.
+    """
+    Document = apps.get_model('corpus', 'Document')
+    query = Document.objects.exclude(**{source: None}).order_by('id')
+
+    last = 0
+    while True:
+        batch = list(query.filter(id__gt=last).values_list('id', source)[:BATCH_SIZE])
+        if not batch: break
+
+        for pk, html in batch:
+            Document.objects.filter(id=pk).update(**{target: str(html)})
+        last = batch[-1][0]
+
+
+def compress_html(apps, schema_editor):
+    """
+    Compresses the raw html of every document.
+    """
+    copy_html(apps, 'raw_html', 'html')
+
+
+def decompress_html(apps, schema_editor):
+    """
+    Decompresses the compressed html of every document back into the text.
+    """
+    copy_html(apps, 'html', 'raw_html')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0018_document_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_html, decompress_html),
+    ]
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:49
+# PostgreSQL only returns the space of the dropped column to the operating
+# system after a VACUUM FULL documents, e.g. before `benchmark html`.
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0019_compress_html'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='document',
+            name='raw_html',
+        ),
+        migrations.RenameField(
+            model_name='document',
+            old_name='html',
+            new_name='raw_html',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 16:56
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def clear_signatures(apps, schema_editor):
+    """
+    Clears every signature and bucket so the dedupe command recomputes them.
+    """
+    Document = apps.get_model('corpus', 'Document')
+    LSHBucket = apps.get_model('corpus', 'LSHBucket')
+
+    LSHBucket.objects.all().delete()
+    Document.objects.exclude(minhash=None).update(minhash=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0020_compact_html'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.7 on 2026-10-18 17:01
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('corpus', '0021_rehash_minhash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='n_paras',
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='n_sents',
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='n_words',
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='n_vocab',
+            field=models.IntegerField(blank=True, default=None, null=True),
+        ),
+    ]
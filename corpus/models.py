@@ -20,9 +20,12 @@ Database models for the corpus app
 from django.db import models
 from autoslug import AutoSlugField
 from partisan.utils import nullable
+from corpus.fields import TaggedContentField, CompressedTextField
+from corpus.language import SPARSE, LANGUAGE
+from corpus.budget import PARAGRAPHS, TOKENS, TIMEOUT
 from django.core.urlresolvers import reverse
 from model_utils.models import TimeStampedModel
-from picklefield.fields import PickledObjectField
+from django.contrib.postgres.fields import ArrayField
 from corpus.managers import AnnotationManager, CorpusManager
 
 from operator import itemgetter
@@ -34,16 +37,57 @@ from operator import itemgetter
 class Document(TimeStampedModel):
     """
     Describes a document that is part of one or more corpora.
+
+    Documents submitted through the API are created pending and move through
+    the ingestion queue (see corpus.ingest) to fetched, then processed, or to
+    failed. Documents saved outside of the queue are fetched and processed
+    by the pre_save signal, so they are processed by default.
     """
 
+    PENDING   = "pending"
+    FETCHED   = "fetched"
+    PROCESSED = "processed"
+    FAILED    = "failed"
+
+    STATES = (
+        (PENDING, "Waiting to be fetched"),
+        (FETCHED, "Waiting to be processed"),
+        (PROCESSED, "Processed"),
+        (FAILED, "Failed"),
+    )
+
+    SKIPPED = (
+        (SPARSE, "Too little text"),
+        (LANGUAGE, "Not in English"),
+    )
+
+    TRUNCATED = (
+        (PARAGRAPHS, "Too many paragraphs"),
+        (TOKENS, "Too many tokens"),
+        (TIMEOUT, "Out of time"),
+    )
+
     title     = models.CharField(max_length=255, **nullable)                 # The title of the document, extracted from HTML
     long_url  = models.URLField(max_length=2000, unique=True)                # The long url for the document
     short_url = models.URLField(max_length=30, **nullable)                   # The bit.ly shortened url
-    raw_html  = models.TextField(**nullable)                                 # The html content fetched (hopefully)
-    content   = PickledObjectField(**nullable)                               # The preprocessed NLP content in a parsable text representation
+    raw_html  = CompressedTextField(**nullable)                              # The html content fetched (hopefully), compressed
+    etag      = models.CharField(max_length=255, editable=False, **nullable)   # The ETag of the response the html was fetched from
+    last_modified = models.CharField(max_length=64, editable=False, **nullable)  # The Last-Modified date of that response
+    content   = TaggedContentField(**nullable)                               # The preprocessed NLP content in a compact binary representation
     signature = models.CharField(max_length=44, editable=False, **nullable)  # A base64 encoded hash of the content
-    n_words   = models.SmallIntegerField(**nullable)                         # The word count of the document
-    n_vocab   = models.SmallIntegerField(**nullable)                         # The size of the vocabulary used
+    n_paras   = models.IntegerField(**nullable)                              # The paragraph count of the document
+    n_sents   = models.IntegerField(**nullable)                              # The sentence count of the document
+    n_words   = models.IntegerField(**nullable)                              # The word count of the document
+    n_vocab   = models.IntegerField(**nullable)                              # The size of the vocabulary used
+    minhash   = ArrayField(models.BigIntegerField(), editable=False, **nullable)  # The MinHash signature of the content shingles
+    skipped   = models.CharField(max_length=16, choices=SKIPPED, editable=False, **nullable)  # Why the document was not preprocessed
+    truncated = models.CharField(max_length=16, choices=TRUNCATED, editable=False, **nullable)  # Why the document was only partly preprocessed
+    duplicate_of = models.ForeignKey(
+        'self', related_name='duplicates', on_delete=models.SET_NULL, **nullable
+    )                                                                        # The original if this is a near-duplicate
+    state     = models.CharField(max_length=16, choices=STATES, default=PROCESSED, db_index=True, editable=False)  # The ingestion state of the document
+    attempts  = models.SmallIntegerField(default=0, editable=False)          # The failed attempts to ingest the document
+    error     = models.TextField(editable=False, **nullable)                 # Why the last attempt to ingest the document failed
 
     # Users are associated with documents by downloading and annotating them.
     users     = models.ManyToManyField(
@@ -98,7 +142,148 @@ class Document(TimeStampedModel):
 
     def __str__(self):
         if self.title: return self.title
-        return self.short_url
+        return self.short_url or self.long_url
+
+
+class LSHBucket(models.Model):
+    """
+    Maps the hash of one band of a document's MinHash signature to the
+    document, so that near-duplicates can be found by bucket lookups.
+    """
+
+    document  = models.ForeignKey('corpus.Document', related_name='buckets')
+    bucket    = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        db_table = "lsh_buckets"
+
+    def __str__(self):
+        return "{} in bucket {}".format(self.document, self.bucket)
+
+
+class DocumentFeatures(models.Model):
+    """
+    The normalized lemma stream of a document that is used to train models,
+    computed when the document is ingested so that training does not
+    normalize every document in every fold. The version identifies the
+    preprocessor and normalizer that produced it.
+    """
+
+    document  = models.OneToOneField(
+        'corpus.Document', primary_key=True, related_name='features'
+    )
+    version   = models.CharField(max_length=64)                           # The version of the preprocessing and normalization
+    lemmas    = models.TextField()                                        # The space separated normalized lemmas
+
+    class Meta:
+        db_table = "document_features"
+
+    def __str__(self):
+        return "{} features of {}".format(self.version, self.document)
+
+
+class ShortURL(models.Model):
+    """
+    Memoizes the bit.ly short url of a long url so that every worker shares
+    the results of the rate limited API, including for urls that are stored
+    again after their document was deleted.
+    """
+
+    long_url  = models.URLField(max_length=2000, unique=True)                # The url that was shortened
+    short_url = models.URLField(max_length=30)                               # The bit.ly shortened url
+    created   = models.DateTimeField(auto_now_add=True)                      # When the url was shortened
+
+    class Meta:
+        db_table = "short_urls"
+
+    def __str__(self):
+        return "{} -> {}".format(self.short_url, self.long_url)
+
+
+class CompressionDictionary(models.Model):
+    """
+    A zstd dictionary trained on a sample of stored pages by the compress_html
+    command. Compressed html records the id of the dictionary it was compressed
+    with, so the dictionaries are stored (and backed up) with the documents and
+    must not be deleted while any document is compressed with them.
+    """
+
+    data      = models.BinaryField()                                     # The trained zstd dictionary
+    samples   = models.IntegerField()                                    # The number of pages it was trained on
+    created   = models.DateTimeField(auto_now_add=True)                  # When the dictionary was trained
+
+    class Meta:
+        db_table = "compression_dictionaries"
+        get_latest_by = "created"
+
+    def __str__(self):
+        return "Dictionary {} ({:,} bytes from {:,} pages)".format(
+            self.id, len(self.data), self.samples
+        )
+
+
+##########################################################################
+## Preprocessing Cache
+##########################################################################
+
+class PreprocessCache(models.Model):
+    """
+    Content-addressed cache of preprocessed content, keyed by the hash of the
+    extracted paragraph text and the version of the preprocessor, so the same
+    article body fetched from another url is not tokenized and tagged again.
+    """
+
+    key       = models.CharField(max_length=64, primary_key=True)         # The sha256 hex digest of the version and text
+    content   = TaggedContentField()                                      # The preprocessed content of the text
+    size      = models.IntegerField()                                     # The size of the encoded content in bytes
+    hits      = models.IntegerField(default=0)                            # The number of times the entry has been used
+    accessed  = models.DateTimeField(auto_now_add=True, db_index=True)    # The last time the entry was used (for eviction)
+
+    class Meta:
+        db_table = "preprocess_cache"
+
+    def __str__(self):
+        return "{} ({} bytes, {} hits)".format(self.key, self.size, self.hits)
+
+
+##########################################################################
+## Boilerplate Models
+##########################################################################
+
+class Domain(models.Model):
+    """
+    A host that documents are fetched from, counting the documents that its
+    boilerplate model has been learned from.
+    """
+
+    host      = models.CharField(max_length=255, primary_key=True)        # The lowercase host name without a www. prefix
+    documents = models.IntegerField(default=0)                            # The number of documents learned from
+
+    class Meta:
+        db_table = "domains"
+
+    def __str__(self):
+        return self.host
+
+
+class BoilerplateParagraph(models.Model):
+    """
+    Counts the documents from a domain that contain a paragraph, identified
+    by the hash of its normalized text. Paragraphs that repeat on many pages
+    of a domain (navigation, share buttons, newsletter footers) are stripped
+    before the text of new pages from the domain is tagged.
+    """
+
+    domain    = models.ForeignKey('corpus.Domain', related_name='paragraphs')
+    digest    = models.CharField(max_length=40)                           # The sha1 hex digest of the normalized text
+    count     = models.IntegerField(default=0)                            # The number of documents containing the paragraph
+
+    class Meta:
+        db_table = "boilerplate_paragraphs"
+        unique_together = ("domain", "digest")
+
+    def __str__(self):
+        return "{} on {} pages of {}".format(self.digest, self.count, self.domain)
 
 
 ##########################################################################
@@ -17,12 +17,31 @@ Provides utilities for natural language processing
 ## Imports
 ##########################################################################
 
-import bs4
+import re
 import nltk
+import pickle
+import sqlite3
+import logging
+import threading
+import lxml.html
+import multiprocessing
 
-from collections import Counter
-from corpus.exceptions import NLTKError
+from partisan.utils import signature, timeit, get_setting
+from functools import partial
+from itertools import chain
+from collections import namedtuple
+from readability.htmls import build_doc
+from readability.cleaners import html_cleaner
 from readability.readability import Document
+from nltk.tag.perceptron import PerceptronTagger
+from nltk.tag.sequential import DefaultTagger, RegexpTagger
+from nltk.tag.sequential import AffixTagger, UnigramTagger, BigramTagger
+from corpus.memo import ParagraphCache, DEFAULT_DISK_SIZE
+from corpus import language
+from corpus.budget import truncate, run_isolated, map_isolated
+from corpus import rules
+from corpus.exceptions import CorpusException, NLTKError, ExtractionError
+from django.core.exceptions import ImproperlyConfigured
 
 ##########################################################################
 ## Module Constants
@@ -33,6 +52,396 @@ TAGS = [
     'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'h7', 'p', 'li'
 ]
 
+# Logger for reporting on the loading of NLTK resources
+logger = logging.getLogger(__name__)
+
+# Incremented whenever a change to preprocessing changes its output
+PREPROCESSOR_VERSION = 1
+
+# The punkt sentence tokenizer model used by all tokenizers
+PUNKT = 'tokenizers/punkt/english.pickle'
+
+# The default tokenizer backend if not specified in settings.NLP_TOKENIZER
+DEFAULT_TOKENIZER = 'regex'
+
+# The default tagger backend if not specified in settings.NLP_TAGGER
+DEFAULT_TAGGER = 'perceptron'
+
+# The default minimum number of tokens in each chunk and the default
+# maximum number of chunks when the paragraphs of a single document are
+# split across the isolated workers
+DEFAULT_PARALLEL_TOKENS = 4000
+DEFAULT_PARALLEL_CHUNKS = 4
+
+# The process-wide tokenizer (loaded lazily by get_tokenizer)
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+# The process-wide part-of-speech tagger (loaded lazily by get_tagger)
+_tagger = None
+_tagger_lock = threading.Lock()
+
+# The process-wide paragraph cache (constructed lazily by get_paragraph_cache)
+_paragraph_cache = None
+_paragraph_cache_lock = threading.Lock()
+
+
+##########################################################################
+## Tokenization
+##########################################################################
+
+class Tokenizer(object):
+    """
+    Tokenizers split a paragraph of text into a list of sentences, which are
+    lists of tokens. Subclasses implement tokenize; all of them use the punkt
+    model (loaded once per tokenizer) to find the sentence boundaries.
+    """
+
+    def __init__(self):
+        self.sentences = nltk.data.load(PUNKT)
+
+    def tokenize(self, paragraph):
+        raise NotImplementedError("tokenizers must implement tokenize")
+
+
+class NLTKTokenizer(Tokenizer):
+    """
+    The reference tokenizer: splits the paragraph into sentence strings with
+    punkt then word tokenizes each sentence with nltk.wordpunct_tokenize.
+    """
+
+    def tokenize(self, paragraph):
+        return [
+            nltk.wordpunct_tokenize(sent)
+            for sent in self.sentences.tokenize(paragraph)
+        ]
+
+
+class RegexTokenizer(Tokenizer):
+    """
+    A fast tokenizer that produces the same output as the NLTKTokenizer. It
+    only uses punkt for the sentence boundary offsets, then scans each span
+    of the paragraph with the precompiled wordpunct regular expression rather
+    than copying out sentence strings and tokenizing them one by one.
+    """
+
+    # The pattern used by nltk.wordpunct_tokenize
+    pattern = re.compile(r'\w+|[^\w\s]+', re.UNICODE | re.MULTILINE | re.DOTALL)
+
+    def tokenize(self, paragraph):
+        findall = self.pattern.findall
+        return [
+            findall(paragraph, start, end)
+            for start, end in self.sentences.span_tokenize(paragraph)
+        ]
+
+
+# Tokenizer backends that can be selected with settings.NLP_TOKENIZER
+TOKENIZERS = {
+    'nltk': NLTKTokenizer,
+    'regex': RegexTokenizer,
+}
+
+
+def get_tokenizer():
+    """
+    Returns the tokenizer shared by the entire process, constructing the
+    backend named by settings.NLP_TOKENIZER on first use.
+    """
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                name = get_setting('NLP_TOKENIZER', DEFAULT_TOKENIZER)
+                if name not in TOKENIZERS:
+                    raise ImproperlyConfigured(
+                        "unknown NLP_TOKENIZER '{}', choose from {}".format(
+                            name, ", ".join(sorted(TOKENIZERS))
+                        )
+                    )
+
+                _tokenizer = TOKENIZERS[name]()
+    return _tokenizer
+
+
+##########################################################################
+## Part of Speech Tagging
+##########################################################################
+
+def train_backoff_tagger(sents):
+    """
+    Trains a compact backoff tagger on tagged sentences (e.g. the output of
+    the perceptron tagger): a bigram tagger backed off to a unigram tagger,
+    a suffix tagger, a number tagger and finally tagging everything a noun.
+    Each tagger only stores the contexts it cannot leave to its backoff.
+    """
+    sents = list(sents)
+    tagger = DefaultTagger('NN')
+    tagger = RegexpTagger([(r'^-?[0-9]+([.,][0-9]+)*$', 'CD')], backoff=tagger)
+    tagger = AffixTagger(sents, affix_length=-3, min_stem_length=2, backoff=tagger)
+    tagger = UnigramTagger(sents, backoff=tagger)
+    return BigramTagger(sents, cutoff=1, backoff=tagger)
+
+
+def load_backoff_tagger():
+    """
+    Loads the backoff tagger serialized by the train_tagger command to
+    settings.NLP_TAGGER_PATH.
+    """
+    path = get_setting('NLP_TAGGER_PATH')
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (TypeError, IOError) as e:
+        raise ImproperlyConfigured(
+            "could not load the backoff tagger from NLP_TAGGER_PATH "
+            "(run the train_tagger command): {}".format(e)
+        )
+
+
+# Tagger backends that can be selected with settings.NLP_TAGGER
+TAGGERS = {
+    'perceptron': PerceptronTagger,
+    'backoff': load_backoff_tagger,
+}
+
+
+def tagger_name():
+    """
+    Returns the name of the tagger backend selected by settings.NLP_TAGGER.
+    """
+    name = get_setting('NLP_TAGGER', DEFAULT_TAGGER)
+    if name not in TAGGERS:
+        raise ImproperlyConfigured(
+            "unknown NLP_TAGGER '{}', choose from {}".format(
+                name, ", ".join(sorted(TAGGERS))
+            )
+        )
+    return name
+
+
+def tag_agreement(reference, tagged):
+    """
+    Compares two taggings of the same sentences, returning the proportion of
+    tokens with the same tag and the proportion with the same coarse class:
+    noun, verb, adverb, adjective (the first letter of the tag, which is all
+    that lemmatization uses) or other.
+    """
+    coarse = lambda tag: tag[0] if tag[:1] in ('N', 'V', 'R', 'J') else None
+
+    total, fine, coarse_matches = 0, 0, 0
+    for expected, actual in zip(reference, tagged):
+        for (_, etag), (_, atag) in zip(expected, actual):
+            total += 1
+            fine += etag == atag
+            coarse_matches += coarse(etag) == coarse(atag)
+
+    if not total:
+        return 0.0, 0.0
+    return fine / float(total), coarse_matches / float(total)
+
+
+def get_tagger():
+    """
+    Returns the part-of-speech tagger shared by the entire process, loading
+    the backend named by settings.NLP_TAGGER from disk on first use. Note
+    that calling nltk.pos_tag directly constructs (and loads) a new
+    perceptron tagger on every call, which costs more than tagging a
+    typical sentence.
+    """
+    global _tagger
+    if _tagger is None:
+        with _tagger_lock:
+            if _tagger is None:
+                _tagger = TAGGERS[tagger_name()]()
+    return _tagger
+
+
+def pos_tag(tokens):
+    """
+    Tags a single tokenized sentence with the shared tagger, returning a
+    list of (token, tag) pairs as nltk.pos_tag does.
+    """
+    return get_tagger().tag(tokens)
+
+
+def pos_tag_sents(sents):
+    """
+    Tags a batch of tokenized sentences (e.g. a paragraph or a document) in
+    one call to the shared tagger, returning a list of tagged sentences.
+    """
+    return get_tagger().tag_sents(sents)
+
+
+##########################################################################
+## Paragraph Memoization
+##########################################################################
+
+def get_paragraph_cache():
+    """
+    Returns the cache of tagged paragraphs shared by the entire process. It
+    holds settings.PARAGRAPH_CACHE_SIZE paragraphs in memory (0 disables it)
+    and if settings.PARAGRAPH_CACHE_PATH is set, is backed by a SQLite
+    database at that path that is shared by every process on the host and
+    holds at most settings.PARAGRAPH_CACHE_DISK_SIZE paragraphs.
+    """
+    global _paragraph_cache
+    if _paragraph_cache is None:
+        with _paragraph_cache_lock:
+            if _paragraph_cache is None:
+                size = get_setting('PARAGRAPH_CACHE_SIZE', 10000)
+                path = get_setting('PARAGRAPH_CACHE_PATH')
+                disk_size = get_setting('PARAGRAPH_CACHE_DISK_SIZE', DEFAULT_DISK_SIZE)
+                _paragraph_cache = ParagraphCache(
+                    preprocessor_version(), size=size, path=path or None, disk_size=disk_size
+                )
+    return _paragraph_cache
+
+
+##########################################################################
+## Resource Loading
+##########################################################################
+
+def warmup():
+    """
+    Loads every NLTK resource used by corpus.nlp and corpus.learn, logging
+    how long each one takes to load. Called when the corpus app is ready if
+    settings.NLTK_WARMUP is set so that the first request does not pay for
+    the lazy loading; with gunicorn --preload the loaded models are then
+    shared copy-on-write by the forked workers.
+    """
+    resources = (
+        ('punkt tokenizer', get_tokenizer),
+        ('part-of-speech tagger', get_tagger),
+        ('wordnet', lambda: nltk.WordNetLemmatizer().lemmatize('loading', 'v')),
+        ('stopwords', lambda: nltk.corpus.stopwords.words('english')),
+    )
+
+    for name, load in resources:
+        try:
+            _, delta = timeit(load)()
+            logger.info("loaded NLTK %s in %s", name, delta)
+        except LookupError as e:
+            logger.warning("could not load NLTK %s: %s", name, e)
+
+
+##########################################################################
+## HTML Extraction
+##########################################################################
+
+# The title, paragraph texts and content signature extracted from an HTML page,
+# the reason (from corpus.language) the page was skipped, if it was, and if
+# the paragraphs were selected by a rule (None if the page was not summarized)
+Extraction = namedtuple('Extraction', 'title, paragraphs, signature, skipped, rule')
+
+# The tagged content and statistics (paragraphs, sentences, words, vocab)
+Preprocessed = namedtuple('Preprocessed', 'content, stats')
+
+
+class ParsedDocument(Document):
+    """
+    A readability document that is constructed from an already parsed lxml
+    tree rather than from an HTML string. Readability reparses its input on
+    every summary pass; this subclass instead cleans a copy of the tree that
+    was parsed once by extract (html_cleaner always copies its input).
+    """
+
+    def _parse(self, input):
+        doc = html_cleaner.clean_html(input)
+        doc.resolve_base_href()
+        return doc
+
+
+def element_paragraphs(elem, excluded=()):
+    """
+    Returns the non-empty text of the paragraph delimiting elements within
+    the element, ignoring those inside of any of the excluded elements.
+    """
+    paragraphs = []
+    for para in elem.iter(*TAGS):
+        if excluded and (para in excluded or any(
+            ancestor in excluded for ancestor in para.iterancestors()
+        )):
+            continue
+
+        text = para.text_content()
+        if text:
+            paragraphs.append(text)
+    return paragraphs
+
+
+def article_paragraphs(tree, url=None):
+    """
+    Returns the text of the paragraph delimiting elements of the article
+    body of a page parsed by build_doc and whether they were selected by a
+    rule. If the url is given and corpus.rules has a rule for its domain that
+    selects paragraphs, they are extracted from the selected article body,
+    otherwise from the readability summary of the page (which modifies the
+    tree).
+    """
+    # Use the fast path extraction rule for the domain if it matches
+    selected = rules.select(tree, url)
+    if selected is not None:
+        paragraphs = element_paragraphs(*selected)
+        if paragraphs:
+            return paragraphs, True
+
+    # Transform the tree into a readability paper summary
+    summary = ParsedDocument(tree).summary(html_partial=True)
+    summary = lxml.html.fragment_fromstring(summary, create_parent=True)
+    return element_paragraphs(summary), False
+
+
+def extract(html, url=None):
+    """
+    Parses the HTML page into an lxml tree a single time and extracts the
+    title from the tree, the text of the paragraph delimiting elements from
+    the article body (see article_paragraphs), and a signature of the
+    paragraph text. Raises an ExtractionError if the page cannot be parsed
+    or summarized.
+
+    Pages that are too sparse to contain an article are not summarized, and
+    articles that are too short or are not in English (see corpus.language)
+    are not returned; either way the page is returned without paragraphs or
+    signature and with the reason it was skipped, so the later stages have
+    nothing to tokenize or tag.
+
+    The result is not counted here, since extract often runs in an isolated
+    or pool worker; the process that receives it counts it (see count).
+    """
+    rule = None
+    try:
+        # Parse the document exactly as readability would parse it
+        tree, _ = build_doc(html)
+
+        # Get the title of the page from the tree
+        title = tree.findtext('.//title')
+        title = title.strip() if title else None
+
+        # Skip sparse pages before summarizing them, then skip short and
+        # non-English articles before the expensive stages
+        skipped = language.gate(tree)
+        if skipped is None:
+            paragraphs, rule = article_paragraphs(tree, url)
+            skipped = language.check_text("\n".join(paragraphs))
+
+    except Exception as e:
+        raise ExtractionError("could not extract text: {}".format(str(e)))
+
+    if skipped is not None:
+        return Extraction(title, [], None, skipped, rule)
+    return Extraction(title, paragraphs, signature("\n".join(paragraphs)), None, rule)
+
+
+def count(extraction, html=None):
+    """
+    Counts the result of the language gate and the extraction path of an
+    extraction of the html in this process (see corpus.language.summary and
+    corpus.rules.summary).
+    """
+    language.record(extraction.skipped, len(html) if html else 0)
+    rules.record(extraction.rule)
+
 
 ##########################################################################
 ## Preprocessing Functions
@@ -42,47 +451,192 @@ def para_tokenize(html):
     """
     Splits an HTML document into consistutent paragraphs.
     """
-    # Transform the document into a readability paper summary
-    summary = Document(html).summary()
+    for paragraph in extract(html).paragraphs:
+        yield paragraph
+
+
+def split_paragraphs(paragraphs, min_tokens=None, max_chunks=None):
+    """
+    Splits the paragraphs into at most max_chunks (default
+    settings.PREPROCESS_PARALLEL_CHUNKS) contiguous chunks of about the same
+    number of tokens, so long as every chunk has at least min_tokens tokens
+    (default settings.PREPROCESS_PARALLEL_TOKENS, 0 never splits). Documents
+    smaller than twice that are returned as one chunk.
+    """
+    if min_tokens is None:
+        min_tokens = get_setting('PREPROCESS_PARALLEL_TOKENS', DEFAULT_PARALLEL_TOKENS)
+    if max_chunks is None:
+        max_chunks = get_setting('PREPROCESS_PARALLEL_CHUNKS', DEFAULT_PARALLEL_CHUNKS)
 
-    # Parse the HTML using BeautifulSoup
-    soup = bs4.BeautifulSoup(summary, 'lxml')
+    paragraphs = list(paragraphs)
+    if not min_tokens or not max_chunks or max_chunks < 2:
+        return [paragraphs]
 
-    # Extract the paragraph delimiting elements
-    for tag in soup.find_all(TAGS):
+    sizes = [len(RegexTokenizer.pattern.findall(paragraph)) for paragraph in paragraphs]
+    total = sum(sizes)
+    parts = min(max_chunks, total // min_tokens)
+    if parts < 2:
+        return [paragraphs]
 
-        # Get the HTML node text
-        text = tag.get_text()
-        if text: yield text
+    chunks, chunk, tokens = [], [], 0
+    for paragraph, size in zip(paragraphs, sizes):
+        chunk.append(paragraph)
+        tokens += size
+        if tokens * parts >= total * (len(chunks) + 1) and len(chunks) < parts - 1:
+            chunks.append(chunk)
+            chunk = []
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def tag_chunk(paragraphs):
+    """
+    Tokenizes and tags a list of paragraphs, e.g. in an isolated worker.
+    """
+    tokenize = get_tokenizer().tokenize
+    return [pos_tag_sents(tokenize(paragraph)) for paragraph in paragraphs]
+
+
+def tag_paragraphs(paragraphs, cache=None, isolated=False):
+    """
+    Sentence and word tokenizes each paragraph with the configured tokenizer
+    then tags each paragraph in a single batch, unless the paragraph has been
+    tagged before and is in the paragraph cache. Returns the content as a
+    list of paragraphs, which is a list of sentences, which is a list of
+    (token, part of speech) tuples, along with the document statistics,
+    which are counted as the paragraphs are tagged so the content does not
+    have to be walked again. The cache defaults to the process-wide cache.
+
+    If the paragraphs that are not cached are long enough to be split by
+    split_paragraphs, the chunks are tagged in parallel by the isolated
+    workers of corpus.budget and reassembled in order, otherwise they are
+    tagged in this process, or in an isolated worker if isolated is True.
+    Tagging in the isolated workers raises a PreprocessTimeout if it does
+    not finish within the wall clock budget.
+    """
+    vocab = set()
+    sentences, words = 0, 0
+    if cache is None:
+        cache = get_paragraph_cache()
+
+    try:
+        paragraphs = list(paragraphs)
+        content = [cache.get(paragraph) for paragraph in paragraphs]
+        missing = [idx for idx, tagged in enumerate(content) if tagged is None]
+
+        chunks = split_paragraphs(paragraphs[idx] for idx in missing)
+        if len(chunks) > 1:
+            results = chain.from_iterable(map_isolated(tag_chunk, chunks))
+        elif missing and isolated:
+            results = run_isolated(tag_chunk, chunks[0])
+        else:
+            results = tag_chunk(chunks[0])
+
+        for idx, tagged in zip(missing, results):
+            content[idx] = tagged
+            cache.set(paragraphs[idx], tagged)
+
+        for tagged in content:
+            for sent in tagged:
+                words += len(sent)
+                vocab.update(token.lower() for token, _ in sent)
+
+            sentences += len(tagged)
+
+    except CorpusException:
+        raise
+    except Exception as e:
+        raise NLTKError("could not preprocess text: {}".format(str(e)))
+
+    try:
+        cache.flush()
+    except sqlite3.Error as e:
+        # The paragraphs are still cached in memory so this is not fatal
+        logger.warning("could not write paragraph cache: %s", e)
+
+    return Preprocessed(content, {
+        'paragraphs': len(content),
+        'sentences': sentences,
+        'words': words,
+        'vocab': len(vocab),
+    })
+
+
+def preprocessor_version():
+    """
+    Identifies the output of tag_paragraphs, e.g. for caching its results.
+    Every tokenizer backend produces the same output so it is not included,
+    but the tagger backends do not. Note that retraining the backoff tagger
+    changes its output without changing its name.
+    """
+    return "nlp-{}-{}".format(PREPROCESSOR_VERSION, tagger_name())
 
 
 def preprocess(html):
     """
     Returns a preprocessed document consisting of a list of paragraphs, which
     is a list of sentences, which is a list of tuples, where each tuple is a
-    (token, part of speech) pair.
+    (token, part of speech) pair. Pages skipped by the language and density
+    gate have no paragraphs and long pages are truncated to the paragraph and
+    token limits of corpus.budget. The paragraphs of very long pages are
+    tagged in parallel by the isolated workers (see tag_paragraphs).
     """
     try:
-        return [
-            [
-                nltk.pos_tag(nltk.wordpunct_tokenize(sent))
-                for sent in nltk.sent_tokenize(paragraph)
-            ]
-            for paragraph in para_tokenize(html)
-        ]
-    except Exception as e:
+        paragraphs, _ = truncate(extract(html).paragraphs)
+        return tag_paragraphs(paragraphs).content
+    except ExtractionError as e:
         raise NLTKError("could not preprocess text: {}".format(str(e)))
 
 
-def word_vocab_count(text):
+##########################################################################
+## Multi-Document Preprocessing
+##########################################################################
+
+def _init_worker():
+    """
+    Loads the NLTK models once when a worker process in the pool starts, so
+    that no document pays the cost of loading them.
+    """
+    get_tokenizer()
+    get_tagger()
+
+
+def _preprocess_worker(func, html):
     """
-    Counts the number of words and vocabulary in preprocessed text.
+    Preprocesses a single document in a worker, returning the error rather
+    than raising it so that one bad document does not fail the whole batch.
     """
-    counts = Counter([
-        word[0].lower()
-        for paragraph in text
-        for sentence in paragraph
-        for word in sentence
-    ])
+    try:
+        return func(html), None
+    except CorpusException as e:
+        return None, e
+
+
+def preprocess_many(documents, workers=None, chunksize=1, func=preprocess):
+    """
+    Preprocesses an iterable of HTML documents across a pool of worker
+    processes (one per CPU by default), yielding (result, error) pairs in
+    the same order as the input. If a document could not be preprocessed
+    its result is None and the error is the CorpusException that was raised.
+
+    The chunksize is the number of documents sent to a worker at a time;
+    larger chunks reduce interprocess overhead for many small documents.
+    If workers is 1 the documents are preprocessed in this process.
+
+    By default the result is the content returned by preprocess, another
+    module level function of the HTML can be passed in to compute other
+    results (e.g. the title and signature) in the workers.
+    """
+    worker = partial(_preprocess_worker, func)
+
+    if workers == 1:
+        _init_worker()
+        for html in documents:
+            yield worker(html)
+        return
 
-    return sum(counts.values()), len(counts)
+    with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+        for result in pool.imap(worker, documents, chunksize):
+            yield result
@@ -18,9 +18,10 @@ A simple corpus reader object for training models.
 ##########################################################################
 
 import os
-import nltk
 
 from corpus.models import Label
+from corpus.nlp import pos_tag_sents
+from corpus.features import load_features
 from nltk.corpus.reader.plaintext import CategorizedPlaintextCorpusReader
 
 
@@ -31,6 +32,9 @@ from nltk.corpus.reader.plaintext import CategorizedPlaintextCorpusReader
 DOC_PATTERN = r'(?!\.)[\w_\s]+/[\w\s\d\-]+\.txt'
 CAT_PATTERN = r'([\w_\s]+)/.*'
 
+# The default location of the unzipped debates fixture
+TRANSCRIPTS = os.path.join(os.path.dirname(__file__), "fixtures", "debates")
+
 
 ##########################################################################
 ## Transcript Corpus Reader
@@ -48,9 +52,7 @@ class TranscriptCorpusReader(CategorizedPlaintextCorpusReader):
         Returns part-of-speech tagged words in sentences in paragraphs.
         """
         for para in self.paras(**kwargs):
-            yield [
-                nltk.pos_tag(sent) for sent in para
-            ]
+            yield pos_tag_sents(para)
 
 
 ##########################################################################
@@ -119,9 +121,14 @@ class QueryCorpusReader(object):
             for doc in self.query.filter(id__in=fileids)
         ]))
 
-    def tagged(self, fileids=None, categories=None):
+    def documents(self, fileids=None, categories=None):
         """
-        Returns the content of each document.
+        Returns the preprocessed content of each document. The content also
+        exposes the statistics recorded when the document was preprocessed
+        and, if they were stored with the current version, its normalized
+        lemmas, so that it does not have to be decoded or normalized again.
+        Documents without content (e.g. skipped by the language gate) are
+        not returned.
         """
         if fileids is None:
             fileids = self.fileids(categories)
@@ -129,7 +136,20 @@ class QueryCorpusReader(object):
         if isinstance(fileids, int):
             fileids = [fileids,]
 
-        for doc in self.query.filter(id__in=fileids).values_list('content', flat=True):
+        features = load_features(fileids)
+        for pk, doc in self.query.filter(id__in=fileids).values_list('id', 'content'):
+            if doc is None:
+                continue
+
+            if pk in features:
+                doc.lemmas = features[pk]
+            yield doc
+
+    def tagged(self, fileids=None, categories=None):
+        """
+        Returns the content of each document.
+        """
+        for doc in self.documents(fileids, categories):
             for para in doc:
                 yield para
 
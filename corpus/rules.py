@@ -0,0 +1,164 @@
+# corpus.rules
+# Per-domain extraction rules that bypass readability.
+#
+# Copyright (C) 2026 District Data Labs
+# For license information, see LICENSE.txt
+
+"""
+Per-domain extraction rules that bypass readability.
+
+The readability scoring pass is the slowest step of extraction, yet most of
+the documents come from a few dozen outlets with stable article markup. For
+those domains a rule selects the article body (and any elements inside of it
+to ignore, e.g. captions and inline promotions) directly on the parsed tree.
+Selectors are XPath expressions if they start with / or (, otherwise they are
+CSS selectors. If the rule does not match a page, extraction falls back to
+readability. Rules can be added or overridden with settings.EXTRACTION_RULES,
+a dict of host to (body, exclude) selectors; run the rules command to
+validate them against stored pages.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import threading
+
+from collections import Counter, namedtuple
+from lxml.etree import XPath
+from cssselect import HTMLTranslator
+from partisan.utils import domain_host, get_setting
+
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+# Rules for the outlets that most documents are fetched from
+DEFAULT_RULES = {
+    'nytimes.com': ('//section[@name="articleBody"]', ('figure', 'aside')),
+    'washingtonpost.com': ('.article-body', ('.inline-content', 'figure')),
+    'cnn.com': ('.article__content', ('.related-content', 'figure')),
+    'foxnews.com': ('.article-body', ('.featured-video', '.ad-container')),
+    'npr.org': ('#storytext', ('.bucketwrap', 'aside')),
+    'theguardian.com': ('#maincontent', ('figure', 'aside')),
+    'apnews.com': ('.RichTextStoryBody', ('.Advertisement', 'figure')),
+    'reuters.com': ('[class*="article-body__content"]', ('figure',)),
+    'politico.com': ('.story-text', ('.story-interrupt', 'figure')),
+    'breitbart.com': ('.entry-content', ('.wp-caption', 'figure')),
+    'huffpost.com': ('#entry-body', ('.cli-related-articles', 'figure')),
+    'thehill.com': ('.article__text', ('figure', 'aside')),
+}
+
+# Extraction from the fast path and readability fallbacks, counted by record
+# in the process that receives the extraction
+counts = Counter(fast=0, fallback=0)
+
+# The compiled rules (compiled lazily by get_rules)
+_rules = None
+_rules_lock = threading.Lock()
+
+
+##########################################################################
+## Extraction Rules
+##########################################################################
+
+class Rule(namedtuple('Rule', 'body, exclude')):
+    """
+    A compiled extraction rule: an XPath that selects the article body and
+    a list of XPaths that select elements whose text should be ignored.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def compile(klass, body, exclude=()):
+        return klass(compile_selector(body), [compile_selector(sel) for sel in exclude])
+
+    def select(self, tree):
+        """
+        Returns the article body element and the set of excluded elements
+        within it, or None if the rule does not match the page.
+        """
+        bodies = self.body(tree)
+        if not bodies:
+            return None
+
+        body = bodies[0]
+        excluded = set(elem for xpath in self.exclude for elem in xpath(body))
+        return body, excluded
+
+
+def compile_selector(selector):
+    """
+    Compiles a CSS or XPath selector into an XPath evaluator. CSS selectors
+    are translated to XPath expressions relative to the context element.
+    """
+    if selector.startswith(('/', '(')):
+        return XPath(selector)
+    return XPath(HTMLTranslator().css_to_xpath(selector, prefix='descendant-or-self::'))
+
+
+def get_rules():
+    """
+    Returns the compiled rules of the default registry updated with the rules
+    in settings.EXTRACTION_RULES, compiled on first use.
+    """
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                rules = dict(DEFAULT_RULES)
+                rules.update(get_setting('EXTRACTION_RULES', {}))
+
+                _rules = {
+                    host: Rule.compile(*selectors)
+                    for host, selectors in rules.items()
+                }
+    return _rules
+
+
+def find_rule(url):
+    """
+    Returns the rule for the domain of the url, or for its parent domains
+    (e.g. the rule for nytimes.com matches www.nytimes.com and
+    cn.nytimes.com), or None if there is no rule.
+    """
+    if not url:
+        return None
+
+    rules = get_rules()
+    parts = domain_host(url).split('.')
+    for idx in range(len(parts) - 1):
+        rule = rules.get('.'.join(parts[idx:]))
+        if rule is not None:
+            return rule
+    return None
+
+
+def select(tree, url):
+    """
+    Returns the article body and excluded elements selected by the rule for
+    the domain of the url, or None if there is no rule or it does not match.
+    """
+    rule = find_rule(url)
+    if rule is None:
+        return None
+    return rule.select(tree)
+
+
+def record(rule):
+    """
+    Counts an extraction whose paragraphs were (if rule is True) or were not
+    (if rule is False) selected by a rule. Pages that were not summarized
+    (rule is None) are not counted.
+    """
+    if rule is not None:
+        counts['fast' if rule else 'fallback'] += 1
+
+
+def summary():
+    """
+    Describes how many pages were extracted by rules and by readability.
+    """
+    return "{fast:,} pages extracted by rules and {fallback:,} by readability".format(**counts)
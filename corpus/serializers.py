@@ -31,16 +31,20 @@ class DocumentSerializer(serializers.HyperlinkedModelSerializer):
     """
 
     detail = serializers.URLField(source='get_absolute_url', read_only=True)
+    status = serializers.HyperlinkedIdentityField(view_name='api:document-ingest-status')
     labels = serializers.StringRelatedField(many=True, read_only=True)
 
     class Meta:
         model  = Document
         fields = (
             'url', 'detail', 'title', 'long_url', 'short_url',
-            'signature', 'n_words', 'n_vocab', 'labels',
+            'signature', 'n_paras', 'n_sents', 'n_words', 'n_vocab', 'skipped',
+            'truncated', 'state', 'status', 'labels',
         )
         read_only_fields = (
-            'title', 'short_url', 'signature', 'n_words', 'n_vocab',
+            'title', 'short_url', 'signature',
+            'n_paras', 'n_sents', 'n_words', 'n_vocab', 'skipped', 'truncated',
+            'state',
         )
         extra_kwargs = {
             'long_url': {'validators': []},
@@ -48,6 +52,26 @@ class DocumentSerializer(serializers.HyperlinkedModelSerializer):
         }
 
 
+class DocumentBatchSerializer(serializers.Serializer):
+    """
+    Validates a batch of urls to queue for ingestion.
+    """
+
+    # The maximum number of urls in a batch
+    max_urls = 1000
+
+    urls = serializers.ListField(child=serializers.URLField(max_length=2000))
+
+    def validate_urls(self, value):
+        if not value:
+            raise serializers.ValidationError("Specify at least one url.")
+        if len(value) > self.max_urls:
+            raise serializers.ValidationError(
+                "Specify at most {} urls in a batch.".format(self.max_urls)
+            )
+        return value
+
+
 ##########################################################################
 ## Annotation/Label Serializer
 ##########################################################################
@@ -17,17 +17,13 @@ Signals for model management in the corpus app.
 ## Imports
 ##########################################################################
 
-import bs4
-import requests
-
 from django.dispatch import receiver
 from django.db.models.signals import pre_save, post_save
 
-from corpus.bitly import shorten
+from corpus.bitly import lookup
 from corpus.models import Document
-from partisan.utils import signature
-from corpus.exceptions import FetchError
-from corpus.nlp import preprocess, word_vocab_count
+from corpus.ingest import fetch_html, process, learn_boilerplate
+from corpus.dedupe import index_document
 
 
 ##########################################################################
@@ -38,43 +34,42 @@ from corpus.nlp import preprocess, word_vocab_count
 def fetch_document_on_create(sender, instance, *args, **kwargs):
     """
     This is the workhorse of the document saving model. If the document is
-    created and doesn't have a short url, it will fetch a short url. If the
-    document is created and doesn't have html, it will fetch the html.
+    created and doesn't have a short url, it will use the cached short url if
+    the url has been shortened before (otherwise the shorten command will
+    shorten it later). If the document doesn't have html, it will fetch it.
+    Documents in the ingestion queue are left to the ingest command.
     """
 
-    # Fetch the bit.ly URL if it doesn't already have one.
+    # Queued documents are fetched and processed by the ingestion worker.
+    if instance.state != Document.PROCESSED:
+        return
+
+    # Use the cached bit.ly URL if it doesn't already have one.
     if not instance.short_url:
-        instance.short_url = shorten(instance.long_url)
+        instance.short_url = lookup([instance.long_url]).get(instance.long_url)
 
-    # If there is no raw_html, fetch it with the requests module.
+    # If there is no raw_html, fetch it with the shared http client.
     if not instance.raw_html:
+        fetch_html(instance)
+
+    # Extract, preprocess and deduplicate the content from the raw html
+    process(instance)
+
+
+@receiver(post_save, sender=Document)
+def learn_boilerplate_on_save(sender, instance, *args, **kwargs):
+    """
+    Adds the page of a processed document to the boilerplate model of its
+    domain once the document has been saved successfully.
+    """
+    learn_boilerplate(instance)
+
+
+@receiver(post_save, sender=Document)
+def index_document_on_create(sender, instance, created, *args, **kwargs):
+    """
+    Adds a newly created document to the near-duplicate LSH index.
+    """
+    if created and instance.minhash:
+        index_document(instance)
 
-        try:
-            # Get the response and check if it exists
-            # Raise an exception on a bad status code
-            response = requests.get(instance.long_url)
-            response.raise_for_status()
-        except Exception as e:
-            raise FetchError(
-                "Could not fetch document: {}".format(e)
-            )
-
-        # Otherwise set the raw html on the instance
-        instance.raw_html = response.text
-
-    # If there is no content, preprocess it
-    if not instance.content:
-        instance.content = preprocess(instance.raw_html)
-        words, vocab = word_vocab_count(instance.content)
-        instance.n_words = words
-        instance.n_vocab = vocab
-
-    # If there is no title, parse it from the raw html.
-    if not instance.title:
-        soup = bs4.BeautifulSoup(instance.raw_html, 'lxml')
-        instance.title = soup.title.string
-
-    # If there is no signature parse it from the raw_html
-    # TODO: Change the signature to operate off the preprocessed text.
-    if not instance.signature:
-        instance.signature = signature(instance.raw_html)
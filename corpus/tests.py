@@ -17,9 +17,1034 @@ Tests for the corpus app.
 ## Imports
 ##########################################################################
 
-from django.test import TestCase
+import os
+import gzip
+import json
+import time
+import pickle
+import tempfile
+import threading
+import lxml.html
+import multiprocessing
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+from io import StringIO
+from unittest import skipIf
+from django.core.management import call_command
+from django.utils import timezone
+from django.core.urlresolvers import reverse
+from django.test import TestCase, TransactionTestCase, override_settings
+from corpus.models import Document, Annotation, Domain, DocumentFeatures, Corpus
+from corpus.reader import CorpusModelReader
+from corpus.bulk import CREATED, SKIPPED, EXISTS, QUEUED, FAILED
+from corpus.bulk import enqueue, import_urls, create_documents
+from django.contrib.auth.models import User
+from corpus.ingest import claim, ingest_next
+from corpus.client import fetch
+from corpus.exceptions import FetchError, BitlyRateLimit, PreprocessTimeout
+from corpus.bitly import lookup, shorten_many
+from corpus.memo import ParagraphCache
+from corpus.lemmas import CompiledLemmatizer, LemmaDictionary, build
+from corpus.rules import Rule, find_rule
+from corpus.nlp import element_paragraphs, tag_agreement, train_backoff_tagger
+from corpus.nlp import split_paragraphs, extract, count
+from partisan.utils import domain_host
+from corpus.boilerplate import learn, strip
+from corpus.budget import PARAGRAPHS, TOKENS, TIMEOUT, truncate, deadline, remaining
+from corpus.budget import run_isolated, map_isolated
+from corpus.language import SPARSE, LANGUAGE, check_text, counts
+from corpus.fields import TaggedContent, TaggedContentField
+from corpus.fields import encode_content, decode_content, decode_header
+from corpus.fields import ZSTD, CompressedText, zstandard, reset_dictionaries
+from corpus.dedupe import NUM_PERM, BANDS, PRIME, _A, _B, minhash, similarity, buckets, shingles
 
 
 ##########################################################################
 ## Tests
 ##########################################################################
+
+class TaggedContentFieldTests(TestCase):
+    """
+    Test the compact encoding of preprocessed document content.
+    """
+
+    content = [
+        [
+            [('The', 'DT'), ('senator', 'NN'), ('spoke', 'VBD'), ('.', '.')],
+            [('The', 'DT'), ('naïve', 'JJ'), ('voter', 'NN'), ('listened', 'VBD')],
+        ],
+        [],
+        [
+            [],
+            [('Taxes', 'NNS'), ('!', '.')],
+        ],
+    ]
+
+    def test_encode_decode(self):
+        """
+        Assert that decoding encoded content returns the original content
+        """
+        data = encode_content(self.content)
+        self.assertEqual(decode_content(data), self.content)
+        self.assertEqual(decode_content(encode_content([])), [])
+
+    def test_header_counts(self):
+        """
+        Assert the header counts paragraphs, sentences, words and vocabulary
+        """
+        version, paras, sents, words, vocab = decode_header(encode_content(self.content))
+        self.assertEqual((paras, sents, words, vocab), (3, 4, 10, 9))
+
+    def test_lazy_decoding(self):
+        """
+        Assert tagged content is only decoded when paragraphs are accessed
+        """
+        content = TaggedContent(encode_content(self.content))
+        self.assertEqual(len(content), 3)
+        self.assertEqual(content.stats, {
+            'paragraphs': 3, 'sentences': 4, 'words': 10, 'vocab': 9,
+        })
+        self.assertIsNone(content._content)
+
+        self.assertEqual(content[0], self.content[0])
+        self.assertEqual(list(content), self.content)
+        self.assertEqual(content, self.content)
+
+    def test_field_prep_value(self):
+        """
+        Assert the field encodes lists and passes through undecoded data
+        """
+        field = TaggedContentField(null=True)
+        data  = field.get_prep_value(self.content)
+
+        self.assertIsNone(field.get_prep_value(None))
+        self.assertEqual(field.to_python(data), self.content)
+        self.assertEqual(field.get_prep_value(TaggedContent(data)), data)
+
+
+class CorpusTests(TestCase):
+    """
+    Test building corpora from the documents users have annotated.
+    """
+
+    def test_queued_documents(self):
+        """
+        Assert documents without content are not added to a corpus
+        """
+        user = User.objects.create_user("corpus", "corpus@example.com", "supersecret")
+        processed = Document.objects.create(
+            long_url="http://example.com/processed", title="Processed", signature="abc",
+            raw_html="<html><body><p>Processed</p></body></html>",
+            content=TaggedContentFieldTests.content,
+        )
+        pending = Document.objects.create(
+            long_url="http://example.com/pending", state=Document.PENDING,
+        )
+
+        for document in (processed, pending):
+            Annotation.objects.create(user=user, document=document)
+
+        corpus = Corpus.objects.create_for_user(user, labeled=False)
+        self.assertEqual(list(corpus.documents.all()), [processed])
+
+        reader = CorpusModelReader(corpus)
+        self.assertEqual(list(reader.documents()), [TaggedContentFieldTests.content])
+
+
+class MinHashTests(TestCase):
+    """
+    Test the MinHash signatures used for near-duplicate detection.
+    """
+
+    def make_content(self, words):
+        return [[[(word, 'NN') for word in words]]]
+
+    def test_signature(self):
+        """
+        Assert signatures have one value per hash function and empty is None
+        """
+        signature = minhash(self.make_content("a wire story".split()))
+        self.assertEqual(len(signature), NUM_PERM)
+        self.assertEqual(len(set(buckets(signature))), BANDS)
+        self.assertIsNone(minhash([]))
+        self.assertIsNone(minhash(self.make_content([".", "!"])))
+
+    def test_universal_hashing(self):
+        """
+        Assert signatures are the minimum of (a*x + b) mod p without overflow
+        """
+        content = self.make_content(["word{}".format(idx) for idx in range(50)])
+        values = [value % int(PRIME) for value in shingles(content)]
+        expected = [
+            min((int(a) * value + int(b)) % int(PRIME) for value in values)
+            for a, b in zip(_A, _B)
+        ]
+        self.assertEqual(minhash(content), expected)
+
+    def test_near_duplicates(self):
+        """
+        Assert near-duplicates are similar and share LSH buckets
+        """
+        words = ["word{}".format(idx) for idx in range(400)]
+        original  = minhash(self.make_content(words))
+        duplicate = minhash(self.make_content(["Updated", ":"] + words[:-3]))
+        different = minhash(self.make_content(list(reversed(words))))
+
+        self.assertGreater(similarity(original, duplicate), 0.8)
+        self.assertLess(similarity(original, different), 0.2)
+        self.assertTrue(set(buckets(original)) & set(buckets(duplicate)))
+
+
+class ParagraphCacheTests(TestCase):
+    """
+    Test the memoization of tagged paragraphs.
+    """
+
+    tagged = [[('Subscribe', 'VB'), ('now', 'RB'), ('.', '.')]]
+
+    def test_lru(self):
+        """
+        Assert the in-memory cache evicts the least recently used paragraph
+        """
+        cache = ParagraphCache("test", size=2)
+        cache.set("a", self.tagged)
+        cache.set("b", self.tagged)
+        self.assertEqual(cache.get("a"), self.tagged)
+
+        cache.set("c", self.tagged)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), self.tagged)
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(stats['words'], 6)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3.0)
+
+    def test_disk(self):
+        """
+        Assert flushed paragraphs are found on disk by a new cache
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "paragraphs.db")
+            cache = ParagraphCache("test", path=path)
+            cache.set("a", self.tagged)
+            cache.flush()
+
+            cache = ParagraphCache("test", path=path)
+            self.assertEqual(cache.get("a"), self.tagged)
+            self.assertEqual(cache.stats()['disk_hits'], 1)
+
+            # A new preprocessor version does not reuse the tagged paragraphs
+            self.assertIsNone(ParagraphCache("other", path=path).get("a"))
+
+    def test_copies(self):
+        """
+        Assert cached sentences cannot be modified through a returned value
+        """
+        cache = ParagraphCache("test", size=2)
+        cache.set("a", self.tagged)
+        cache.get("a")[0].append(('!', '.'))
+        self.assertEqual(cache.get("a"), self.tagged)
+
+    def test_disk_size(self):
+        """
+        Assert the on-disk cache only keeps the newest paragraphs
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "paragraphs.db")
+            cache = ParagraphCache("test", size=0, path=path, disk_size=2)
+            for paragraph in ("a", "b", "c"):
+                cache.set(paragraph, self.tagged)
+                cache.flush()
+
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual(cache.get("b"), self.tagged)
+            self.assertEqual(cache.get("c"), self.tagged)
+
+
+class LanguageGateTests(TestCase):
+    """
+    Test the language and text density gate.
+    """
+
+    english = (
+        "The Senate voted on Tuesday to advance a bill that would expand "
+        "health coverage for millions of Americans, setting up a final vote "
+        "later this week. "
+    ) * 5
+
+    french = (
+        "Le Sénat a voté mardi pour faire avancer un projet de loi qui "
+        "élargirait la couverture santé de millions d'Américains, ouvrant "
+        "la voie à un vote final plus tard cette semaine. "
+    ) * 5
+
+    def test_check_text(self):
+        """
+        Assert sparse and non-English text is skipped and English is not
+        """
+        english, french = self.english, self.french
+
+        self.assertIsNone(check_text(english))
+        self.assertEqual(check_text(french), LANGUAGE)
+        self.assertEqual(check_text("Home News Sports Login"), SPARSE)
+
+        # The thresholds are read from the settings
+        with override_settings(LANGUAGE_MIN_WORDS=1000):
+            self.assertEqual(check_text(english), SPARSE)
+        with override_settings(LANGUAGE_MIN_ENGLISH=0.3):
+            self.assertIsNone(check_text(french))
+
+    def test_article(self):
+        """
+        Assert the language of the article is checked rather than the page
+        """
+        page = (
+            "<html><head><title>Vote</title></head><body><ul>{}</ul>"
+            "<article><p>{}</p><p>{}</p></article></body></html>"
+        )
+        links = "".join(
+            "<li><a href='/{0}'>{1}</a></li>".format(idx, word)
+            for idx, word in enumerate(self.english.split())
+        )
+
+        self.assertEqual(extract(page.format(links, self.french, self.french)).skipped, LANGUAGE)
+        self.assertIsNone(extract(page.format("", self.english, self.english)).skipped)
+        self.assertEqual(extract(page.format(links, "Vote.", "")).skipped, SPARSE)
+
+    def test_counts(self):
+        """
+        Assert extractions are counted by the process that receives them
+        """
+        counts.clear()
+        page = "<html><body><p>{}</p></body></html>"
+        for text in (self.english, self.french, "Vote."):
+            html = page.format(text)
+            count(extract(html), html)
+
+        self.assertEqual(counts['checked'], 3)
+        self.assertEqual((counts['passed'], counts['language'], counts['sparse']), (1, 1, 1))
+        self.assertEqual(counts['skipped_bytes'], len(page.format(self.french)) + len(page.format("Vote.")))
+
+
+class BoilerplateTests(TestCase):
+    """
+    Test the per-domain boilerplate model.
+    """
+
+    footer = "Sign up for our  newsletter!"
+
+    def test_domain_host(self):
+        """
+        Assert hosts are lowercase and ignore the www prefix
+        """
+        self.assertEqual(domain_host("https://WWW.Example.com/a/b?c=d"), "example.com")
+        self.assertEqual(domain_host("http://news.example.com"), "news.example.com")
+
+    def test_learn_strip(self):
+        """
+        Assert paragraphs repeated on pages of a domain are stripped
+        """
+        for idx in range(3):
+            url = "http://www.example.com/story-{}".format(idx)
+            learn(url, ["Story number {}.".format(idx), self.footer])
+
+        paragraphs = ["A new story.", "sign up for our newsletter!"]
+        self.assertEqual(strip("http://example.com/new", paragraphs), ["A new story."])
+        self.assertEqual(strip("http://other.com/new", paragraphs), paragraphs)
+
+
+class ExtractionRulesTests(TestCase):
+    """
+    Test the per-domain fast-path extraction rules.
+    """
+
+    html = (
+        '<html><body><nav><p>Home</p></nav><div class="article-body">'
+        '<p>First.</p><figure><p>Caption</p></figure><p>Second.</p>'
+        '</div></body></html>'
+    )
+
+    def test_rule_selection(self):
+        """
+        Assert rules select the body paragraphs outside excluded elements
+        """
+        tree = lxml.html.document_fromstring(self.html)
+        rule = Rule.compile('.article-body', ('figure',))
+        self.assertEqual(element_paragraphs(*rule.select(tree)), ["First.", "Second."])
+        self.assertIsNone(Rule.compile('//article').select(tree))
+
+    def test_find_rule(self):
+        """
+        Assert rules are found for subdomains of the domain of a rule
+        """
+        self.assertIsNotNone(find_rule("https://www.nytimes.com/2016/story.html"))
+        self.assertIsNotNone(find_rule("https://cn.nytimes.com/story"))
+        self.assertIsNone(find_rule("http://example.com/story"))
+        self.assertIsNone(find_rule(None))
+
+
+class BackoffTaggerTests(TestCase):
+    """
+    Test the backoff tagger and the tagger agreement harness.
+    """
+
+    sents = [
+        [('The', 'DT'), ('senator', 'NN'), ('voted', 'VBD'), ('twice', 'RB'), ('.', '.')],
+        [('The', 'DT'), ('quick', 'JJ'), ('senators', 'NNS'), ('voted', 'VBD'), ('.', '.')],
+    ]
+
+    def test_agreement(self):
+        """
+        Assert agreement is measured on tags and on coarse classes
+        """
+        tagged = [
+            [('The', 'DT'), ('senator', 'NNP'), ('voted', 'VBN'), ('twice', 'JJ'), ('.', '.')],
+        ]
+        self.assertEqual(tag_agreement(self.sents[:1], tagged), (0.4, 0.8))
+        self.assertEqual(tag_agreement([], []), (0.0, 0.0))
+
+    def test_train_backoff_tagger(self):
+        """
+        Assert the backoff tagger learns its training sentences
+        """
+        tagger = train_backoff_tagger(self.sents)
+        tokens = [[token for token, _ in sent] for sent in self.sents]
+        self.assertEqual(tag_agreement(self.sents, tagger.tag_sents(tokens)), (1.0, 1.0))
+        self.assertEqual(tagger.tag(['1,000'])[0][1], 'CD')
+
+
+def sleep_isolated(seconds):
+    """
+    Sleeps for the seconds in run_isolated then in map_isolated (in ten
+    parts) with a budget of a tenth of a second, e.g. in a daemonic pool
+    worker, and returns the reason each call was truncated or None.
+    """
+    calls = [
+        lambda: run_isolated(time.sleep, seconds),
+        lambda: map_isolated(time.sleep, [seconds / 10] * 10),
+    ]
+
+    reasons = []
+    for call in calls:
+        try:
+            with deadline(0.1):
+                call()
+            reasons.append(None)
+        except PreprocessTimeout:
+            reasons.append(TIMEOUT)
+    return reasons
+
+
+class BudgetTests(TestCase):
+    """
+    Test the paragraph and token limits on preprocessing.
+    """
+
+    def test_truncate(self):
+        """
+        Assert paragraphs are truncated to the paragraph and token limits
+        """
+        paragraphs = ["One two three.", "Four, five six.", "Seven."]
+        self.assertEqual(truncate(paragraphs, 5, 100), (paragraphs, None))
+        self.assertEqual(truncate(paragraphs, 2, 0), (paragraphs[:2], PARAGRAPHS))
+        self.assertEqual(truncate(paragraphs, 0, 6), (["One two three.", "Four,"], TOKENS))
+        self.assertEqual(truncate(paragraphs, 0, 4), (["One two three."], TOKENS))
+
+    @override_settings(PREPROCESS_TIMEOUT=30)
+    def test_deadline(self):
+        """
+        Assert the isolated calls in a deadline block share its budget
+        """
+        self.assertEqual(remaining(), 30)
+        self.assertEqual(remaining(5), 5)
+
+        with deadline(10):
+            self.assertLessEqual(remaining(), 10)
+            self.assertGreater(remaining(), 9)
+            with deadline(0):
+                self.assertLessEqual(remaining(), 10)
+            with deadline(20):
+                self.assertLessEqual(remaining(), 10)
+            with deadline(5):
+                self.assertLessEqual(remaining(), 5)
+            self.assertGreater(remaining(), 5)
+
+        with deadline(0):
+            self.assertEqual(remaining(), 0)
+
+        with deadline(0.01):
+            time.sleep(0.02)
+            self.assertRaises(PreprocessTimeout, remaining)
+
+        self.assertEqual(remaining(), 30)
+
+    def test_daemonic_deadline(self):
+        """
+        Assert the isolated calls of daemonic pool workers are interrupted
+        """
+        with multiprocessing.Pool(1) as pool:
+            started = time.time()
+            self.assertEqual(pool.apply(sleep_isolated, (2,)), [TIMEOUT, TIMEOUT])
+            self.assertLess(time.time() - started, 1)
+            self.assertEqual(pool.apply(sleep_isolated, (0.01,)), [None, None])
+
+    def test_split_paragraphs(self):
+        """
+        Assert long documents are split into ordered chunks of similar size
+        """
+        paragraphs = ["word " * (idx % 5 + 1) for idx in range(100)]
+        self.assertEqual(split_paragraphs(paragraphs, 1000, 4), [paragraphs])
+        self.assertEqual(split_paragraphs(paragraphs, 100, 1), [paragraphs])
+
+        chunks = split_paragraphs(paragraphs, 100, 4)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunks, []), paragraphs)
+        for chunk in chunks:
+            self.assertGreaterEqual(sum(len(p.split()) for p in chunk), 90)
+
+
+class LemmaDictionaryTests(TestCase):
+    """
+    Test the memory-mapped lemma dictionary.
+    """
+
+    entries = {
+        ('voted', 'v'): 'vote',
+        ('senators', 'n'): 'senator',
+        ('better', 'a'): 'good',
+        ('better', 'r'): 'well',
+        ('cafés', 'n'): 'café',
+    }
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "lemmas.bin")
+        build(self.entries, self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookup(self):
+        """
+        Assert every entry is found and other forms are not
+        """
+        lemmas = LemmaDictionary(self.path)
+        self.assertEqual(len(lemmas), len(self.entries))
+        for (surface, pos), lemma in self.entries.items():
+            self.assertEqual(lemmas.get(surface, pos), lemma)
+
+        self.assertIsNone(lemmas.get('voted', 'n'))
+        self.assertIsNone(lemmas.get('aardvarks', 'n'))
+        self.assertIsNone(lemmas.get('zebras', 'n'))
+
+    def test_pickle(self):
+        """
+        Assert the compiled lemmatizer pickles as its paths and loads
+        without the dictionary
+        """
+        lemmatizer = CompiledLemmatizer(self.path)
+        clone = pickle.loads(pickle.dumps(lemmatizer))
+        self.assertEqual(clone.path, self.path)
+        self.assertEqual(clone.lemmatize('better', 'a'), 'good')
+
+        # Without the dictionary the clone falls back to WordNet
+        data = pickle.dumps(lemmatizer)
+        os.remove(self.path)
+        clone = pickle.loads(data)
+        self.assertIsNone(clone.dictionary)
+        self.assertEqual(clone.lemmatize('voted', 'v'), 'vote')
+
+
+class CompressedTextTests(TestCase):
+    """
+    Test the compressed storage of the raw html of documents.
+    """
+
+    page = (
+        "<html><head><title>Article {0}</title></head><body>"
+        "<nav><a href='/'>Home</a><a href='/politics'>Politics</a></nav>"
+        "<article><h1>Article {0}</h1><p>Senator {0} voted on bill {1} today.</p></article>"
+        "<footer>Copyright 2016 Example News</footer></body></html>"
+    )
+
+    def tearDown(self):
+        reset_dictionaries()
+
+    def create(self, idx):
+        return Document.objects.create(
+            long_url="http://example.com/{}".format(idx),
+            raw_html=self.page.format(idx, idx * 7), state=Document.PENDING,
+        )
+
+    def test_lazy(self):
+        """
+        Assert html is stored compressed and only decompressed on access
+        """
+        html = self.page.format("café", 1) * 20
+        doc = Document.objects.create(
+            long_url="http://example.com/article", raw_html=html, state=Document.PENDING,
+        )
+
+        stored = Document.objects.values_list('raw_html', flat=True).get(id=doc.id)
+        self.assertIsInstance(stored, CompressedText)
+        self.assertEqual(stored.size, len(html.encode('utf-8')))
+        self.assertLess(len(stored.data), stored.size)
+        self.assertEqual(str(stored), html)
+
+        doc = Document.objects.get(id=doc.id)
+        self.assertIsNone(doc.__dict__['raw_html']._text)
+        self.assertEqual(doc.raw_html, html)
+
+    @skipIf(zstandard is None, "the zstandard package is not installed")
+    def test_dictionary(self):
+        """
+        Assert pages are recompressed with a trained dictionary
+        """
+        docs = [self.create(idx) for idx in range(100)]
+        call_command('compress_html', train=True, samples=100, size=2048, stdout=StringIO())
+
+        for doc in docs:
+            stored = Document.objects.values_list('raw_html', flat=True).get(id=doc.id)
+            self.assertEqual(stored.codec, ZSTD)
+            self.assertNotEqual(stored.dictionary, 0)
+            self.assertEqual(stored, doc.raw_html)
+
+        # New pages are compressed with the same dictionary
+        doc = self.create(100)
+        self.assertEqual(
+            Document.objects.values_list('raw_html', flat=True).get(id=doc.id).dictionary,
+            stored.dictionary
+        )
+
+
+class IngestionQueueTests(TestCase):
+    """
+    Test advancing documents through the ingestion queue.
+    """
+
+    @override_settings(INGEST_RETRY_DELAY=0)
+    def test_fetched(self):
+        """
+        Assert pending documents are not processed on save but are fetched
+        """
+        doc = Document.objects.create(
+            long_url="http://example.com/article",
+            raw_html="<html><body><p>Hello</p></body></html>", state=Document.PENDING,
+        )
+        self.assertIsNone(doc.content)
+
+        # A failed attempt is forgotten once the document advances
+        Document.objects.filter(id=doc.id).update(attempts=1, error="timed out")
+        self.assertEqual(ingest_next().id, doc.id)
+
+        # Documents are ingested without a short url if it is not cached
+        doc.refresh_from_db()
+        self.assertEqual(doc.state, Document.FETCHED)
+        self.assertIsNone(doc.short_url)
+        self.assertIsNone(doc.error)
+        self.assertEqual(doc.attempts, 0)
+
+    def test_lease(self):
+        """
+        Assert claimed documents are leased until they are advanced
+        """
+        doc = Document.objects.create(
+            long_url="http://example.com/article", state=Document.PENDING,
+        )
+        self.assertEqual(claim(), doc.id)
+        self.assertIsNone(claim())
+
+        with override_settings(INGEST_LEASE=0):
+            Document.objects.filter(id=doc.id).update(modified=timezone.now())
+            self.assertEqual(claim(), doc.id)
+
+    @override_settings(INGEST_MAX_ATTEMPTS=2, INGEST_RETRY_DELAY=0)
+    def test_failed(self):
+        """
+        Assert documents that cannot be fetched fail after the max attempts
+        """
+        doc = Document.objects.create(
+            long_url="http://localhost:1/article", short_url="http://bit.ly/b",
+            state=Document.PENDING,
+        )
+
+        for state in (Document.PENDING, Document.FAILED):
+            self.assertEqual(ingest_next().id, doc.id)
+            doc.refresh_from_db()
+            self.assertEqual(doc.state, state)
+            self.assertIn("Could not fetch document", doc.error)
+
+        self.assertIsNone(ingest_next())
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Serves a gzipped page with validators, a page that is too slow, a page
+    that is sent a byte at a time, and pages with other content types and
+    charsets.
+    """
+
+    protocol_version = "HTTP/1.1"
+    etag = '"v1"'
+    last_modified = "Sun, 18 Oct 2026 12:00:00 GMT"
+
+    # Content type and body of the other pages
+    pages = {
+        "/pdf": ("application/pdf", b"%PDF-1.4 ..."),
+        "/octets": ("application/octet-stream", b"%PDF-1.4 ..."),
+        "/untyped": (None, b"<!DOCTYPE html><html><body><p>Untyped</p></body></html>"),
+        "/latin": (
+            "text/html",
+            b'<html><head><meta charset="windows-1252"></head><body><p>Caf\xe9</p></body></html>'
+        ),
+        "/article": (
+            "text/html",
+            b"<html><head><title>The Senate Vote</title></head><body><article>" + b"".join(
+                "<p>The senator from the state said on {} that the committee would "
+                "vote on the bill before the end of the week, and that members of "
+                "both parties had been working together on the changes.</p>".format(day).encode('utf-8')
+                for day in ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+            ) + b"</article></body></html>"
+        ),
+    }
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+
+        if self.path == "/slow":
+            time.sleep(1)
+
+        if self.path == "/drip":
+            body = b"<html><body><p>" + b"drip " * 200 + b"</p></body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                for idx in range(len(body)):
+                    self.wfile.write(body[idx:idx+1])
+                    self.wfile.flush()
+                    time.sleep(0.01)
+            except OSError:
+                pass
+            return
+
+        if self.path in self.pages:
+            mimetype, body = self.pages[self.path]
+            self.send_response(200)
+            if mimetype:
+                self.send_header("Content-Type", mimetype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = gzip.compress("<html><body><p>Hello</p></body></html>".encode('utf-8'))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", self.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+class HTTPClientTests(TestCase):
+    """
+    Test the shared HTTP client against a local stand-in server.
+    """
+
+    def setUp(self):
+        self.server = StandInServer(("127.0.0.1", 0), StandInHandler)
+        self.server.connections = set()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch(self):
+        """
+        Assert gzipped pages are decoded and their validators returned
+        """
+        fetched = fetch(self.url + "/page")
+        self.assertEqual(fetched.status, 200)
+        self.assertEqual(fetched.text, "<html><body><p>Hello</p></body></html>")
+        self.assertEqual(fetched.etag, StandInHandler.etag)
+        self.assertEqual(fetched.last_modified, StandInHandler.last_modified)
+
+    def test_conditional(self):
+        """
+        Assert unchanged pages are not downloaded again
+        """
+        fetched = fetch(self.url + "/page", etag=StandInHandler.etag)
+        self.assertEqual(fetched.status, 304)
+        self.assertIsNone(fetched.text)
+        self.assertEqual(fetched.etag, StandInHandler.etag)
+
+    def test_keep_alive(self):
+        """
+        Assert requests to the same host reuse a pooled connection
+        """
+        for _ in range(3):
+            fetch(self.url + "/page")
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_timeout(self):
+        """
+        Assert slow responses time out
+        """
+        with self.assertRaises(FetchError):
+            fetch(self.url + "/slow", timeout=(1, 0.2))
+
+    @override_settings(FETCH_MAX_SECONDS=0.5)
+    def test_drip(self):
+        """
+        Assert pages sent a byte at a time are abandoned at the deadline
+        """
+        started = time.time()
+        with self.assertRaisesRegex(FetchError, "longer than 0.5 seconds"):
+            fetch(self.url + "/drip", timeout=(1, 1))
+        self.assertLess(time.time() - started, 2)
+
+    def test_not_html(self):
+        """
+        Assert responses that are not HTML pages are rejected
+        """
+        for path in ("/pdf", "/octets"):
+            with self.assertRaisesRegex(FetchError, "not an HTML page"):
+                fetch(self.url + path)
+
+        self.assertIn("Untyped", fetch(self.url + "/untyped").text)
+
+    def test_max_bytes(self):
+        """
+        Assert pages larger than the maximum size are abandoned
+        """
+        with self.assertRaisesRegex(FetchError, "larger than"):
+            fetch(self.url + "/page", max_bytes=16)
+
+    def test_charset(self):
+        """
+        Assert pages are decoded with the charset of their meta tag
+        """
+        self.assertIn("Caf\u00e9", fetch(self.url + "/latin").text)
+
+
+class BulkEnqueueTests(TestCase):
+    """
+    Test queueing batches of urls for ingestion.
+    """
+
+    def test_enqueue(self):
+        """
+        Assert new and failed urls are queued and every url is annotated
+        """
+        user = User.objects.create_user("bulk", "bulk@example.com", "supersecret")
+        stored = Document.objects.create(
+            long_url="http://example.com/stored", short_url="http://bit.ly/s",
+            state=Document.FAILED,
+        )
+        urls = [
+            "http://example.com/a", "http://example.com/stored",
+            "http://example.com/b", "http://example.com/a",
+        ]
+
+        outcomes = enqueue(urls, user)
+        self.assertEqual([outcome.url for outcome in outcomes], urls[:3])
+        self.assertEqual([outcome.outcome for outcome in outcomes], [QUEUED] * 3)
+        self.assertEqual(Document.objects.filter(state=Document.PENDING).count(), 3)
+        self.assertEqual(Annotation.objects.filter(user=user).count(), 3)
+        self.assertEqual(outcomes[1].document, stored.id)
+
+        outcomes = enqueue(urls[:1], user)
+        self.assertEqual(outcomes[0].outcome, EXISTS)
+        self.assertEqual(Annotation.objects.filter(user=user).count(), 3)
+
+    def test_create_documents(self):
+        """
+        Assert documents stored by another process are not reported as created
+        """
+        stored = Document.objects.create(long_url="http://example.com/b", state=Document.PENDING)
+        ids, created = create_documents([
+            Document(long_url="http://example.com/a", state=Document.PENDING),
+            Document(long_url="http://example.com/b", state=Document.PENDING),
+        ])
+
+        self.assertEqual(created, {"http://example.com/a"})
+        self.assertEqual(ids["http://example.com/b"], stored.id)
+        self.assertEqual(Document.objects.count(), 2)
+
+    def test_batch(self):
+        """
+        Assert the batch endpoint queues the urls for the user
+        """
+        endpoint = reverse('api:document-batch')
+        data = {"urls": ["http://example.com/a", "http://example.com/b"]}
+        response = self.client.post(endpoint, json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 403)
+
+        user = User.objects.create_user("batch", "batch@example.com", "supersecret")
+        self.client.login(username="batch", password="supersecret")
+        response = self.client.post(endpoint, json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertEqual([result['outcome'] for result in results], [QUEUED, QUEUED])
+        self.assertEqual(Document.objects.filter(state=Document.PENDING).count(), 2)
+        self.assertEqual(Annotation.objects.filter(user=user).count(), 2)
+
+        response = self.client.get(results[0]['status'])
+        self.assertEqual(json.loads(response.content.decode('utf-8'))['state'], Document.PENDING)
+
+
+class BulkImportTests(TransactionTestCase):
+    """
+    Test importing batches of urls, which closes the database connections
+    before preprocessing so cannot run in a test transaction.
+    """
+
+    def setUp(self):
+        self.server = StandInServer(("127.0.0.1", 0), StandInHandler)
+        self.server.connections = set()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_import_urls(self):
+        """
+        Assert urls are fetched, processed, stored and annotated in bulk
+        """
+        user = User.objects.create_user("bulk", "bulk@example.com", "supersecret")
+        stored = Document.objects.create(long_url=self.url + "/stored", state=Document.PENDING)
+        urls = [
+            self.url + "/article", self.url + "/page",
+            self.url + "/stored", "http://localhost:1/article",
+        ]
+
+        outcomes = import_urls(urls, user, workers=1)
+        self.assertEqual([outcome.url for outcome in outcomes], urls)
+        self.assertEqual(
+            [outcome.outcome for outcome in outcomes], [CREATED, SKIPPED, EXISTS, FAILED]
+        )
+        self.assertEqual(outcomes[2].document, stored.id)
+        self.assertIsNone(outcomes[3].document)
+        self.assertEqual(Annotation.objects.filter(user=user).count(), 3)
+
+        article = Document.objects.get(id=outcomes[0].document)
+        self.assertEqual(article.state, Document.PROCESSED)
+        self.assertEqual(article.title, "The Senate Vote")
+        self.assertGreater(article.n_words, 100)
+        self.assertTrue(DocumentFeatures.objects.filter(document=article).exists())
+
+        # Only the stored article is added to the boilerplate model
+        self.assertEqual(Domain.objects.get().documents, 1)
+
+        outcomes = import_urls(urls[:1], user, workers=1)
+        self.assertEqual(outcomes[0].outcome, EXISTS)
+        self.assertEqual(Domain.objects.get().documents, 1)
+
+
+class BitlyStandInHandler(BaseHTTPRequestHandler):
+    """
+    Shortens urls like the bit.ly API, throttling urls that ask for it.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        long_url = query["longUrl"][0]
+        self.server.calls.append(long_url)
+
+        if "throttle" in long_url:
+            data = {"status_code": 403, "status_txt": "RATE_LIMIT_EXCEEDED", "data": []}
+        else:
+            data = {
+                "status_code": 200, "status_txt": "OK",
+                "data": {"url": "http://bit.ly/{}".format(len(self.server.calls))},
+            }
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class BitlyTests(TestCase):
+    """
+    Test batch shortening and the short url cache against a stand-in API.
+    """
+
+    def setUp(self):
+        self.server = StandInServer(("127.0.0.1", 0), BitlyStandInHandler)
+        self.server.calls = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        self.settings = override_settings(
+            BITLY_ACCESS_TOKEN="token",
+            BITLY_API_ADDRESS="http://127.0.0.1:{}/".format(self.server.server_port),
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_shorten_many(self):
+        """
+        Assert urls are shortened once and shortening stops when throttled
+        """
+        urls = [
+            "http://example.com/a", "http://example.com/b",
+            "http://example.com/throttle", "http://example.com/c",
+        ]
+
+        shortened, errors = shorten_many(urls)
+        self.assertEqual(shortened, {
+            "http://example.com/a": "http://bit.ly/1",
+            "http://example.com/b": "http://bit.ly/2",
+        })
+        self.assertEqual(list(errors), ["http://example.com/throttle"])
+        self.assertIsInstance(errors["http://example.com/throttle"], BitlyRateLimit)
+        self.assertEqual(lookup(urls), shortened)
+
+        shortened, errors = shorten_many(urls[:2])
+        self.assertEqual(len(shortened), 2)
+        self.assertEqual(len(self.server.calls), 3)
@@ -22,12 +22,14 @@ from django.views.generic import DetailView
 from rest_framework import status
 from rest_framework import viewsets
 from rest_framework.response import Response
-from rest_framework.decorators import detail_route
+from rest_framework.reverse import reverse
+from rest_framework.decorators import detail_route, list_route
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 
 from corpus.models import Document, Annotation, Label
-from corpus.serializers import DocumentSerializer
+from corpus.bulk import enqueue
+from corpus.serializers import DocumentSerializer, DocumentBatchSerializer
 from corpus.serializers import AnnotationSerializer
 from corpus.exceptions import CorpusException
 
@@ -70,9 +72,25 @@ class DocumentViewSet(viewsets.ModelViewSet):
     serializer_class = DocumentSerializer
     permission_classes = [IsAuthenticated]
 
+    # Actions that only read documents and do not need their content or html
+    read_actions = ('list', 'retrieve', 'ingest_status')
+
+    def get_queryset(self):
+        """
+        Defers the content and html of documents for read-only actions. The
+        documents of other actions are loaded in full, since saving an instance
+        with deferred fields only writes the fields that were loaded.
+        """
+        queryset = super(DocumentViewSet, self).get_queryset()
+        if self.action in self.read_actions:
+            queryset = queryset.defer('content', 'raw_html')
+        return queryset
+
     def create(self, request, *args, **kwargs):
         """
         Create both the document and the annotation (user-association).
+        New documents are queued for ingestion, in which case the response is
+        202 Accepted and the Location header is the document's status url.
         """
         # Deserialize and validate the data from the user.
         serializer = self.get_serializer(data=request.data)
@@ -83,18 +101,33 @@ class DocumentViewSet(viewsets.ModelViewSet):
 
         # Get the headers and return a response
         headers = self.get_success_headers(serializer.data)
+        if serializer.instance.state in (Document.PENDING, Document.FETCHED):
+            headers['Location'] = serializer.data['status']
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED, headers=headers)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
         """
         Excepts any thing that might happen in the signals and raises a
         validation error in order to send back the right status code.
+        Documents are created pending so that they are fetched and processed
+        by the ingestion worker rather than in the request, and documents that
+        failed to be ingested are queued again when they are resubmitted.
         """
         try:
 
             # Create the document object
             long_url = serializer.validated_data['long_url']
-            document, _ = Document.objects.get_or_create(long_url=long_url)
+            document, created = Document.objects.get_or_create(
+                long_url=long_url, defaults={'state': Document.PENDING}
+            )
+
+            if not created and document.state == Document.FAILED:
+                document.state, document.attempts, document.error = Document.PENDING, 0, None
+                Document.objects.filter(id=document.id).update(
+                    state=document.state, attempts=0, error=None
+                )
+
             serializer.instance = document
 
             # Create the annotation object
@@ -105,6 +138,41 @@ class DocumentViewSet(viewsets.ModelViewSet):
         except CorpusException as e:
             raise ValidationError(str(e))
 
+    @list_route(methods=['post'], permission_classes=[IsAuthenticated])
+    def batch(self, request):
+        """
+        Queues a batch of urls for ingestion, creating the documents and the
+        user's annotations in bulk, and returns 202 Accepted with the outcome
+        of each url (queued or exists) and its document and status urls.
+        """
+        serializer = DocumentBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = []
+        for outcome in enqueue(serializer.validated_data['urls'], request.user):
+            results.append({
+                'url': outcome.url,
+                'outcome': outcome.outcome,
+                'document': reverse('api:document-detail', args=(outcome.document,), request=request),
+                'status': reverse('api:document-ingest-status', args=(outcome.document,), request=request),
+            })
+
+        return Response({'results': results}, status=status.HTTP_202_ACCEPTED)
+
+    @detail_route(methods=['get'], url_path='status')
+    def ingest_status(self, request, pk=None):
+        """
+        Reports the ingestion state of the document, e.g. to poll for the
+        completion of a document that was accepted for ingestion.
+        """
+        document = self.get_object()
+        return Response({
+            'state': document.state,
+            'attempts': document.attempts,
+            'error': document.error,
+            'document': reverse('api:document-detail', args=(document.id,), request=request),
+        })
+
     @detail_route(methods=['post'], permission_classes=[IsAuthenticated])
     def annotate(self, request, pk=None):
         """
@@ -203,6 +203,91 @@ MARKUP_FIELD_TYPES = (
 BITLY_API_ADDRESS  = "https://api-ssl.bitly.com"
 BITLY_ACCESS_TOKEN = environ_setting("BITLY_ACCESS_TOKEN", "")
 
+## Seconds to wait for the bit.ly API; urls are shortened by the shorten command
+BITLY_TIMEOUT = float(environ_setting("BITLY_TIMEOUT", "2"))
+
+##########################################################################
+## NLP Configuration
+##########################################################################
+
+## Load the NLTK models when the corpus app is ready (use with gunicorn --preload)
+NLTK_WARMUP = environ_setting("NLTK_WARMUP", "false").lower() in ("1", "true", "yes")
+
+## The tokenizer backend used in preprocessing: "regex" (fast) or "nltk"
+NLP_TOKENIZER = environ_setting("NLP_TOKENIZER", "regex")
+
+## The part-of-speech tagger backend: "perceptron" or "backoff" (faster, trained
+## from the perceptron's output with the train_tagger command)
+NLP_TAGGER = environ_setting("NLP_TAGGER", "perceptron")
+
+## Where the train_tagger command writes the backoff tagger
+NLP_TAGGER_PATH = environ_setting(
+    "NLP_TAGGER_PATH", os.path.join(REPOSITORY, "corpus", "fixtures", "backoff_tagger.pickle")
+)
+
+## Maximum size in bytes of the preprocessed content cache before eviction
+PREPROCESS_CACHE_SIZE = int(environ_setting("PREPROCESS_CACHE_SIZE", str(256 * 1024 * 1024)))
+
+## Limits on the cost of preprocessing a single document (0 is unlimited): the
+## number of paragraphs and tokens tagged and the seconds that extraction and
+## tagging may take together before the document is abandoned
+PREPROCESS_MAX_PARAGRAPHS = int(environ_setting("PREPROCESS_MAX_PARAGRAPHS", "500"))
+PREPROCESS_MAX_TOKENS = int(environ_setting("PREPROCESS_MAX_TOKENS", "50000"))
+PREPROCESS_TIMEOUT = int(environ_setting("PREPROCESS_TIMEOUT", "30"))
+
+## The number of isolated worker processes that tag within the time limit. Each
+## gunicorn worker and ingest command starts its own pool, and every worker in
+## it loads the tagger, so a web server with W gunicorn workers runs up to
+## W * (PREPROCESS_WORKERS + 1) processes holding the NLP models.
+PREPROCESS_WORKERS = int(environ_setting("PREPROCESS_WORKERS", "4"))
+
+## A long document is split into at most PREPROCESS_PARALLEL_CHUNKS chunks of at
+## least PREPROCESS_PARALLEL_TOKENS tokens that are tagged by the isolated workers
+PREPROCESS_PARALLEL_CHUNKS = int(environ_setting("PREPROCESS_PARALLEL_CHUNKS", "4"))
+PREPROCESS_PARALLEL_TOKENS = int(environ_setting("PREPROCESS_PARALLEL_TOKENS", "4000"))
+
+## Pages with fewer words of visible text, or a smaller proportion of common
+## English character trigrams, are not preprocessed (see `benchmark language`)
+LANGUAGE_MIN_WORDS = int(environ_setting("LANGUAGE_MIN_WORDS", "100"))
+LANGUAGE_MIN_ENGLISH = float(environ_setting("LANGUAGE_MIN_ENGLISH", "0.4"))
+
+## Seconds to wait to connect to a site and between bytes of its response, and
+## the hosts to keep persistent connections to and the connections per host
+FETCH_CONNECT_TIMEOUT = float(environ_setting("FETCH_CONNECT_TIMEOUT", "5"))
+FETCH_READ_TIMEOUT = float(environ_setting("FETCH_READ_TIMEOUT", "30"))
+FETCH_POOL_HOSTS = int(environ_setting("FETCH_POOL_HOSTS", "32"))
+FETCH_POOL_SIZE = int(environ_setting("FETCH_POOL_SIZE", "8"))
+
+## The largest page in bytes (after decompression) and the most seconds that
+## a page may take to download before it is abandoned
+FETCH_MAX_BYTES = int(environ_setting("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+FETCH_MAX_SECONDS = float(environ_setting("FETCH_MAX_SECONDS", "60"))
+
+## Attempts to fetch or process a queued document before it fails, and the
+## seconds to wait before retrying it multiplied by the failed attempts
+INGEST_MAX_ATTEMPTS = int(environ_setting("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_RETRY_DELAY = int(environ_setting("INGEST_RETRY_DELAY", "60"))
+
+## Seconds a claimed document is leased to its worker before another worker can
+## claim it, which must exceed the fetch timeout plus PREPROCESS_TIMEOUT
+INGEST_LEASE = int(environ_setting("INGEST_LEASE", "300"))
+
+## The lemma dictionary written by the build_lemmas command (WordNet is used
+## directly if it has not been built) and the log of lookups that missed it
+LEMMA_DICTIONARY_PATH = environ_setting(
+    "LEMMA_DICTIONARY_PATH", os.path.join(REPOSITORY, "corpus", "fixtures", "lemmas.bin")
+)
+LEMMA_MISSES_PATH = environ_setting("LEMMA_MISSES_PATH", LEMMA_DICTIONARY_PATH + ".misses")
+
+## Number of tagged paragraphs memoized in memory per process (0 disables)
+PARAGRAPH_CACHE_SIZE = int(environ_setting("PARAGRAPH_CACHE_SIZE", "10000"))
+
+## Optional path of a SQLite database that persists tagged paragraphs on disk
+PARAGRAPH_CACHE_PATH = environ_setting("PARAGRAPH_CACHE_PATH", "") or None
+
+## Maximum number of tagged paragraphs kept in that database (0 is unlimited)
+PARAGRAPH_CACHE_DISK_SIZE = int(environ_setting("PARAGRAPH_CACHE_DISK_SIZE", "1000000"))
+
 ##########################################################################
 ## Authentication
 ##########################################################################
@@ -23,8 +23,10 @@ import bleach
 import hashlib
 
 from functools import wraps
+from urllib.parse import urlparse
 from markdown import markdown
 from datetime import datetime
+from django.core.exceptions import ImproperlyConfigured
 
 ##########################################################################
 ## Utilities
@@ -62,6 +64,29 @@ def signature(text):
     return sign.decode('utf-8')
 
 
+def domain_host(url):
+    """
+    Returns the lowercase host of the url without a leading www. so that the
+    documents fetched from a news outlet can be grouped together.
+    """
+    host = (urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def get_setting(name, default=None):
+    """
+    Returns the Django setting or the default if it is not set or the
+    settings are not configured (e.g. when used outside of the project).
+    """
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
+
+
 def htmlize(text):
     """
     This helper method renders Markdown then uses Bleach to sanitize it as